@@ -1,8 +1,27 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from flask_mysqldb import MySQL
-import bcrypt
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, stream_with_context
+from werkzeug.datastructures import MultiDict
+from conexiones import PoolAgotado
+from esquema import EsquemaDesactualizado, Migrador
+from cache import CachePaginas, CacheReferencia, InfoColaborador, VersionesDatos
+from busqueda import TIPOS_CONTACTO, Entrada, IndiceSugerencias, ServicioBusqueda
+from directorio import DirectorioMaterializado
+from entidades import ENTIDADES, ErrorValidacion
+from contrasenas import Hasheador, HasheadorOcupado
+from limitador import AlmacenMemoria, AlmacenSQLite, LimitadorIntentos
+from metricas import Metricas
+from importacion import ErrorImportacion, ImportadorColaboradores, leer_filas, openpyxl, validar_correo
+from repositorio import BackendMySQL, BackendSQLite, Repositorio
+from respuestas import Compresion, EstaticosVersionados
+import MySQLdb.cursors
+import base64
+import click
+import csv
+import gzip
+import hashlib
+import json
 import os
 import socket
+import tempfile
 import time
 
 app = Flask(__name__)
@@ -10,11 +29,132 @@ app = Flask(__name__)
 # Configuración de la aplicación
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "tu_clave_secreta_aqui")
 
-# Configuración de la base de datos MySQL
-
+# Motor de la base de datos: "mysql" o "sqlite" (base embebida para pruebas y perfiles, ver repositorio.py)
+app.config['BASE_DATOS'] = os.getenv("BASE_DATOS", "mysql")
+# Archivo de la base SQLite; ":memory:" crea una base vacía en memoria en cada arranque (un solo proceso)
+app.config['SQLITE_RUTA'] = os.getenv("SQLITE_RUTA", ":memory:")
 
-# Inicializar la base de datos
-mysql = MySQL(app)
+# Configuración de la base de datos MySQL
+app.config['MYSQL_HOST'] = os.getenv("MYSQL_HOST", "localhost")
+app.config['MYSQL_USER'] = os.getenv("MYSQL_USER", "root")
+app.config['MYSQL_PASSWORD'] = os.getenv("MYSQL_PASSWORD", "")
+app.config['MYSQL_DB'] = os.getenv("MYSQL_DB", "db_informacion")
+app.config['MYSQL_PORT'] = int(os.getenv("MYSQL_PORT", 3306))
+
+# Pool de conexiones (compartido por el maestro y la réplica)
+app.config['MYSQL_POOL_MIN'] = int(os.getenv("MYSQL_POOL_MIN", 2))
+app.config['MYSQL_POOL_MAX'] = int(os.getenv("MYSQL_POOL_MAX", 10))
+# Segundos de espera por una conexión libre antes de responder 503
+app.config['MYSQL_POOL_TIMEOUT'] = float(os.getenv("MYSQL_POOL_TIMEOUT", 5))
+# Segundos de vida de una conexión antes de reemplazarla
+app.config['MYSQL_POOL_VIDA_MAXIMA'] = int(os.getenv("MYSQL_POOL_VIDA_MAXIMA", 1800))
+
+# Réplica de solo lectura (si no se define, todas las lecturas van al maestro)
+app.config['MYSQL_REPLICA_HOST'] = os.getenv("MYSQL_REPLICA_HOST", "")
+app.config['MYSQL_REPLICA_PORT'] = int(os.getenv("MYSQL_REPLICA_PORT", 3306))
+# Segundos de retraso máximo tolerado en la réplica antes de leer del maestro
+app.config['MYSQL_REPLICA_MAX_RETRASO'] = int(os.getenv("MYSQL_REPLICA_MAX_RETRASO", 5))
+# Segundos que una sesión sigue leyendo del maestro después de escribir
+app.config['MYSQL_VENTANA_ESCRITURA'] = int(os.getenv("MYSQL_VENTANA_ESCRITURA", 5))
+
+# Caché de tablas de referencia (áreas, departamentos, cargos, ubicaciones)
+app.config['CACHE_REFERENCIA_TTL'] = int(os.getenv("CACHE_REFERENCIA_TTL", 300))
+# Segundos entre lecturas de versiones_datos para ver cambios de otros workers
+app.config['CACHE_INTERVALO_VERSIONES'] = float(os.getenv("CACHE_INTERVALO_VERSIONES", 2))
+
+# Operaciones (ediciones más bajas) que acepta como máximo una petición de /api/<entidad>/lote
+app.config['LOTE_MAX_OPERACIONES'] = int(os.getenv("LOTE_MAX_OPERACIONES", 1000))
+
+# Segundos tras los que el índice de búsqueda se reconstruye completo
+app.config['BUSQUEDA_TTL'] = int(os.getenv("BUSQUEDA_TTL", 600))
+# Sugerencias por defecto y máximas del autocompletado de colaboradores
+app.config['SUGERENCIAS_LIMITE'] = int(os.getenv("SUGERENCIAS_LIMITE", 10))
+app.config['SUGERENCIAS_MAX'] = int(os.getenv("SUGERENCIAS_MAX", 50))
+
+# Caché de las vistas públicas del directorio ya renderizadas (tamaño máximo en bytes comprimidos)
+app.config['CACHE_PAGINAS_MAX_BYTES'] = int(os.getenv("CACHE_PAGINAS_MAX_BYTES", 32 * 1024 * 1024))
+app.config['CACHE_PAGINAS_TTL'] = int(os.getenv("CACHE_PAGINAS_TTL", 300))
+
+# Comprimir las respuestas (gzip, y brotli si está instalado) desde este tamaño en bytes
+app.config['COMPRESION_MINIMO'] = int(os.getenv("COMPRESION_MINIMO", 1024))
+# Segundos que el navegador guarda sin revalidar los archivos de /static pedidos con su huella (?v=...)
+app.config['ESTATICOS_MAX_AGE'] = int(os.getenv("ESTATICOS_MAX_AGE", 365 * 24 * 3600))
+
+# Paginación del directorio telefónico (filas por página)
+app.config['DIRECTORIO_LIMITE'] = int(os.getenv("DIRECTORIO_LIMITE", 50))
+app.config['DIRECTORIO_LIMITE_MAX'] = int(os.getenv("DIRECTORIO_LIMITE_MAX", 500))
+
+# Hash de contraseñas: factor de trabajo de bcrypt y capacidad para calcularlos
+app.config['BCRYPT_COSTO'] = int(os.getenv("BCRYPT_COSTO", 12))
+app.config['BCRYPT_HILOS'] = int(os.getenv("BCRYPT_HILOS", 2))
+# Logins que pueden esperar turno antes de responder 503
+app.config['BCRYPT_MAX_PENDIENTES'] = int(os.getenv("BCRYPT_MAX_PENDIENTES", 8))
+app.config['BCRYPT_TIMEOUT'] = float(os.getenv("BCRYPT_TIMEOUT", 10))
+
+# Intentos fallidos de login seguidos permitidos por usuario y por IP; se recupera uno cada N segundos
+app.config['LOGIN_INTENTOS_USUARIO'] = int(os.getenv("LOGIN_INTENTOS_USUARIO", 5))
+app.config['LOGIN_INTENTOS_IP'] = int(os.getenv("LOGIN_INTENTOS_IP", 20))
+app.config['LOGIN_SEGUNDOS_POR_INTENTO'] = float(os.getenv("LOGIN_SEGUNDOS_POR_INTENTO", 60))
+# Archivo SQLite para compartir los límites entre workers (vacío: en memoria de cada proceso)
+app.config['LOGIN_LIMITE_ARCHIVO'] = os.getenv("LOGIN_LIMITE_ARCHIVO", "")
+
+# Aplicar al arrancar las migraciones pendientes (si no, el arranque falla y hay que
+# ejecutar `flask migraciones aplicar`)
+app.config['MIGRACIONES_AUTOMATICAS'] = os.getenv("MIGRACIONES_AUTOMATICAS", "0") == "1"
+
+# Filas por transacción en la importación masiva de colaboradores
+app.config['IMPORTACION_LOTE'] = int(os.getenv("IMPORTACION_LOTE", 500))
+
+# Consultas que tardan más de estos segundos se registran con su EXPLAIN (0: no registrar)
+app.config['MYSQL_CONSULTA_LENTA'] = float(os.getenv("MYSQL_CONSULTA_LENTA", 0.5))
+# Consultas por petición antes de avisar (0: sin límite); en modo estricto o en pruebas la petición falla
+app.config['MYSQL_PRESUPUESTO_CONSULTAS'] = int(os.getenv("MYSQL_PRESUPUESTO_CONSULTAS", 30))
+app.config['MYSQL_PRESUPUESTO_ESTRICTO'] = os.getenv("MYSQL_PRESUPUESTO_ESTRICTO", "0") == "1"
+
+# Token para leer /metrics y /estado/pool (Authorization: Bearer ...); vacío: acceso libre
+app.config['METRICAS_TOKEN'] = os.getenv("METRICAS_TOKEN", "")
+
+# Métricas por petición (se registra primero para medir también los demás hooks)
+metricas = Metricas(app)
+# Compresión de las respuestas y caché de larga duración de los archivos estáticos
+compresion = Compresion(app, minimo=app.config['COMPRESION_MINIMO'])
+estaticos = EstaticosVersionados(app, max_age=app.config['ESTATICOS_MAX_AGE'])
+
+# Inicializar la base de datos: MySQL (pool de conexiones y lecturas de solo consulta
+# hacia la réplica, con respaldo en el maestro) o SQLite embebida
+if app.config['BASE_DATOS'] == 'sqlite':
+    bd = BackendSQLite(app.config['SQLITE_RUTA'], app)
+else:
+    bd = BackendMySQL(app)
+metricas.instrumentar(bd)
+# Todas las consultas de la aplicación, iguales para ambos motores
+repositorio = Repositorio(bd)
+# Versiones de las tablas y caché de datos de referencia
+versiones = VersionesDatos(repositorio, intervalo=app.config['CACHE_INTERVALO_VERSIONES'])
+referencias = CacheReferencia(repositorio, versiones, ttl=app.config['CACHE_REFERENCIA_TTL'])
+# Tabla directorio (un contacto por fila, sin JOINs al leer), mantenida en cada escritura
+directorio = DirectorioMaterializado(bd)
+# Hash y verificación de contraseñas fuera del hilo de la petición, con capacidad limitada
+hasheador = Hasheador(
+    costo=app.config['BCRYPT_COSTO'],
+    hilos=app.config['BCRYPT_HILOS'],
+    max_pendientes=app.config['BCRYPT_MAX_PENDIENTES'],
+    timeout=app.config['BCRYPT_TIMEOUT'],
+    observar=metricas.observar_bcrypt,
+)
+# Límite de intentos de login guardado en el servidor (no en la cookie del cliente)
+limitador_login = LimitadorIntentos(
+    AlmacenSQLite(app.config['LOGIN_LIMITE_ARCHIVO']) if app.config['LOGIN_LIMITE_ARCHIVO'] else AlmacenMemoria(),
+    segundos_por_intento=app.config['LOGIN_SEGUNDOS_POR_INTENTO'],
+)
+
+@app.errorhandler(PoolAgotado)
+def pool_agotado(e):
+    return 'Servidor ocupado, intente nuevamente en unos segundos.', 503
+
+@app.errorhandler(HasheadorOcupado)
+def hasheador_ocupado(e):
+    return 'Servidor ocupado, intente nuevamente en unos segundos.', 503, {'Retry-After': '2'}
 
 def wait_for_db():
     """Esperar a que la base de datos esté disponible"""
@@ -24,9 +164,7 @@ def wait_for_db():
     while retry_count < max_retries:
         try:
             with app.app_context():
-                cur = mysql.connection.cursor()
-                cur.execute("SELECT 1")
-                cur.close()
+                repositorio.comprobar_conexion()
                 print("✅ Conexión a la base de datos establecida")
                 return True
         except Exception as e:
@@ -36,194 +174,208 @@ def wait_for_db():
     
     raise Exception("❌ No se pudo conectar a la base de datos después de varios intentos")
 
-def init_db():
-    """Inicializar las tablas de la base de datos"""
+def metricas_autorizadas():
+    """True si la petición trae el token de METRICAS_TOKEN (o no hay token configurado)"""
+    token = app.config['METRICAS_TOKEN']
+    return not token or request.headers.get('Authorization') == f'Bearer {token}'
+
+# Mismos datos que /metrics en JSON; requiere el mismo token
+@app.route('/estado/pool')
+def estado_pool():
+    if not metricas_autorizadas():
+        return 'No autorizado', 401
+    return jsonify(dict(bd.estadisticas(), bcrypt=hasheador.estadisticas()))
+
+# Estadísticas que ya llevan el pool, las cachés y bcrypt, leídas al exponer /metrics
+@metricas.recolector
+def metricas_estado():
+    # Sin pools con SQLite
+    pools = bd.estadisticas()
+    caches = {'referencias': referencias, 'paginas': paginas}
+    bcrypt = hasheador.estadisticas()
+    return [
+        ('pool_conexiones', 'gauge', 'Conexiones del pool por estado', [
+            ({'servidor': servidor, 'estado': estado}, datos[estado])
+            for servidor, datos in pools.items() for estado in ('abiertas', 'ociosas', 'en_uso', 'maximo')
+        ]),
+        ('pool_eventos_total', 'counter', 'Préstamos, esperas, timeouts y conexiones creadas o descartadas', [
+            ({'servidor': servidor, 'evento': evento}, datos[evento])
+            for servidor, datos in pools.items()
+            for evento in ('prestamos', 'esperas', 'timeouts', 'creadas', 'descartadas', 'verificaciones_fallidas')
+        ]),
+        ('pool_espera_segundos_total', 'counter', 'Tiempo total esperando una conexión del pool', [
+            ({'servidor': servidor}, datos['tiempo_espera_total']) for servidor, datos in pools.items()
+        ]),
+        ('replica_retraso_segundos', 'gauge', 'Último retraso de replicación medido', [
+            ({}, pools['replica']['retraso']),
+        ] if 'replica' in pools else []),
+        ('cache_aciertos_total', 'counter', 'Lecturas servidas desde la caché', [
+            ({'cache': nombre}, cache.aciertos) for nombre, cache in caches.items()
+        ]),
+        ('cache_fallos_total', 'counter', 'Lecturas que no estaban en la caché', [
+            ({'cache': nombre}, cache.fallos) for nombre, cache in caches.items()
+        ]),
+        ('cache_paginas_bytes', 'gauge', 'Bytes comprimidos en la caché de páginas', [
+            ({}, paginas.estadisticas()['bytes']),
+        ]),
+        ('bcrypt_en_uso', 'gauge', 'Hashes bcrypt calculándose o en espera', [({}, bcrypt['en_uso'])]),
+        ('bcrypt_rechazados_total', 'counter', 'Logins rechazados con 503 por falta de capacidad', [
+            ({}, bcrypt['rechazados']),
+        ]),
+    ]
+
+@app.route('/metrics')
+def exponer_metricas():
+    if not metricas_autorizadas():
+        return 'No autorizado', 401
+    return Response(metricas.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# --------------------------------------Esquema de la base de datos----------------------------------------------------------------------
+
+# Migraciones en migraciones/NNNN_*.sql; se aplican con `flask migraciones aplicar`
+migrador = Migrador(bd)
+
+def verificar_esquema():
+    """Comprobar que el esquema está al día (una consulta a version_esquema)"""
     with app.app_context():
-        cur = mysql.connection.cursor()
-        
-        # Crear tabla de usuarios
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Crear tabla de áreas
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS areas (
-                ID_AREAS INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
-                AREA VARCHAR(100) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Crear tabla de departamentos
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS departamentos (
-                ID_DEPARTAMENTOS INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
-                DEPARTAMENTO VARCHAR(100) NOT NULL
-            )
-        """)
-
-        # Crear tabla de ubicaciones
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS ubicaciones (
-                ID_UBICACIONES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
-                DESCRIPCION VARCHAR(150) NOT NULL,
-                GEOLOCALIZACION VARCHAR(100) NOT NULL,
-                DIRECCION VARCHAR(100) NOT NULL
-            )
-        """)
-
-        # Crear tabla de cargos relacionada con áreas y departamentos
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS cargos (
-                ID_CARGOS INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
-                DESCRIPCION VARCHAR(150) NOT NULL,
-                AREA INT DEFAULT NULL,
-                DEPARTAMENTO INT DEFAULT NULL,
-                KEY AREA (AREA),
-                KEY DEPARTAMENTO (DEPARTAMENTO),
-                CONSTRAINT cargos_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
-                CONSTRAINT cargos_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS)
-            )
-        """)
-
-        # Crear tabla de colaboradores relacionada con áreas, departamentos, cargos y ubicaciones
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS colaboradores (
-                ID_COLABORADORES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
-                NOMBRE VARCHAR(100) NOT NULL,
-                DEPARTAMENTO INT DEFAULT NULL,
-                AREA INT DEFAULT NULL,
-                CARGO INT DEFAULT NULL,
-                UBICACION INT DEFAULT NULL,
-                KEY NOMBRE (NOMBRE),
-                KEY DEPARTAMENTO (DEPARTAMENTO),
-                KEY AREA (AREA),
-                KEY CARGO (CARGO),
-                KEY UBICACION (UBICACION),
-                CONSTRAINT colaboradores_ibfk_1 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
-                CONSTRAINT colaboradores_ibfk_2 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
-                CONSTRAINT colaboradores_ibfk_3 FOREIGN KEY (CARGO) REFERENCES cargos (ID_CARGOS),
-                CONSTRAINT colaboradores_ibfk_4 FOREIGN KEY (UBICACION) REFERENCES ubicaciones (ID_UBICACIONES)
-            )
-        """)
-
-
-        # Crear tabla de extensiones relacionada con áreas, departamentos y colaboradores (por ID)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS extensiones (
-                ID_EXTENSIONES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
-                ID_COLABORADOR INT NOT NULL,
-                EXTENSION INT NOT NULL,
-                AREA INT DEFAULT NULL,
-                DEPARTAMENTO INT DEFAULT NULL,
-                KEY AREA (AREA),
-                KEY DEPARTAMENTO (DEPARTAMENTO),
-                KEY ID_COLABORADOR (ID_COLABORADOR),
-                CONSTRAINT extensiones_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
-                CONSTRAINT extensiones_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
-                CONSTRAINT extensiones_ibfk_3 FOREIGN KEY (ID_COLABORADOR) REFERENCES colaboradores (ID_COLABORADORES)
-            )
-        """)
-
-        # Crear tabla de celulares relacionada con áreas, departamentos y colaboradores (por ID)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS celulares (
-                ID_CELULARES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
-                ID_COLABORADOR INT NOT NULL,
-                CELULAR BIGINT NOT NULL,
-                AREA INT NOT NULL,
-                DEPARTAMENTO INT NOT NULL,
-                KEY AREA (AREA),
-                KEY DEPARTAMENTO (DEPARTAMENTO),
-                KEY ID_COLABORADOR (ID_COLABORADOR),
-                CONSTRAINT celulares_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
-                CONSTRAINT celulares_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
-                CONSTRAINT celulares_ibfk_3 FOREIGN KEY (ID_COLABORADOR) REFERENCES colaboradores (ID_COLABORADORES)
-            )
-        """)
-
-        # Crear tabla de correos relacionada con áreas, departamentos y colaboradores (por ID)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS correos (
-                ID_CORREOS INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
-                ID_COLABORADOR INT NOT NULL,
-                CORREO VARCHAR(50) NOT NULL,
-                AREA INT NOT NULL,
-                DEPARTAMENTO INT NOT NULL,
-                KEY AREA (AREA),
-                KEY DEPARTAMENTO (DEPARTAMENTO),
-                KEY ID_COLABORADOR (ID_COLABORADOR),
-                CONSTRAINT correos_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
-                CONSTRAINT correos_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
-                CONSTRAINT correos_ibfk_3 FOREIGN KEY (ID_COLABORADOR) REFERENCES colaboradores (ID_COLABORADORES)
-            )
-        """)
-        
-        
-        
-        mysql.connection.commit()
-        cur.close()
+        try:
+            migrador.verificar()
+        except EsquemaDesactualizado as e:
+            if not app.config['MIGRACIONES_AUTOMATICAS']:
+                raise
+            print(f"🔧 {e}. Aplicando...")
+            migrador.aplicar()
+        print("✅ Esquema de la base de datos al día")
+
+@app.cli.group()
+def migraciones():
+    """Migraciones del esquema de la base de datos"""
+
+@migraciones.command('estado')
+def migraciones_estado():
+    """Mostrar la versión actual y las migraciones pendientes"""
+    click.echo(f'Versión actual: {migrador.version_actual()}')
+    for migracion in migrador.pendientes():
+        click.echo(f'Pendiente: {migracion.version:04d}_{migracion.nombre}')
+
+@migraciones.command('aplicar')
+@click.option('--simular', is_flag=True, help='Mostrar las sentencias sin ejecutarlas.')
+def migraciones_aplicar(simular):
+    """Aplicar las migraciones pendientes en orden"""
+    aplicadas = migrador.aplicar(simular=simular, informar=click.echo)
+    if not aplicadas:
+        click.echo('El esquema ya está al día.')
+
+# --------------------------------------Caché de datos de referencia----------------------------------------------------------------------
+
+@referencias.registrar('areas')
+def cargar_areas(cur):
+    return repositorio.listar_areas(cur)
+
+@referencias.registrar('departamentos')
+def cargar_departamentos(cur):
+    return repositorio.listar_departamentos(cur)
+
+@referencias.registrar('cargos')
+def cargar_cargos(cur):
+    return repositorio.listar_cargos(cur)
+
+@referencias.registrar('ubicaciones')
+def cargar_ubicaciones(cur):
+    return repositorio.listar_ubicaciones(cur)
+
+@referencias.registrar('colaboradores_info', tablas=('colaboradores', 'cargos', 'areas', 'departamentos'))
+def cargar_colaboradores_info(cur):
+    """Colaboradores con el área y departamento de su cargo, ordenados por nombre"""
+    return tuple(InfoColaborador(*row) for row in repositorio.listar_colaboradores_info(cur))
+
+@referencias.registrar('sugerencias', tablas=('colaboradores', 'cargos', 'areas', 'departamentos'))
+def cargar_sugerencias(cur):
+    """Índice ordenado de nombres para el autocompletado de colaboradores"""
+    return IndiceSugerencias(cargar_colaboradores_info(cur))
+
+def cargar_entradas_busqueda(ids):
+    """Colaboradores con todos sus contactos para el índice de búsqueda (todos si ids es None)"""
+    with repositorio.consulta(maestro=True) as cur:
+        colaboradores = repositorio.colaboradores_busqueda(cur, ids)
+        filas = repositorio.contactos_de(cur, ids, con_id=True)
+    contactos = {tipo: {} for tipo in TIPOS_CONTACTO}
+    for tipo, valores in filas.items():
+        for id_colaborador, contacto in valores:
+            contactos[tipo].setdefault(id_colaborador, []).append(contacto)
+    return [
+        Entrada(id, nombre, area, departamento,
+                contactos['extensiones'].get(id, ()), contactos['celulares'].get(id, ()), contactos['correos'].get(id, ()))
+        for id, nombre, area, departamento in colaboradores
+    ]
+
+# Índice de búsqueda del directorio (se construye en la primera búsqueda)
+buscador = ServicioBusqueda(
+    versiones, cargar_entradas_busqueda,
+    tablas=('colaboradores', 'extensiones', 'celulares', 'correos', 'cargos', 'areas', 'departamentos'),
+    ttl=app.config['BUSQUEDA_TTL'],
+)
+# Páginas públicas del directorio (index, vextensiones, vcelulares, vcorreos, vdirectorio)
+paginas = CachePaginas(
+    versiones,
+    tablas=('colaboradores', 'extensiones', 'celulares', 'correos', 'cargos', 'areas', 'departamentos', 'ubicaciones'),
+    max_bytes=app.config['CACHE_PAGINAS_MAX_BYTES'],
+    ttl=app.config['CACHE_PAGINAS_TTL'],
+)
+
+def registrar_cambio(*tablas, colaboradores=()):
+    """Invalidar en todos los procesos las cachés que dependen de las tablas modificadas
+
+    ``colaboradores``: IDs cuyos datos o contactos cambiaron, para actualizar el
+    índice de búsqueda de este proceso sin reconstruirlo.
+    """
+    referencias.invalidar(*tablas)
+    paginas.invalidar(*tablas)
+    versiones.incrementar(*tablas)
+    if colaboradores:
+        buscador.reindexar(tablas, colaboradores)
 
 @app.route('/')
 def index():
-    cur = mysql.connection.cursor()
-    cur.execute("""
-        SELECT e.ID_EXTENSIONES, c.NOMBRE, e.EXTENSION, a.AREA, d.DEPARTAMENTO, e.AREA, e.DEPARTAMENTO, e.ID_COLABORADOR
-        FROM extensiones e
-        LEFT JOIN colaboradores c ON e.ID_COLABORADOR = c.ID_COLABORADORES
-        LEFT JOIN areas a ON e.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON e.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY c.NOMBRE
-    """)
-    extensiones = cur.fetchall()
-    cur.close()
-    return render_template('DTelefonico/VExtensiones/Extensiones.html', extensiones=extensiones)
+    return vextensiones()
     
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        # Límite de intentos por sesión
-        if 'login_attempts' not in session:
-            session['login_attempts'] = 0
-        import time
-        bloqueado = False
-        if session.get('login_blocked_until'):
-            if time.time() < session['login_blocked_until']:
-                bloqueado = True
-        if session['login_attempts'] >= 5 or bloqueado:
-            if not bloqueado:
-                session['login_blocked_until'] = time.time() + 5*60
-            restante = int(session['login_blocked_until'] - time.time())
-            minutos = restante // 60
-            segundos = restante % 60
-            flash(f'Has superado el límite de intentos. Intenta nuevamente en {minutos}m {segundos}s.', 'danger')
-            return render_template('Login/login.html')
         if not username or not password:
             flash('Por favor, complete todos los campos', 'error')
             return render_template('Login/login.html')
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT id, username, password_hash FROM usuarios WHERE username = %s", (username,))
-        user = cur.fetchone()
-        cur.close()
-        if user and bcrypt.checkpw(password.encode('utf-8'), user[2].encode('utf-8')):
+        # Límite de intentos por usuario y por IP, antes de consultar la base o calcular hashes
+        clave_usuario = 'usuario:' + username.strip().lower()
+        clave_ip = 'ip:' + (request.remote_addr or '')
+        espera, intentos_restantes = limitador_login.intentar({
+            clave_usuario: app.config['LOGIN_INTENTOS_USUARIO'],
+            clave_ip: app.config['LOGIN_INTENTOS_IP'],
+        })
+        if espera:
+            restante = int(espera) + 1
+            minutos = restante // 60
+            segundos = restante % 60
+            flash(f'Has superado el límite de intentos. Intenta nuevamente en {minutos}m {segundos}s.', 'danger')
+            return render_template('Login/login.html'), 429
+        with repositorio.consulta(maestro=True) as cur:
+            user = repositorio.usuario_por_nombre(cur, username)
+        correcta, nuevo_hash = hasheador.verificar(password, user[2]) if user else (False, None)
+        if correcta:
+            if nuevo_hash:
+                # El costo configurado cambió: guardar el hash recalculado
+                with repositorio.escritura() as cur:
+                    repositorio.actualizar_hash(cur, user[0], nuevo_hash)
             session['user_id'] = user[0]
             session['username'] = user[1]
-            session['login_attempts'] = 0
-            session.pop('login_blocked_until', None)
+            # Solo los intentos fallidos cuentan: varias personas pueden compartir la IP (NAT, proxy)
+            limitador_login.reiniciar(clave_usuario)
+            limitador_login.devolver({clave_ip: app.config['LOGIN_INTENTOS_IP']})
             flash('Inicio de sesión exitoso', 'success')
             return redirect(url_for('menu'))
         else:
-            session['login_attempts'] += 1
-            intentos_restantes = 5 - session['login_attempts']
             flash(f'Usuario o contraseña incorrectos. Intentos restantes: {intentos_restantes}', 'error')
         return render_template('Login/login.html')
     # Limpiar mensajes flash previos (de otras vistas) al mostrar el login
@@ -257,23 +409,19 @@ def register():
             return render_template('Login/register.html')
         
         # Verificar si el usuario ya existe
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT id FROM usuarios WHERE username = %s OR email = %s", (username, email))
-        existing_user = cur.fetchone()
+        with repositorio.consulta(maestro=True) as cur:
+            existing_user = repositorio.usuario_existe(cur, username, email)
         
         if existing_user:
             flash('El usuario o email ya existe', 'error')
-            cur.close()
             return render_template('Login/register.html')
         
         # Crear hash de la contraseña
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hasheador.hashear(password)
         
         # Insertar nuevo usuario
-        cur.execute("INSERT INTO usuarios (username, email, password_hash) VALUES (%s, %s, %s)", 
-                   (username, email, password_hash))
-        mysql.connection.commit()
-        cur.close()
+        with repositorio.escritura() as cur:
+            repositorio.usuarios.insertar(cur, (username, email, password_hash))
         
         flash('Usuario registrado exitosamente', 'success')
         return redirect(url_for('login'))
@@ -294,58 +442,401 @@ def logout():
 
  # --------------------------------------Directorio Telefonico----------------------------------------------------------------------
 
+# Vistas del directorio: todas leen la tabla materializada ``directorio`` (ver
+# directorio.py), una fila por contacto con el área y el departamento del cargo
+# del colaborador ya resueltos. ``tablas`` son las de origen (para el ETag).
+DIRECTORIO = {
+    'extensiones': {
+        'tablas': ('extensiones', 'colaboradores', 'cargos', 'areas', 'departamentos'),
+        'campo': 'extension',
+        'numerico': True,
+    },
+    'celulares': {
+        'tablas': ('celulares', 'colaboradores', 'cargos', 'areas', 'departamentos'),
+        'campo': 'celular',
+        'numerico': True,
+    },
+    'correos': {
+        'tablas': ('correos', 'colaboradores', 'cargos', 'areas', 'departamentos'),
+        'campo': 'correo',
+        'numerico': False,
+    },
+}
+
+def codificar_cursor(nombre, id):
+    return base64.urlsafe_b64encode(json.dumps([nombre, id]).encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(token):
+    """Posición (nombre, id) de la última fila vista, o None si el token no es válido"""
+    try:
+        nombre, id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        return str(nombre), int(id)
+    except (ValueError, TypeError, UnicodeError):
+        return None
+
+def limite_pagina(args, filtros):
+    """Filas por página pedidas (acotadas); se conserva en los filtros si no es la de siempre"""
+    limite = args.get('limite', app.config['DIRECTORIO_LIMITE'], type=int)
+    limite = max(1, min(limite, app.config['DIRECTORIO_LIMITE_MAX']))
+    if limite != app.config['DIRECTORIO_LIMITE']:
+        filtros['limite'] = limite
+    return limite
+
+def criterios_pagina(args, campo=None):
+    """Criterios de una página del directorio a partir de la query string
+
+    Filtros: ``nombre`` (cada palabra inicia una palabra del nombre), el
+    ``campo`` de contacto (coincidencia parcial), ``area`` y ``departamento``
+    (ID). La paginación es por keyset sobre (NOMBRE, ID): el parámetro
+    ``despues`` indica la última fila de la página anterior, así cada página
+    cuesta lo mismo sin importar cuántas filas haya antes.
+    Devuelve (criterios para el repositorio, filas por página, filtros aplicados).
+    """
+    criterios = {}
+    filtros = {}
+    nombre = args.get('nombre', '').strip()
+    if nombre:
+        criterios['nombre'] = filtros['nombre'] = nombre
+    if campo:
+        valor = args.get(campo, '').strip()
+        if valor:
+            criterios['valor'] = filtros[campo] = valor
+    for filtro in ('area', 'departamento'):
+        id_filtro = args.get(filtro, type=int)
+        if id_filtro:
+            criterios[filtro] = filtros[filtro] = id_filtro
+    criterios['despues'] = decodificar_cursor(args.get('despues', ''))
+    limite = limite_pagina(args, filtros)
+    return criterios, limite, filtros
+
+def consultar_directorio(tipo, args):
+    """Filtrar y paginar una vista del directorio (ver ``criterios_pagina``)
+
+    Devuelve (filas, token de la página siguiente o None, filtros aplicados).
+    """
+    criterios, limite, filtros = criterios_pagina(args, DIRECTORIO[tipo]['campo'])
+    with repositorio.consulta() as cur:
+        # Una fila extra indica si existe una página siguiente
+        filas = repositorio.pagina_directorio(cur, tipo, criterios, limite)
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = codificar_cursor(filas[-1][1], filas[-1][0])
+    return filas, siguiente, filtros
+
+def directorio_json(tipo, filas, siguiente):
+    campo = DIRECTORIO[tipo]['campo']
+    # En ``directorio`` el valor es texto; extensiones y celulares se siguen enviando como números
+    numerico = DIRECTORIO[tipo]['numerico']
+    return {
+        tipo: [
+            {'id': f[0], 'nombre': f[1], campo: int(f[2]) if numerico else f[2],
+             'area': f[3], 'departamento': f[4], 'id_colaborador': f[5]}
+            for f in filas
+        ],
+        'siguiente': siguiente,
+    }
+
+def replica_puede_estar_atrasada():
+    """True si los datos cambiaron hace menos del retraso que se tolera en la réplica"""
+    if not app.config['MYSQL_REPLICA_HOST']:
+        return False
+    modificado = versiones.ultima_modificacion(*paginas.tablas)
+    return modificado is not None and time.time() - modificado.timestamp() < app.config['MYSQL_REPLICA_MAX_RETRASO']
+
+def pagina_publica(generar):
+    """Servir una vista pública desde la caché de páginas (solo visitantes anónimos)
+
+    La clave es la ruta más la query string. La página se guarda
+    precomprimida (ver ``Compresion.variantes``) y se envía tal cual con la
+    codificación que acepte el cliente.
+    """
+    if 'user_id' in session:
+        return generar()
+    clave = (request.path, request.query_string)
+    pagina = paginas.obtener(clave)
+    if pagina is None:
+        # Versión leída antes de consultar: si cambia mientras tanto, la página nace vencida
+        version = paginas.version()
+        respuesta = app.make_response(generar())
+        if respuesta.status_code != 200:
+            return respuesta
+        pagina = (compresion.variantes(respuesta.get_data()), respuesta.content_type)
+        # Una página leída de una réplica atrasada quedaría guardada con datos viejos
+        if not replica_puede_estar_atrasada():
+            paginas.guardar(clave, version, *pagina)
+    variantes, content_type = pagina
+    codificacion = compresion.elegir()
+    if codificacion:
+        respuesta = Response(variantes[codificacion], content_type=content_type)
+        respuesta.content_encoding = codificacion
+    else:
+        respuesta = Response(gzip.decompress(variantes['gzip']), content_type=content_type)
+    respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+def vista_directorio(tipo, plantilla):
+    def generar():
+        filas, siguiente, filtros = consultar_directorio(tipo, request.args)
+        if request.args.get('formato') == 'json':
+            return jsonify(directorio_json(tipo, filas, siguiente))
+        return render_template(plantilla, siguiente=siguiente, filtros=filtros,
+                               areas=referencias.obtener('areas'),
+                               departamentos=referencias.obtener('departamentos'),
+                               **{tipo: filas})
+    return pagina_publica(generar)
+
 # Ruta para mostrar la vista de extensiones
 @app.route('/vextensiones')
 def vextensiones():
-    cur = mysql.connection.cursor()
-    cur.execute("""
-        SELECT e.ID_EXTENSIONES, col.NOMBRE, e.EXTENSION, a.AREA, d.DEPARTAMENTO, e.ID_COLABORADOR
-        FROM extensiones e
-        LEFT JOIN colaboradores col ON e.ID_COLABORADOR = col.ID_COLABORADORES
-        LEFT JOIN areas a ON col.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON col.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY col.NOMBRE
-    """)
-    extensiones = cur.fetchall()
-    cur.close()
-    return render_template('DTelefonico/VExtensiones/Extensiones.html', extensiones=extensiones)
+    return vista_directorio('extensiones', 'DTelefonico/VExtensiones/Extensiones.html')
 
 # Ruta para mostrar la vista de celulares
 @app.route('/vcelulares')
 def vcelulares():
-    cur = mysql.connection.cursor()
-    cur.execute("""
-        SELECT c.ID_CELULARES, col.NOMBRE, c.CELULAR, a.AREA, d.DEPARTAMENTO, c.ID_COLABORADOR
-        FROM celulares c
-        LEFT JOIN colaboradores col ON c.ID_COLABORADOR = col.ID_COLABORADORES
-        LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY col.NOMBRE
-    """)
-    celulares = cur.fetchall()
-    cur.close()
-    return render_template('DTelefonico/VCelulares/Celulares.html', celulares=celulares)
+    return vista_directorio('celulares', 'DTelefonico/VCelulares/Celulares.html')
 
 @app.route('/vcorreos')
 def vcorreos():
-    cur = mysql.connection.cursor()
-    cur.execute("""
-        SELECT c.ID_CORREOS, col.NOMBRE, c.CORREO, a.AREA, d.DEPARTAMENTO, c.ID_COLABORADOR
-        FROM correos c
-        LEFT JOIN colaboradores col ON c.ID_COLABORADOR = col.ID_COLABORADORES
-        LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY col.NOMBRE
-    """)
-    correos = cur.fetchall()
+    return vista_directorio('correos', 'DTelefonico/VCorreos/Correos.html')
+
+
+ # --------------------------------------Directorio por colaborador----------------------------------------------------------------------
+
+TABLAS_FICHAS = ('colaboradores', 'cargos', 'areas', 'departamentos', 'ubicaciones', 'extensiones', 'celulares', 'correos')
+
+def consultar_fichas(args):
+    """Página de colaboradores, cada uno una vez con todos sus contactos
+
+    Filtros ``nombre``, ``area`` y ``departamento`` (ID, los del cargo) y
+    paginación como en ``criterios_pagina``. Cuesta cuatro consultas por
+    página: los colaboradores y una por cada tipo de contacto de los de esa página.
+    Devuelve (fichas, token de la página siguiente o None, filtros aplicados).
+    """
+    criterios, limite, filtros = criterios_pagina(args)
+    with repositorio.consulta() as cur:
+        filas = repositorio.pagina_fichas(cur, criterios, limite)
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            siguiente = codificar_cursor(filas[-1][1], filas[-1][0])
+        fichas = {}
+        for id, nombre, cargo, area, departamento, ubicacion in filas:
+            fichas[id] = {
+                'id': id, 'nombre': nombre, 'cargo': cargo, 'area': area,
+                'departamento': departamento, 'ubicacion': ubicacion,
+                'extensiones': [], 'celulares': [], 'correos': [],
+            }
+        if fichas:
+            for tipo, valores in repositorio.contactos_de(cur, list(fichas)).items():
+                for id_colaborador, valor in valores:
+                    fichas[id_colaborador][tipo].append(valor)
+    return list(fichas.values()), siguiente, filtros
+
+# Ruta para mostrar el directorio agrupado por colaborador
+@app.route('/vdirectorio')
+def vdirectorio():
+    def generar():
+        fichas, siguiente, filtros = consultar_fichas(request.args)
+        if request.args.get('formato') == 'json':
+            return jsonify({'colaboradores': fichas, 'siguiente': siguiente})
+        return render_template('DTelefonico/VDirectorio/Directorio.html',
+                               colaboradores=fichas, siguiente=siguiente, filtros=filtros,
+                               areas=referencias.obtener('areas'),
+                               departamentos=referencias.obtener('departamentos'))
+    return pagina_publica(generar)
+
+def casos_explain():
+    """Consultas representativas del directorio (las mismas que arman las vistas) para EXPLAIN"""
+    despues = {'despues': codificar_cursor('M', 1)}
+    casos = []
+    for tipo in DIRECTORIO:
+        campo = DIRECTORIO[tipo]['campo']
+        for args in ({}, despues, {'nombre': 'maria'}, {'area': '1'}, {'departamento': '1'}, {campo: '12'}):
+            criterios, limite, _ = criterios_pagina(MultiDict(args), campo)
+            casos.append((f'{tipo} {args}', repositorio.sql_pagina_directorio(tipo, criterios, limite)))
+    for args in ({}, despues, {'nombre': 'maria'}, {'area': '1'}):
+        criterios, limite, _ = criterios_pagina(MultiDict(args))
+        casos.append((f'directorio {args}', repositorio.sql_pagina_fichas(criterios, limite)))
+    return casos
+
+@app.cli.command('explicar')
+def explicar_consultas():
+    """Mostrar el plan (EXPLAIN) de las consultas del directorio y marcar recorridos completos y filesorts"""
+    if bd.nombre != 'mysql':
+        raise click.ClickException('El análisis de planes solo está disponible con MySQL (BASE_DATOS=mysql).')
+    cur = bd.connection.cursor(MySQLdb.cursors.DictCursor)
+    problemas = 0
+    for nombre, (sql, parametros) in casos_explain():
+        cur.execute("EXPLAIN " + sql, parametros)
+        click.echo(nombre)
+        for paso in cur.fetchall():
+            extra = paso.get('Extra') or ''
+            alerta = paso['type'] == 'ALL' or 'filesort' in extra
+            problemas += alerta
+            click.echo(f"  {'⚠' if alerta else ' '} {paso['table']:<14} type={paso['type']:<8} "
+                       f"key={paso['key'] or '-':<22} rows={paso['rows']:<8} {extra}")
     cur.close()
-    return render_template('DTelefonico/VCorreos/Correos.html', correos=correos)
-
-
-
-
+    click.echo(f'{problemas} pasos con recorrido completo o filesort')
+
+@app.cli.group('directorio')
+def directorio_cli():
+    """Mantenimiento de la tabla materializada directorio"""
+
+@directorio_cli.command('reconstruir')
+def directorio_reconstruir():
+    """Volver a llenar la tabla directorio desde las tablas de origen"""
+    inicio = time.monotonic()
+    filas = directorio.reconstruir()
+    registrar_cambio(*TIPOS_CONTACTO)
+    for tipo, cantidad in filas.items():
+        click.echo(f'{tipo}: {cantidad} filas')
+    click.echo(f'Reconstruido en {time.monotonic() - inicio:.1f} s')
+
+@directorio_cli.command('verificar')
+@click.option('--reparar', is_flag=True, help='Volver a calcular las filas distintas.')
+def directorio_verificar(reparar):
+    """Comparar la tabla directorio con las tablas de origen"""
+    diferencias = directorio.verificar()
+    if not diferencias:
+        click.echo('La tabla directorio coincide con las tablas de origen.')
+        return
+    for tipo, ids in diferencias.items():
+        muestra = ', '.join(str(id) for id in ids[:20])
+        click.echo(f'{tipo}: {len(ids)} contactos distintos ({muestra}{", ..." if len(ids) > 20 else ""})')
+    if not reparar:
+        raise click.ClickException('La tabla directorio no coincide; use --reparar o `flask directorio reconstruir`.')
+    directorio.reparar(diferencias)
+    registrar_cambio(*diferencias)
+    click.echo('Filas reparadas.')
+
+
+ # --------------------------------------API del directorio----------------------------------------------------------------------
+
+def respuesta_condicional(tablas, generar):
+    """Responder 304 si el cliente ya tiene la versión actual de los datos
+
+    El ETag se deriva de la versión de las tablas consultadas (ver
+    ``VersionesDatos``) y de la URL, así que se calcula sin consultar los
+    datos; ``generar`` solo se llama cuando hay que enviar una respuesta nueva.
+    """
+    version = versiones.version(*tablas)
+    etag = hashlib.sha1(repr((request.path, request.query_string, version)).encode('utf-8')).hexdigest()
+    modificado = versiones.ultima_modificacion(*tablas)
+    if request.if_none_match:
+        # Comparación débil: el ETag se marca débil si la respuesta se comprime
+        vigente = request.if_none_match.contains_weak(etag)
+    else:
+        vigente = bool(modificado and request.if_modified_since and modificado <= request.if_modified_since)
+    respuesta = Response(status=304) if vigente else generar()
+    respuesta.set_etag(etag)
+    if modificado:
+        respuesta.last_modified = modificado
+    # Los clientes pueden guardar la respuesta pero deben revalidarla en cada uso
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+def api_directorio(tipo):
+    def generar():
+        filas, siguiente, _ = consultar_directorio(tipo, request.args)
+        return jsonify(directorio_json(tipo, filas, siguiente))
+    return respuesta_condicional(DIRECTORIO[tipo]['tablas'], generar)
+
+@app.route('/api/extensiones')
+def api_extensiones():
+    return api_directorio('extensiones')
+
+@app.route('/api/celulares')
+def api_celulares():
+    return api_directorio('celulares')
+
+@app.route('/api/correos')
+def api_correos():
+    return api_directorio('correos')
+
+@app.route('/api/directorio')
+def api_directorio_colaboradores():
+    def generar():
+        fichas, siguiente, _ = consultar_fichas(request.args)
+        return jsonify({'colaboradores': fichas, 'siguiente': siguiente})
+    return respuesta_condicional(TABLAS_FICHAS, generar)
+
+# Búsqueda por nombre, extensión, celular o correo (sin tildes, por prefijo y aproximada)
+@app.route('/api/buscar')
+def api_buscar():
+    consulta = request.args.get('q', '').strip()
+    limite = max(1, min(request.args.get('limite', 10, type=int), 50))
+    resultados = buscador.buscar(consulta, limite) if consulta else []
+    return jsonify({
+        'consulta': consulta,
+        'resultados': [dict(entrada.como_dict(), puntaje=round(puntaje, 3)) for entrada, puntaje in resultados],
+    })
+
+
+
+
+
+
+ # --------------------------------------Exportación del directorio----------------------------------------------------------------------
+
+COLUMNAS_EXPORTACION = ('ID', 'NOMBRE', 'CARGO', 'AREA', 'DEPARTAMENTO', 'UBICACION', 'EXTENSIONES', 'CELULARES', 'CORREOS')
+
+class _Linea:
+    """Destino de csv.writer que devuelve la línea escrita en lugar de guardarla"""
+
+    def write(self, texto):
+        return texto
+
+def exportar_csv(filas):
+    escritor = csv.writer(_Linea())
+    # BOM para que Excel reconozca las tildes
+    yield '\ufeff' + escritor.writerow(COLUMNAS_EXPORTACION)
+    for fila in filas:
+        yield escritor.writerow(['' if valor is None else valor for valor in fila])
+
+def exportar_jsonl(filas):
+    claves = [columna.lower() for columna in COLUMNAS_EXPORTACION]
+    for fila in filas:
+        yield json.dumps(dict(zip(claves, fila)), ensure_ascii=False) + '\n'
+
+def exportar_xlsx(filas):
+    """Libro XLSX escrito en modo solo escritura a un archivo temporal y enviado por partes
+
+    El formato ZIP de XLSX solo se puede cerrar al final, así que el envío
+    empieza cuando terminan las filas; la memoria sigue sin depender de su número.
+    """
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Directorio')
+    hoja.append(COLUMNAS_EXPORTACION)
+    for fila in filas:
+        hoja.append(fila)
+    with tempfile.TemporaryFile() as temporal:
+        libro.save(temporal)
+        temporal.seek(0)
+        while True:
+            bloque = temporal.read(64 * 1024)
+            if not bloque:
+                break
+            yield bloque
+
+FORMATOS_EXPORTACION = {
+    'csv': (exportar_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (exportar_jsonl, 'application/x-ndjson; charset=utf-8'),
+    'xlsx': (exportar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Directorio completo para RR. HH. y la central telefónica (?formato=csv|jsonl|xlsx)
+@app.route('/export/directorio')
+def exportar_directorio():
+    formato = request.args.get('formato', 'csv').lower()
+    if formato not in FORMATOS_EXPORTACION:
+        return f'Formato no soportado: {formato}. Use csv, jsonl o xlsx.', 400
+    if formato == 'xlsx' and openpyxl is None:
+        return 'La exportación a XLSX requiere openpyxl.', 501
+    generar, content_type = FORMATOS_EXPORTACION[formato]
+    respuesta = Response(stream_with_context(generar(repositorio.filas_exportacion())), content_type=content_type)
+    respuesta.headers['Content-Disposition'] = f'attachment; filename=directorio.{formato}'
+    return respuesta
 
 
  # --------------------------------------CRUD de áreas----------------------------------------------------------------------
@@ -354,7 +845,6 @@ def vcorreos():
 def crud_areas():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Crear
     if request.method == 'POST':
         area = request.form.get('area')
@@ -362,15 +852,14 @@ def crud_areas():
             if area.isdigit():
                 flash('El nombre del área no puede ser solo números.', 'danger')
             else:
-                cur.execute("INSERT INTO areas (AREA) VALUES (%s)", (area,))
-                mysql.connection.commit()
+                with repositorio.escritura() as cur:
+                    repositorio.areas.insertar(cur, (area,))
+                registrar_cambio('areas')
                 flash('Área agregada correctamente.', 'success')
         else:
             flash('El campo área es obligatorio.', 'danger')
     # Leer
-    cur.execute("SELECT ID_AREAS, AREA FROM areas ORDER BY AREA")
-    areas = cur.fetchall()
-    cur.close()
+    areas = referencias.obtener('areas')
     return render_template('Areas/CRUD_Areas.html', areas=areas)
 
 # Editar área
@@ -385,10 +874,10 @@ def editar_area(id):
     if area.isdigit():
         flash('El nombre del área no puede ser solo números.', 'danger')
         return redirect(url_for('crud_areas'))
-    cur = mysql.connection.cursor()
-    cur.execute("UPDATE areas SET AREA = %s WHERE ID_AREAS = %s", (area, id))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.areas.actualizar(cur, id, (area,))
+        directorio.actualizar_area(cur, id)
+    registrar_cambio('areas')
     flash('Área editada correctamente.', 'success')
     return redirect(url_for('crud_areas'))
 
@@ -397,14 +886,13 @@ def editar_area(id):
 def eliminar_area(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     try:
-        cur.execute("DELETE FROM areas WHERE ID_AREAS = %s", (id,))
-        mysql.connection.commit()
+        with repositorio.escritura() as cur:
+            repositorio.areas.eliminar(cur, id)
+        registrar_cambio('areas')
         flash('Área eliminada exitosamente.', 'success')
     except Exception as e:
         flash('No se puede eliminar esta área porque está ligada a otros datos.', 'danger')
-    cur.close()
     return redirect(url_for('crud_areas'))
 
 
@@ -414,7 +902,6 @@ def eliminar_area(id):
 def departamentos():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Crear
     if request.method == 'POST':
         departamento = request.form.get('departamento')
@@ -422,15 +909,14 @@ def departamentos():
             if departamento.isdigit():
                 flash('El nombre del departamento no puede ser solo números.', 'danger')
             else:
-                cur.execute("INSERT INTO departamentos (DEPARTAMENTO) VALUES (%s)", (departamento,))
-                mysql.connection.commit()
+                with repositorio.escritura() as cur:
+                    repositorio.departamentos.insertar(cur, (departamento,))
+                registrar_cambio('departamentos')
                 flash('Departamento agregado correctamente.', 'success')
         else:
             flash('El campo departamento es obligatorio.', 'danger')
     # Leer
-    cur.execute("SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos ORDER BY DEPARTAMENTO")
-    departamentos = cur.fetchall()
-    cur.close()
+    departamentos = referencias.obtener('departamentos')
     return render_template('Departamentos/CRUD_Departamentos.html', departamentos=departamentos)
 
 # Editar departamento
@@ -445,10 +931,10 @@ def editar_departamento(id):
     if departamento.isdigit():
         flash('El nombre del departamento no puede ser solo números.', 'danger')
         return redirect(url_for('departamentos'))
-    cur = mysql.connection.cursor()
-    cur.execute("UPDATE departamentos SET DEPARTAMENTO = %s WHERE ID_DEPARTAMENTOS = %s", (departamento, id))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.departamentos.actualizar(cur, id, (departamento,))
+        directorio.actualizar_departamento(cur, id)
+    registrar_cambio('departamentos')
     flash('Departamento editado correctamente.', 'success')
     return redirect(url_for('departamentos'))
 
@@ -457,14 +943,13 @@ def editar_departamento(id):
 def eliminar_departamento(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     try:
-        cur.execute("DELETE FROM departamentos WHERE ID_DEPARTAMENTOS = %s", (id,))
-        mysql.connection.commit()
+        with repositorio.escritura() as cur:
+            repositorio.departamentos.eliminar(cur, id)
+        registrar_cambio('departamentos')
         flash('Departamento eliminado exitosamente.', 'success')
     except Exception as e:
         flash('No se puede eliminar este departamento porque está ligado a otros datos.', 'danger')
-    cur.close()
     return redirect(url_for('departamentos'))
 
 
@@ -473,19 +958,17 @@ def eliminar_departamento(id):
 def ubicaciones():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Crear
     if request.method == 'POST':
         descripcion = request.form.get('descripcion')
         geolocalizacion = request.form.get('geolocalizacion')
         direccion = request.form.get('direccion')
         if descripcion and geolocalizacion and direccion:
-            cur.execute("INSERT INTO ubicaciones (DESCRIPCION, GEOLOCALIZACION, DIRECCION) VALUES (%s, %s, %s)", (descripcion, geolocalizacion, direccion))
-            mysql.connection.commit()
+            with repositorio.escritura() as cur:
+                repositorio.ubicaciones.insertar(cur, (descripcion, geolocalizacion, direccion))
+            registrar_cambio('ubicaciones')
     # Leer
-    cur.execute("SELECT ID_UBICACIONES, DESCRIPCION, GEOLOCALIZACION, DIRECCION FROM ubicaciones ORDER BY DESCRIPCION")
-    ubicaciones = cur.fetchall()
-    cur.close()
+    ubicaciones = referencias.obtener('ubicaciones')
     return render_template('Ubicaciones/CRUD_Ubicaciones.html', ubicaciones=ubicaciones)
 
 # Editar ubicacion
@@ -496,10 +979,9 @@ def editar_ubicacion(id):
     descripcion = request.form.get('descripcion')
     geolocalizacion = request.form.get('geolocalizacion')
     direccion = request.form.get('direccion')
-    cur = mysql.connection.cursor()
-    cur.execute("UPDATE ubicaciones SET DESCRIPCION = %s, GEOLOCALIZACION = %s, DIRECCION = %s WHERE ID_UBICACIONES = %s", (descripcion, geolocalizacion, direccion, id))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.ubicaciones.actualizar(cur, id, (descripcion, geolocalizacion, direccion))
+    registrar_cambio('ubicaciones')
     return redirect(url_for('ubicaciones'))
 
 # Eliminar ubicacion
@@ -507,14 +989,13 @@ def editar_ubicacion(id):
 def eliminar_ubicacion(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     try:
-        cur.execute("DELETE FROM ubicaciones WHERE ID_UBICACIONES = %s", (id,))
-        mysql.connection.commit()
+        with repositorio.escritura() as cur:
+            repositorio.ubicaciones.eliminar(cur, id)
+        registrar_cambio('ubicaciones')
         flash('Ubicación eliminada exitosamente.', 'success')
     except Exception as e:
         flash('No se puede eliminar esta ubicación porque está ligada a otros datos.', 'danger')
-    cur.close()
     return redirect(url_for('ubicaciones'))
 
 
@@ -523,12 +1004,9 @@ def eliminar_ubicacion(id):
 def crud_cargos():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Obtener áreas y departamentos para los selects
-    cur.execute("SELECT ID_AREAS, AREA FROM areas ORDER BY AREA")
-    areas = cur.fetchall()
-    cur.execute("SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos ORDER BY DEPARTAMENTO")
-    departamentos = cur.fetchall()
+    areas = referencias.obtener('areas')
+    departamentos = referencias.obtener('departamentos')
     # Crear
     if request.method == 'POST':
         descripcion = request.form.get('descripcion')
@@ -539,19 +1017,13 @@ def crud_cargos():
         elif descripcion.isdigit():
             flash('El nombre del cargo no puede ser solo números.', 'danger')
         else:
-            cur.execute("INSERT INTO cargos (DESCRIPCION, AREA, DEPARTAMENTO) VALUES (%s, %s, %s)", (descripcion, area, departamento))
-            mysql.connection.commit()
+            with repositorio.escritura() as cur:
+                repositorio.cargos.insertar(cur, (descripcion, area, departamento))
+            registrar_cambio('cargos')
             flash('Cargo agregado correctamente.', 'success')
     # Leer
-    cur.execute("""
-        SELECT c.ID_CARGOS, c.DESCRIPCION, a.AREA, d.DEPARTAMENTO, c.AREA, c.DEPARTAMENTO
-        FROM cargos c
-        LEFT JOIN areas a ON c.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON c.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY c.DESCRIPCION
-    """)
-    cargos = cur.fetchall()
-    cur.close()
+    with repositorio.consulta() as cur:
+        cargos = repositorio.listar_cargos_detalle(cur)
     return render_template('Cargos/CRUD_Cargos.html', cargos=cargos, areas=areas, departamentos=departamentos)
 
 # Editar cargo
@@ -568,10 +1040,10 @@ def editar_cargo(id):
     if descripcion.isdigit():
         flash('El nombre del cargo no puede ser solo números.', 'danger')
         return redirect(url_for('crud_cargos'))
-    cur = mysql.connection.cursor()
-    cur.execute("UPDATE cargos SET DESCRIPCION = %s, AREA = %s, DEPARTAMENTO = %s WHERE ID_CARGOS = %s", (descripcion, area, departamento, id))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.cargos.actualizar(cur, id, (descripcion, area, departamento))
+        directorio.actualizar_cargo(cur, id)
+    registrar_cambio('cargos')
     flash('Cargo editado correctamente.', 'success')
     return redirect(url_for('crud_cargos'))
 
@@ -580,14 +1052,13 @@ def editar_cargo(id):
 def eliminar_cargo(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     try:
-        cur.execute("DELETE FROM cargos WHERE ID_CARGOS = %s", (id,))
-        mysql.connection.commit()
+        with repositorio.escritura() as cur:
+            repositorio.cargos.eliminar(cur, id)
+        registrar_cambio('cargos')
         flash('Cargo eliminado exitosamente.', 'success')
     except Exception as e:
         flash('No se puede eliminar este cargo porque está ligado a otros datos.', 'danger')
-    cur.close()
     return redirect(url_for('crud_cargos'))
 
 
@@ -596,20 +1067,15 @@ def eliminar_cargo(id):
 def crud_colaboradores():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Obtener áreas, departamentos, cargos y ubicaciones para los selects
-    cur.execute("SELECT ID_AREAS, AREA FROM areas ORDER BY AREA")
-    areas = cur.fetchall()
-    cur.execute("SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos ORDER BY DEPARTAMENTO")
-    departamentos = cur.fetchall()
-    cur.execute("SELECT ID_CARGOS, DESCRIPCION, AREA, DEPARTAMENTO FROM cargos ORDER BY DESCRIPCION")
-    cargos = cur.fetchall()
+    areas = referencias.obtener('areas')
+    departamentos = referencias.obtener('departamentos')
+    cargos = referencias.obtener('cargos')
     # Para JS: lista de objetos {id, nombre, area, departamento}
     cargos_info = [
         {"id": c[0], "nombre": c[1], "area": c[2], "departamento": c[3]} for c in cargos
     ]
-    cur.execute("SELECT ID_UBICACIONES, DESCRIPCION FROM ubicaciones ORDER BY DESCRIPCION")
-    ubicaciones = cur.fetchall()
+    ubicaciones = referencias.obtener('ubicaciones')
     # Crear
     if request.method == 'POST':
         nombre = request.form.get('nombre')
@@ -621,27 +1087,15 @@ def crud_colaboradores():
             flash('Todos los campos son obligatorios.', 'danger')
         else:
             try:
-                cur.execute("INSERT INTO colaboradores (NOMBRE, DEPARTAMENTO, AREA, CARGO, UBICACION) VALUES (%s, %s, %s, %s, %s)",
-                            (nombre, departamento, area, cargo, ubicacion))
-                mysql.connection.commit()
+                with repositorio.escritura() as cur:
+                    id = repositorio.colaboradores.insertar(cur, (nombre, departamento, area, cargo, ubicacion))
+                registrar_cambio('colaboradores', colaboradores=[id])
                 flash('Colaborador agregado exitosamente.', 'success')
             except Exception as e:
-                mysql.connection.rollback()
                 flash('Error al agregar colaborador: ' + str(e), 'danger')
     # Leer
-    cur.execute("""
-        SELECT col.ID_COLABORADORES, col.NOMBRE,
-               d.DEPARTAMENTO, a.AREA, c.DESCRIPCION, u.DESCRIPCION,
-               c.DEPARTAMENTO, c.AREA, col.CARGO, col.UBICACION
-        FROM colaboradores col
-        LEFT JOIN cargos c ON col.CARGO = c.ID_CARGOS
-        LEFT JOIN areas a ON c.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON c.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        LEFT JOIN ubicaciones u ON col.UBICACION = u.ID_UBICACIONES
-        ORDER BY col.NOMBRE
-    """)
-    colaboradores = cur.fetchall()
-    cur.close()
+    with repositorio.consulta() as cur:
+        colaboradores = repositorio.listar_colaboradores(cur)
     return render_template('Colaboradores/CRUD_Colaboradores.html', colaboradores=colaboradores, areas=areas, departamentos=departamentos, cargos=cargos, ubicaciones=ubicaciones, cargos_info=cargos_info)
 
 # Editar colaborador
@@ -664,38 +1118,24 @@ def editar_colaborador(id):
         flash('El nombre del colaborador no puede ser solo números.', 'danger')
         return redirect(url_for('crud_colaboradores'))
 
-    # Si cargo no es un número (ID), buscar el ID por nombre
+    # Si cargo no es un número (ID), buscar el ID por nombre en la caché de cargos
     if not cargo.isdigit():
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT ID_CARGOS FROM cargos WHERE DESCRIPCION = %s", (cargo,))
-        cargo_row = cur.fetchone()
-        if cargo_row:
-            cargo = str(cargo_row[0])
+        cargo_id = next((c[0] for c in referencias.obtener('cargos') if c[1] == cargo), None)
+        if cargo_id is not None:
+            cargo = str(cargo_id)
         else:
-            cur.close()
             flash('El cargo seleccionado no es válido.', 'danger')
             return redirect(url_for('crud_colaboradores'))
-        cur.close()
 
-    cur = mysql.connection.cursor()
     try:
-        # Obtener el nombre anterior del colaborador
-        cur.execute("SELECT NOMBRE FROM colaboradores WHERE ID_COLABORADORES = %s", (id,))
-        old_row = cur.fetchone()
-        old_nombre = old_row[0] if old_row else None
-        # Si el nombre cambió, actualizar en cascada en las tablas relacionadas
-        if old_nombre and old_nombre != nombre:
-            # Ya no es necesario actualizar NOMBRE en tablas relacionadas, solo en colaboradores
-            pass
-        # Actualizar colaborador
-        cur.execute("UPDATE colaboradores SET NOMBRE = %s, DEPARTAMENTO = %s, AREA = %s, CARGO = %s, UBICACION = %s WHERE ID_COLABORADORES = %s",
-                    (nombre, departamento, area, cargo, ubicacion, id))
-        mysql.connection.commit()
+        # El nombre solo vive en colaboradores (y en directorio, que se recalcula aquí)
+        with repositorio.escritura() as cur:
+            repositorio.colaboradores.actualizar(cur, id, (nombre, departamento, area, cargo, ubicacion))
+            directorio.actualizar_colaboradores(cur, [id])
+        registrar_cambio('colaboradores', colaboradores=[id])
         flash('Colaborador editado correctamente.', 'success')
     except Exception as e:
-        mysql.connection.rollback()
         flash('Error al editar colaborador: ' + str(e), 'danger')
-    cur.close()
     return redirect(url_for('crud_colaboradores'))
 
 # Eliminar colaborador
@@ -703,54 +1143,120 @@ def editar_colaborador(id):
 def eliminar_colaborador(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     try:
-        cur.execute("DELETE FROM colaboradores WHERE ID_COLABORADORES = %s", (id,))
-        mysql.connection.commit()
+        with repositorio.escritura() as cur:
+            repositorio.colaboradores.eliminar(cur, id)
+            directorio.actualizar_colaboradores(cur, [id])
+        registrar_cambio('colaboradores', colaboradores=[id])
         flash('Colaborador eliminado correctamente.', 'success')
     except Exception as e:
-        mysql.connection.rollback()
         # Si es un error de integridad (clave foránea), mostrar alerta amigable
-        if hasattr(e, 'args') and e.args and 'foreign key constraint fails' in str(e.args[1]).lower():
+        if bd.clave_foranea(e):
             flash('No se puede eliminar este colaborador porque está ligado a otros datos.', 'danger')
         else:
             flash('Error al eliminar colaborador: ' + str(e), 'danger')
-    cur.close()
     return redirect(url_for('crud_colaboradores'))
 
+# Colaboradores con su área y departamento en JSON (misma caché que los formularios)
+@app.route('/api/colaboradores')
+def api_colaboradores():
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    return jsonify([col.como_dict() for col in referencias.obtener('colaboradores_info')])
+
+# Autocompletado de colaboradores de los formularios: nombres que empiezan con ``q``
+@app.route('/api/colaboradores/sugerir')
+def api_sugerir_colaboradores():
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    texto = request.args.get('q', '')
+    limite = min(request.args.get('limite', app.config['SUGERENCIAS_LIMITE'], type=int), app.config['SUGERENCIAS_MAX'])
+    def generar():
+        return jsonify([
+            {'id': col.id, 'nombre': col.nombre,
+             'area': {'id': col.area_id or None, 'nombre': col.area_nombre},
+             'departamento': {'id': col.departamento_id or None, 'nombre': col.departamento_nombre}}
+            for col in referencias.obtener('sugerencias').sugerir(texto, max(limite, 1))
+        ])
+    return respuesta_condicional(('colaboradores', 'cargos', 'areas', 'departamentos'), generar)
+
+# --------------------------------------Importación masiva de colaboradores----------------------------------------------------------------------
+
+def importar_colaboradores(archivo, nombre_archivo, simular=False):
+    """Importar un archivo CSV o XLSX de colaboradores con sus contactos
+
+    Columnas: NOMBRE, CARGO, UBICACION y opcionalmente AREA, DEPARTAMENTO (por
+    defecto los del cargo), EXTENSIONES, CELULARES y CORREOS (varios valores
+    separados por punto y coma). Devuelve el ``ImportadorColaboradores`` con
+    los IDs insertados y los errores por fila.
+    """
+    filas = leer_filas(archivo, nombre_archivo)
+    with repositorio.consulta(maestro=True) as cur:
+        correos = repositorio.correos_registrados(cur)
+    importador = ImportadorColaboradores(
+        bd.connection,
+        areas=referencias.obtener('areas'),
+        departamentos=referencias.obtener('departamentos'),
+        cargos=referencias.obtener('cargos'),
+        ubicaciones=referencias.obtener('ubicaciones'),
+        existentes=[col.nombre for col in referencias.obtener('colaboradores_info')],
+        correos=correos,
+        tamano_lote=app.config['IMPORTACION_LOTE'],
+        al_insertar=directorio.actualizar_colaboradores,
+        clave_duplicada=bd.clave_duplicada,
+    )
+    importador.importar(filas, simular=simular)
+    if importador.insertados:
+        registrar_cambio('colaboradores', 'extensiones', 'celulares', 'correos', colaboradores=importador.insertados)
+    return importador
+
+@app.route('/importar', methods=['GET', 'POST'])
+@metricas.presupuesto(None)  # Una inserción por colaborador importado
+def importar():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    resultado = None
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            flash('Seleccione un archivo CSV o XLSX.', 'danger')
+        else:
+            try:
+                resultado = importar_colaboradores(archivo.stream, archivo.filename, simular=bool(request.form.get('simular')))
+            except ErrorImportacion as e:
+                flash(str(e), 'danger')
+            else:
+                if request.form.get('simular'):
+                    flash(f'Validación terminada: {resultado.procesadas - len(resultado.errores)} filas válidas de {resultado.procesadas}.', 'success')
+                else:
+                    flash(f'Importación terminada: {len(resultado.insertados)} colaboradores agregados de {resultado.procesadas} filas.', 'success')
+    return render_template('Importar/Importar.html', resultado=resultado)
+
+@app.cli.command('importar')
+@click.argument('ruta', type=click.Path(exists=True, dir_okay=False))
+@click.option('--simular', is_flag=True, help='Solo validar el archivo, sin guardar nada.')
+def importar_comando(ruta, simular):
+    """Importar colaboradores desde un archivo CSV o XLSX"""
+    inicio = time.monotonic()
+    with open(ruta, 'rb') as archivo:
+        try:
+            resultado = importar_colaboradores(archivo, ruta, simular=simular)
+        except ErrorImportacion as e:
+            raise click.ClickException(str(e))
+    for fila, mensaje in resultado.errores:
+        click.echo(f'Fila {fila}: {mensaje}', err=True)
+    accion = 'válidas' if simular else 'importadas'
+    validas = resultado.procesadas - len(resultado.errores) if simular else len(resultado.insertados)
+    click.echo(f'{validas} de {resultado.procesadas} filas {accion} en {time.monotonic() - inicio:.1f} s')
+
 # --------------------------------------CRUD de extensiones----------------------------------------------------------------------
 @app.route('/extensiones', methods=['GET', 'POST'])
 def crud_extensiones():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Obtener áreas y departamentos para los selects
-    cur.execute("SELECT ID_AREAS, AREA FROM areas ORDER BY AREA")
-    areas = cur.fetchall()
-    cur.execute("SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos ORDER BY DEPARTAMENTO")
-    departamentos = cur.fetchall()
-    # Obtener colaboradores para el autocompletado y su info de área y departamento
-    cur.execute("""
-        SELECT c.ID_COLABORADORES, c.NOMBRE, a.ID_AREAS, a.AREA, d.ID_DEPARTAMENTOS, d.DEPARTAMENTO
-        FROM colaboradores c
-        LEFT JOIN cargos cg ON c.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY c.NOMBRE
-    """)
-    colaboradores_info = []
-    colaboradores = []
-    for row in cur.fetchall():
-        col_id, nombre, area_id, area_nombre, dep_id, dep_nombre = row
-        colaboradores.append({'id': col_id, 'nombre': nombre})
-        colaboradores_info.append({
-            'id': col_id,
-            'nombre': nombre,
-            'area_id': area_id if area_id is not None else '',
-            'area_nombre': area_nombre if area_nombre is not None else '',
-            'departamento_id': dep_id if dep_id is not None else '',
-            'departamento_nombre': dep_nombre if dep_nombre is not None else ''
-        })
+    areas = referencias.obtener('areas')
+    departamentos = referencias.obtener('departamentos')
     # Crear
     if request.method == 'POST':
         id_colaborador = request.form.get('id_colaborador')
@@ -758,21 +1264,14 @@ def crud_extensiones():
         area = request.form.get('area')
         departamento = request.form.get('departamento')
         if id_colaborador and extension:
-            cur.execute("INSERT INTO extensiones (ID_COLABORADOR, EXTENSION, AREA, DEPARTAMENTO) VALUES (%s, %s, %s, %s)", (id_colaborador, extension, area, departamento))
-            mysql.connection.commit()
-    # Leer: mostrar área y departamento actual del colaborador relacionado
-    cur.execute("""
-        SELECT e.ID_EXTENSIONES, c.NOMBRE, e.EXTENSION, a.AREA, d.DEPARTAMENTO, cg.AREA, cg.DEPARTAMENTO, e.ID_COLABORADOR
-        FROM extensiones e
-        LEFT JOIN colaboradores c ON e.ID_COLABORADOR = c.ID_COLABORADORES
-        LEFT JOIN cargos cg ON c.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY c.NOMBRE
-    """)
-    extensiones = cur.fetchall()
-    cur.close()
-    return render_template('Extensiones/CRUD_Extensiones.html', extensiones=extensiones, areas=areas, departamentos=departamentos, colaboradores=colaboradores, colaboradores_info=colaboradores_info)
+            with repositorio.escritura() as cur:
+                id = repositorio.contactos['extensiones'].insertar(cur, (id_colaborador, extension, area, departamento))
+                directorio.actualizar_contactos(cur, 'extensiones', [id])
+            registrar_cambio('extensiones', colaboradores=[id_colaborador])
+    # Leer: mostrar área y departamento actual del cargo del colaborador relacionado
+    with repositorio.consulta() as cur:
+        extensiones = repositorio.listar_contactos(cur, 'extensiones')
+    return render_template('Extensiones/CRUD_Extensiones.html', extensiones=extensiones, areas=areas, departamentos=departamentos)
 
 # Editar extension
 @app.route('/extensiones/editar/<int:id>', methods=['POST'])
@@ -783,10 +1282,10 @@ def editar_extension(id):
     extension = request.form.get('extension')
     area = request.form.get('area')
     departamento = request.form.get('departamento')
-    cur = mysql.connection.cursor()
-    cur.execute("UPDATE extensiones SET ID_COLABORADOR = %s, EXTENSION = %s, AREA = %s, DEPARTAMENTO = %s WHERE ID_EXTENSIONES = %s", (id_colaborador, extension, area, departamento, id))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.contactos['extensiones'].actualizar(cur, id, (id_colaborador, extension, area, departamento))
+        directorio.actualizar_contactos(cur, 'extensiones', [id])
+    registrar_cambio('extensiones', colaboradores=[buscador.colaborador_de('extensiones', id), id_colaborador])
     return redirect(url_for('crud_extensiones'))
 
 # Eliminar extension
@@ -794,10 +1293,10 @@ def editar_extension(id):
 def eliminar_extension(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
-    cur.execute("DELETE FROM extensiones WHERE ID_EXTENSIONES = %s", (id,))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.contactos['extensiones'].eliminar(cur, id)
+        directorio.actualizar_contactos(cur, 'extensiones', [id])
+    registrar_cambio('extensiones', colaboradores=[buscador.colaborador_de('extensiones', id)])
     return redirect(url_for('crud_extensiones'))
 
 # --------------------------------------CRUD de celulares----------------------------------------------------------------------
@@ -805,34 +1304,9 @@ def eliminar_extension(id):
 def crud_celulares():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Obtener áreas y departamentos para los selects
-    cur.execute("SELECT ID_AREAS, AREA FROM areas ORDER BY AREA")
-    areas = cur.fetchall()
-    cur.execute("SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos ORDER BY DEPARTAMENTO")
-    departamentos = cur.fetchall()
-    # Obtener colaboradores para el autocompletado y su info de área y departamento
-    cur.execute("""
-        SELECT c.ID_COLABORADORES, c.NOMBRE, a.ID_AREAS, a.AREA, d.ID_DEPARTAMENTOS, d.DEPARTAMENTO
-        FROM colaboradores c
-        LEFT JOIN cargos cg ON c.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY c.NOMBRE
-    """)
-    colaboradores_info = []
-    colaboradores = []
-    for row in cur.fetchall():
-        col_id, nombre, area_id, area_nombre, dep_id, dep_nombre = row
-        colaboradores.append({'id': col_id, 'nombre': nombre})
-        colaboradores_info.append({
-            'id': col_id,
-            'nombre': nombre,
-            'area_id': area_id if area_id is not None else '',
-            'area_nombre': area_nombre if area_nombre is not None else '',
-            'departamento_id': dep_id if dep_id is not None else '',
-            'departamento_nombre': dep_nombre if dep_nombre is not None else ''
-        })
+    areas = referencias.obtener('areas')
+    departamentos = referencias.obtener('departamentos')
     # Crear
     if request.method == 'POST':
         id_colaborador = request.form.get('id_colaborador')
@@ -841,25 +1315,17 @@ def crud_celulares():
         departamento = request.form.get('departamento')
         if id_colaborador and celular and area and departamento:
             try:
-                cur.execute("INSERT INTO celulares (ID_COLABORADOR, CELULAR, AREA, DEPARTAMENTO) VALUES (%s, %s, %s, %s)", (id_colaborador, celular, area, departamento))
-                mysql.connection.commit()
+                with repositorio.escritura() as cur:
+                    id = repositorio.contactos['celulares'].insertar(cur, (id_colaborador, celular, area, departamento))
+                    directorio.actualizar_contactos(cur, 'celulares', [id])
+                registrar_cambio('celulares', colaboradores=[id_colaborador])
                 flash('Celular agregado correctamente.', 'success')
             except Exception as e:
-                mysql.connection.rollback()
                 flash('Error al agregar celular: ' + str(e), 'danger')
-    # Leer: mostrar área y departamento actual del colaborador relacionado
-    cur.execute("""
-        SELECT c.ID_CELULARES, col.NOMBRE, c.CELULAR, a.AREA, d.DEPARTAMENTO, cg.AREA, cg.DEPARTAMENTO, c.ID_COLABORADOR
-        FROM celulares c
-        LEFT JOIN colaboradores col ON c.ID_COLABORADOR = col.ID_COLABORADORES
-        LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY col.NOMBRE
-    """)
-    celulares = cur.fetchall()
-    cur.close()
-    return render_template('Celulares/CRUD_Celulares.html', celulares=celulares, areas=areas, departamentos=departamentos, colaboradores=colaboradores, colaboradores_info=colaboradores_info)
+    # Leer: mostrar área y departamento actual del cargo del colaborador relacionado
+    with repositorio.consulta() as cur:
+        celulares = repositorio.listar_contactos(cur, 'celulares')
+    return render_template('Celulares/CRUD_Celulares.html', celulares=celulares, areas=areas, departamentos=departamentos)
 
 # Editar celular
 @app.route('/celulares/editar/<int:id>', methods=['POST'])
@@ -870,10 +1336,10 @@ def editar_celular(id):
     celular = request.form.get('celular')
     area = request.form.get('area')
     departamento = request.form.get('departamento')
-    cur = mysql.connection.cursor()
-    cur.execute("UPDATE celulares SET ID_COLABORADOR = %s, CELULAR = %s, AREA = %s, DEPARTAMENTO = %s WHERE ID_CELULARES = %s", (id_colaborador, celular, area, departamento, id))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.contactos['celulares'].actualizar(cur, id, (id_colaborador, celular, area, departamento))
+        directorio.actualizar_contactos(cur, 'celulares', [id])
+    registrar_cambio('celulares', colaboradores=[buscador.colaborador_de('celulares', id), id_colaborador])
     return redirect(url_for('crud_celulares'))
 
 # Eliminar celular
@@ -881,10 +1347,10 @@ def editar_celular(id):
 def eliminar_celular(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
-    cur.execute("DELETE FROM celulares WHERE ID_CELULARES = %s", (id,))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.contactos['celulares'].eliminar(cur, id)
+        directorio.actualizar_contactos(cur, 'celulares', [id])
+    registrar_cambio('celulares', colaboradores=[buscador.colaborador_de('celulares', id)])
     return redirect(url_for('crud_celulares'))
 
 
@@ -893,71 +1359,34 @@ def eliminar_celular(id):
 def crud_correos():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
     # Obtener áreas y departamentos para los selects
-    cur.execute("SELECT ID_AREAS, AREA FROM areas ORDER BY AREA")
-    areas = cur.fetchall()
-    cur.execute("SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos ORDER BY DEPARTAMENTO")
-    departamentos = cur.fetchall()
-    # Obtener colaboradores para el autocompletado y su info de área y departamento
-    cur.execute("""
-        SELECT c.ID_COLABORADORES, c.NOMBRE, a.ID_AREAS, a.AREA, d.ID_DEPARTAMENTOS, d.DEPARTAMENTO
-        FROM colaboradores c
-        LEFT JOIN cargos cg ON c.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY c.NOMBRE
-    """)
-    colaboradores_info = []
-    colaboradores = []
-    for row in cur.fetchall():
-        col_id, nombre, area_id, area_nombre, dep_id, dep_nombre = row
-        colaboradores.append({'id': col_id, 'nombre': nombre})
-        colaboradores_info.append({
-            'id': col_id,
-            'nombre': nombre,
-            'area_id': area_id if area_id is not None else '',
-            'area_nombre': area_nombre if area_nombre is not None else '',
-            'departamento_id': dep_id if dep_id is not None else '',
-            'departamento_nombre': dep_nombre if dep_nombre is not None else ''
-        })
+    areas = referencias.obtener('areas')
+    departamentos = referencias.obtener('departamentos')
     # Crear
     if request.method == 'POST':
         id_colaborador = request.form.get('id_colaborador')
         correo = request.form.get('correo')
         area = request.form.get('area')
         departamento = request.form.get('departamento')
-        import re
-        correo_regex = r'^([A-Za-z][A-Za-z0-9_.+-]*)@((farbiopharma|inpelab)\.com)$'
-        if not correo or '@' not in correo:
-            flash('El correo debe contener el separador @.', 'danger')
-        elif correo.partition('@')[0].isdigit():
-            flash('El nombre de usuario del correo no puede contener solo números.', 'danger')
-        elif correo.partition('@')[2] not in ['farbiopharma.com', 'inpelab.com']:
-            flash('El dominio del correo debe ser farbiopharma.com o inpelab.com.', 'danger')
-        elif not re.match(correo_regex, correo):
-            flash('El formato del correo no es válido.', 'danger')
+        error_correo = validar_correo(correo)
+        if error_correo:
+            flash(error_correo, 'danger')
         elif id_colaborador and correo and area and departamento:
             try:
-                cur.execute("INSERT INTO correos (ID_COLABORADOR, CORREO, AREA, DEPARTAMENTO) VALUES (%s, %s, %s, %s)", (id_colaborador, correo, area, departamento))
-                mysql.connection.commit()
+                with repositorio.escritura() as cur:
+                    id = repositorio.contactos['correos'].insertar(cur, (id_colaborador, correo, area, departamento))
+                    directorio.actualizar_contactos(cur, 'correos', [id])
+                registrar_cambio('correos', colaboradores=[id_colaborador])
                 flash('Correo agregado correctamente.', 'success')
             except Exception as e:
-                mysql.connection.rollback()
-                flash('Error al agregar correo: ' + str(e), 'danger')
+                if bd.clave_duplicada(e):
+                    flash('Este correo ya está registrado.', 'danger')
+                else:
+                    flash('Error al agregar correo: ' + str(e), 'danger')
     # Leer: mostrar área y departamento actual del cargo del colaborador relacionado
-    cur.execute("""
-        SELECT c.ID_CORREOS, col.NOMBRE, c.CORREO, a.AREA, d.DEPARTAMENTO, c.ID_COLABORADOR
-        FROM correos c
-        LEFT JOIN colaboradores col ON c.ID_COLABORADOR = col.ID_COLABORADORES
-        LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
-        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
-        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
-        ORDER BY col.NOMBRE
-    """)
-    correos = cur.fetchall()
-    cur.close()
-    return render_template('Correos/CRUD_Correos.html', correos=correos, areas=areas, departamentos=departamentos, colaboradores=colaboradores, colaboradores_info=colaboradores_info)
+    with repositorio.consulta() as cur:
+        correos = repositorio.listar_contactos(cur, 'correos')
+    return render_template('Correos/CRUD_Correos.html', correos=correos, areas=areas, departamentos=departamentos)
 
 # Editar correo
 @app.route('/correos/editar/<int:id>', methods=['POST'])
@@ -968,27 +1397,22 @@ def editar_correo(id):
     correo = request.form.get('correo')
     area = request.form.get('area')
     departamento = request.form.get('departamento')
-    import re
     # Validación de formato de correo
-    correo_regex = r'^([A-Za-z][A-Za-z0-9_.+-]*)@((farbiopharma|inpelab)\.com)$'
-    if not correo or '@' not in correo:
-        flash('El correo debe contener el separador @.', 'danger')
+    error_correo = validar_correo(correo)
+    if error_correo:
+        flash(error_correo, 'danger')
         return redirect(url_for('crud_correos'))
-    usuario, sep, dominio = correo.partition('@')
-    if usuario.isdigit():
-        flash('El nombre de usuario del correo no puede contener solo números.', 'danger')
-        return redirect(url_for('crud_correos'))
-    if dominio not in ['farbiopharma.com', 'inpelab.com']:
-        flash('El dominio del correo debe ser farbiopharma.com o inpelab.com.', 'danger')
-        return redirect(url_for('crud_correos'))
-    # Validación extra con regex
-    if not re.match(correo_regex, correo):
-        flash('El formato del correo no es válido.', 'danger')
+    try:
+        with repositorio.escritura() as cur:
+            repositorio.contactos['correos'].actualizar(cur, id, (id_colaborador, correo, area, departamento))
+            directorio.actualizar_contactos(cur, 'correos', [id])
+    except bd.Error as e:
+        # El correo es único (índice CORREO)
+        if not bd.clave_duplicada(e):
+            raise
+        flash('Este correo ya está registrado.', 'danger')
         return redirect(url_for('crud_correos'))
-    cur = mysql.connection.cursor()
-    cur.execute("UPDATE correos SET ID_COLABORADOR = %s, CORREO = %s, AREA = %s, DEPARTAMENTO = %s WHERE ID_CORREOS = %s", (id_colaborador, correo, area, departamento, id))
-    mysql.connection.commit()
-    cur.close()
+    registrar_cambio('correos', colaboradores=[buscador.colaborador_de('correos', id), id_colaborador])
     return redirect(url_for('crud_correos'))
 
 # Eliminar correo
@@ -996,18 +1420,220 @@ def editar_correo(id):
 def eliminar_correo(id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    cur = mysql.connection.cursor()
-    cur.execute("DELETE FROM correos WHERE ID_CORREOS = %s", (id,))
-    mysql.connection.commit()
-    cur.close()
+    with repositorio.escritura() as cur:
+        repositorio.contactos['correos'].eliminar(cur, id)
+        directorio.actualizar_contactos(cur, 'correos', [id])
+    registrar_cambio('correos', colaboradores=[buscador.colaborador_de('correos', id)])
     return redirect(url_for('crud_correos'))
 
 
+# --------------------------------------API de edición----------------------------------------------------------------------
+# Alta, modificación y baja en JSON para que las páginas CRUD actualicen solo la fila
+# afectada: se responde con esa fila (ver ``Repositorio.detalle``) o con los errores de
+# validación por campo, sin volver a consultar ni renderizar el listado.
+
+RUTA_ENTIDAD = '/api/<any({}):entidad>'.format(', '.join(ENTIDADES))
+
+def datos_peticion():
+    """Cuerpo JSON de la petición, o el formulario si no se envió JSON"""
+    datos = request.get_json(silent=True)
+    return datos if isinstance(datos, dict) else request.form
+
+def reflejar_escritura(cur, entidad, ids, operacion):
+    """Mantener ``directorio`` en la misma transacción que una escritura ('crear', 'actualizar' o 'eliminar')"""
+    if entidad.nombre in TIPOS_CONTACTO:
+        directorio.actualizar_contactos(cur, entidad.nombre, ids)
+    elif entidad.nombre == 'colaboradores':
+        # Un colaborador nuevo todavía no tiene contactos
+        if operacion != 'crear':
+            directorio.actualizar_colaboradores(cur, ids)
+    elif operacion == 'actualizar':
+        # Las áreas, departamentos y cargos con contactos no se pueden eliminar (clave foránea)
+        actualizar = {
+            'areas': directorio.actualizar_area,
+            'departamentos': directorio.actualizar_departamento,
+            'cargos': directorio.actualizar_cargo,
+        }.get(entidad.nombre)
+        for id in ids if actualizar else ():
+            actualizar(cur, id)
+
+def error_integridad(entidad, error, operacion):
+    """Respuesta para una clave foránea o un valor único repetido en ``operacion``; None si es otro error"""
+    if bd.clave_duplicada(error):
+        return {'error': 'Datos no válidos.', 'errores': entidad.errores_duplicado()}
+    if bd.clave_foranea(error):
+        return {'error': entidad.mensaje_ligado() if operacion == 'eliminar' else 'Alguno de los datos relacionados no existe.'}
+    return None
+
+def escritura_api(nombre, operacion, id=None):
+    """Crear, actualizar o eliminar una fila de la entidad ``nombre`` y responder en JSON
+
+    Cuesta la escritura (con el mantenimiento de ``directorio``) y la lectura
+    de la fila afectada por su ID, en la misma transacción.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    entidad = ENTIDADES[nombre]
+    tabla = entidad.tabla(repositorio)
+    valores = None
+    if operacion != 'eliminar':
+        try:
+            valores = entidad.valores(datos_peticion())
+        except ErrorValidacion as e:
+            return jsonify({'error': 'Datos no válidos.', 'errores': e.errores}), 400
+    colaboradores = []
+    if nombre in TIPOS_CONTACTO:
+        # Dueño anterior y nuevo del contacto, para actualizar el índice de búsqueda
+        colaboradores = [buscador.colaborador_de(nombre, id) if id else None, valores[0] if valores else None]
+    try:
+        with repositorio.escritura() as cur:
+            if operacion == 'crear':
+                id = tabla.insertar(cur, valores)
+            elif operacion == 'actualizar':
+                tabla.actualizar(cur, id, valores)
+            elif not tabla.eliminar(cur, id):
+                return jsonify({'error': 'El registro no existe.'}), 404
+            reflejar_escritura(cur, entidad, [id], operacion)
+            fila = repositorio.detalle(cur, nombre, id) if operacion != 'eliminar' else None
+    except bd.Error as e:
+        detalle = error_integridad(entidad, e, operacion)
+        if detalle is None:
+            raise
+        return jsonify(detalle), 409
+    if operacion == 'actualizar' and fila is None:
+        return jsonify({'error': 'El registro no existe.'}), 404
+    if nombre == 'colaboradores':
+        colaboradores = [id]
+    registrar_cambio(nombre, colaboradores=colaboradores)
+    if operacion == 'eliminar':
+        return jsonify({'id': id})
+    return jsonify(entidad.como_json(fila)), 201 if operacion == 'crear' else 200
+
+@app.route(RUTA_ENTIDAD, methods=['POST'])
+def api_crear(entidad):
+    return escritura_api(entidad, 'crear')
+
+@app.route(RUTA_ENTIDAD + '/<int:id>', methods=['PUT'])
+def api_actualizar(entidad, id):
+    return escritura_api(entidad, 'actualizar', id)
+
+@app.route(RUTA_ENTIDAD + '/<int:id>', methods=['DELETE'])
+def api_eliminar(entidad, id):
+    return escritura_api(entidad, 'eliminar', id)
+
+def es_id(valor):
+    return isinstance(valor, int) and not isinstance(valor, bool) and valor > 0
+
+@app.route(RUTA_ENTIDAD + '/lote', methods=['POST'])
+@metricas.presupuesto(None)  # Si un lote falla se repite fila por fila
+def api_lote(entidad):
+    """Varias ediciones y bajas de una entidad en una sola transacción
+
+    Cuerpo: ``{"actualizar": [{"id": 1, "campo": valor, ...}, ...], "eliminar": [id, ...]}``;
+    en ``actualizar`` solo se cambian los campos indicados. Se aplican primero
+    las ediciones y después las bajas, con un ``executemany`` por cada grupo de
+    ediciones con los mismos campos y otro para las bajas. Los elementos no
+    válidos, inexistentes, bloqueados por una clave foránea o con un valor
+    único repetido se informan en ``fallidos`` sin deshacer los demás.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    entidad = ENTIDADES[entidad]
+    tabla = entidad.tabla(repositorio)
+    datos = request.get_json(silent=True)
+    if isinstance(datos, dict):
+        actualizar = datos.get('actualizar') or []
+        eliminar = datos.get('eliminar') or []
+    if not isinstance(datos, dict) or not isinstance(actualizar, list) or not isinstance(eliminar, list):
+        return jsonify({'error': 'Se esperaba un objeto JSON con las listas "actualizar" y "eliminar".'}), 400
+    if len(actualizar) + len(eliminar) > app.config['LOTE_MAX_OPERACIONES']:
+        return jsonify({'error': f"Un lote admite como máximo {app.config['LOTE_MAX_OPERACIONES']} operaciones."}), 400
+
+    fallidos = []
+    def fallar(operacion, id, **detalle):
+        fallidos.append(dict(detalle, operacion=operacion, id=id))
+
+    # Validar todo antes de escribir; las ediciones se agrupan por los campos que cambian
+    grupos = {}
+    for item in actualizar:
+        id = item.get('id') if isinstance(item, dict) else None
+        if not es_id(id):
+            fallar('actualizar', id, error='ID no válido.')
+            continue
+        try:
+            cambios = entidad.cambios(item)
+        except ErrorValidacion as e:
+            fallar('actualizar', id, errores=e.errores)
+            continue
+        grupos.setdefault(tuple(cambios), []).append((id, tuple(cambios.values())))
+    ids_eliminar = []
+    for id in eliminar:
+        if es_id(id):
+            ids_eliminar.append(id)
+        else:
+            fallar('eliminar', id, error='ID no válido.')
+
+    actualizados = []
+    eliminados = []
+    colaboradores = []
+    with repositorio.escritura() as cur:
+        existentes = tabla.existentes(cur, {id for filas in grupos.values() for id, _ in filas} | set(ids_eliminar))
+        for posiciones, filas in grupos.items():
+            for id, _ in filas:
+                if id not in existentes:
+                    fallar('actualizar', id, error='El registro no existe.')
+            filas = [(id, valores) for id, valores in filas if id in existentes]
+            errores = repositorio.ejecutar_lote(
+                cur, tabla.sql_actualizar([tabla.columnas[p] for p in posiciones]),
+                [valores + (id,) for id, valores in filas])
+            for posicion, (id, valores) in enumerate(filas):
+                if posicion in errores:
+                    fallar('actualizar', id, **error_integridad(entidad, errores[posicion], 'actualizar'))
+                    continue
+                actualizados.append(id)
+                # Nuevo dueño de un contacto reasignado
+                if entidad.nombre in TIPOS_CONTACTO and posiciones[0] == 0:
+                    colaboradores.append(valores[0])
+        for id in ids_eliminar:
+            if id not in existentes:
+                fallar('eliminar', id, error='El registro no existe.')
+        ids_eliminar = [id for id in ids_eliminar if id in existentes]
+        errores = repositorio.ejecutar_lote(cur, tabla.sql_eliminar, [(id,) for id in ids_eliminar])
+        for posicion, id in enumerate(ids_eliminar):
+            if posicion in errores:
+                fallar('eliminar', id, **error_integridad(entidad, errores[posicion], 'eliminar'))
+            else:
+                eliminados.append(id)
+        reflejar_escritura(cur, entidad, actualizados, 'actualizar')
+        reflejar_escritura(cur, entidad, eliminados, 'eliminar')
+
+    if actualizados or eliminados:
+        if entidad.nombre in TIPOS_CONTACTO:
+            colaboradores += [buscador.colaborador_de(entidad.nombre, id) for id in actualizados + eliminados]
+        elif entidad.nombre == 'colaboradores':
+            colaboradores = actualizados + eliminados
+        registrar_cambio(entidad.nombre, colaboradores=colaboradores)
+    return jsonify({'actualizados': actualizados, 'eliminados': eliminados, 'fallidos': fallidos})
+
+
+
+
+def preparar_base_datos():
+    """Esperar a MySQL y verificar el esquema; una sola vez, antes de iniciar los workers"""
+    # La base SQLite embebida se crea con el esquema al día (migraciones/sqlite.sql)
+    if bd.nombre == 'mysql':
+        wait_for_db()
+        verificar_esquema()
+    # Los workers no deben heredar las conexiones abiertas aquí
+    bd.cerrar_todas()
 
+def reiniciar_tras_fork():
+    """Estado por proceso que no se puede compartir con el proceso padre"""
+    bd.reiniciar_tras_fork()
 
 if __name__ == "__main__":
+    # Servidor de desarrollo; en producción se usa gunicorn (ver gunicorn.conf.py y wsgi.py)
     print("🚀 Iniciando servidor Flask...")
-    wait_for_db()
-    init_db()
+    preparar_base_datos()
     print("✅ Servidor listo para recibir conexiones")
-    app.run(host='0.0.0.0', debug=True)
+    app.run(host='0.0.0.0', debug=os.getenv("FLASK_DEBUG", "0") == "1")
@@ -0,0 +1,302 @@
+"""Generador de carga HTTP para el directorio
+
+Recorre las vistas públicas, las APIs, los listados CRUD, la edición, alta y
+baja de extensiones y el login con varios hilos a la vez, y guarda la latencia
+de cada petición. Solo usa la biblioteca estándar: sirve contra cualquier
+servidor (local con MySQL, el contenedor o un doble de pruebas) dada su URL.
+
+    python bench/carga.py --url http://localhost:5000 --concurrencia 16 --duracion 60 \\
+        --guardar resultado.json --comparar bench/base.json
+
+Los escenarios con sesión usan el usuario ``bench`` de ``generar_datos.py``.
+Todas las peticiones salen de la misma IP: para medir el login hay que subir
+LOGIN_INTENTOS_IP y LOGIN_INTENTOS_USUARIO en el servidor, si no se medirán
+respuestas 429.
+"""
+import argparse
+import gzip
+import http.cookiejar
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import informe
+
+PREFIJOS_NOMBRE = ('mar', 'jose', 'ana', 'luis', 'car', 'lu', 'and', 'gar', 'per', 'zam', 'tor', 'vera')
+
+
+class SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    """Medir solo la respuesta 302 de los formularios, no la página a la que redirige"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Cliente:
+    """Un navegador: cookies propias y registro de (escenario, estado, segundos)"""
+
+    def __init__(self, url, tiempo_espera):
+        self.url = url.rstrip('/')
+        self.tiempo_espera = tiempo_espera
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), SinRedirecciones)
+        self.muestras = []
+        self.registrando = False
+
+    def pedir(self, ruta, datos=None):
+        """Devuelve (estado HTTP o 0 si falló la conexión, cuerpo, segundos)"""
+        cuerpo = urllib.parse.urlencode(datos).encode('utf-8') if datos is not None else None
+        peticion = urllib.request.Request(self.url + ruta, data=cuerpo, headers={'Accept-Encoding': 'gzip'})
+        inicio = time.perf_counter()
+        codificacion = None
+        try:
+            with self.opener.open(peticion, timeout=self.tiempo_espera) as respuesta:
+                contenido = respuesta.read()
+                estado = respuesta.status
+                codificacion = respuesta.headers.get('Content-Encoding')
+        except urllib.error.HTTPError as error:
+            contenido = error.read()
+            estado = error.code
+        except OSError:
+            contenido, estado = b'', 0
+        segundos = time.perf_counter() - inicio
+        # Descomprimir fuera del tiempo medido
+        if codificacion == 'gzip':
+            contenido = gzip.decompress(contenido)
+        return estado, contenido, segundos
+
+    def medir(self, escenario, ruta, datos=None):
+        estado, contenido, segundos = self.pedir(ruta, datos)
+        if self.registrando:
+            self.muestras.append((escenario, estado, segundos))
+        return estado, contenido
+
+    def json(self, ruta):
+        estado, contenido, _ = self.pedir(ruta)
+        if estado != 200:
+            raise RuntimeError(f'{ruta} respondió {estado}')
+        return json.loads(contenido)
+
+    def iniciar_sesion(self, usuario, contrasena):
+        estado, _, _ = self.pedir('/login', {'username': usuario, 'password': contrasena})
+        # El login correcto redirige al menú; uno fallido vuelve a mostrar el formulario
+        if estado != 302:
+            raise RuntimeError(f'No se pudo iniciar sesión como {usuario} (estado {estado})')
+
+
+class Datos:
+    """IDs reales leídos una vez antes de la carga, para armar las peticiones"""
+
+    def __init__(self, cliente):
+        self.colaboradores = [c for c in cliente.json('/api/colaboradores') if c['area_id'] != '']
+        self.extensiones = cliente.json('/api/extensiones?limite=1000')['extensiones']
+        self.paginas = []
+        siguiente = cliente.json('/api/extensiones')['siguiente']
+        while siguiente and len(self.paginas) < 20:
+            self.paginas.append(siguiente)
+            siguiente = cliente.json('/api/extensiones?despues=' + urllib.parse.quote(siguiente))['siguiente']
+        if not self.colaboradores or not self.extensiones:
+            raise RuntimeError('La base no tiene datos: ejecute antes bench/generar_datos.py')
+        self.por_id = {c['id']: c for c in self.colaboradores}
+
+
+# --------------------------------------Escenarios----------------------------------------------------------------------
+
+def _consulta(ruta, **parametros):
+    return ruta + '?' + urllib.parse.urlencode(parametros)
+
+def vista_publica(tipo):
+    def escenario(contexto):
+        contexto.anonimo.medir('v' + tipo, '/v' + tipo)
+    return escenario
+
+def vista_filtrada(contexto):
+    contexto.anonimo.medir('vextensiones_nombre', _consulta('/vextensiones', nombre=contexto.aleatorio.choice(PREFIJOS_NOMBRE)))
+
+def vista_pagina(contexto):
+    if contexto.datos.paginas:
+        contexto.anonimo.medir('vextensiones_pagina', _consulta('/vextensiones', despues=contexto.aleatorio.choice(contexto.datos.paginas)))
+
+def vista_directorio(contexto):
+    contexto.anonimo.medir('vdirectorio', '/vdirectorio')
+
+def api_directorio(contexto):
+    tipo = contexto.aleatorio.choice(('extensiones', 'celulares', 'correos'))
+    contexto.anonimo.medir('api_' + tipo, '/api/' + tipo)
+
+def api_buscar(contexto):
+    contexto.anonimo.medir('api_buscar', _consulta('/api/buscar', q=contexto.aleatorio.choice(PREFIJOS_NOMBRE)))
+
+def listado_crud(ruta):
+    def escenario(contexto):
+        contexto.sesion.medir('crud' + ruta.replace('/', '_'), ruta)
+    return escenario
+
+def editar_extension(contexto):
+    # Se vuelve a guardar la extensión con sus mismos datos: la base no cambia
+    extension = contexto.aleatorio.choice(contexto.datos.extensiones)
+    colaborador = contexto.datos.por_id.get(extension['id_colaborador'])
+    if colaborador is None:
+        return
+    contexto.sesion.medir('editar_extension', f"/extensiones/editar/{extension['id']}", {
+        'id_colaborador': colaborador['id'], 'extension': extension['extension'],
+        'area': colaborador['area_id'], 'departamento': colaborador['departamento_id'],
+    })
+
+def crear_eliminar_extension(contexto):
+    colaborador = contexto.aleatorio.choice(contexto.datos.colaboradores)
+    # Valores fuera del rango de generar_datos.py para encontrar la fila creada
+    valor = contexto.aleatorio.randint(100000000, 899999999)
+    contexto.sesion.medir('crear_extension', '/extensiones', {
+        'id_colaborador': colaborador['id'], 'extension': valor,
+        'area': colaborador['area_id'], 'departamento': colaborador['departamento_id'],
+    })
+    estado, contenido = contexto.sesion.medir('api_extensiones_valor', _consulta('/api/extensiones', extension=valor))
+    if estado == 200:
+        for fila in json.loads(contenido)['extensiones']:
+            contexto.sesion.medir('eliminar_extension', f"/extensiones/eliminar/{fila['id']}", {})
+
+def login(contexto):
+    # Un cliente aparte para no cerrar la sesión de los demás escenarios
+    cliente = Cliente(contexto.anonimo.url, contexto.anonimo.tiempo_espera)
+    cliente.registrando = contexto.anonimo.registrando
+    cliente.medir('login', '/login', {'username': contexto.opciones.usuario, 'password': contexto.opciones.contrasena})
+    contexto.anonimo.muestras.extend(cliente.muestras)
+
+# nombre: (grupo, peso, requiere sesión, función)
+ESCENARIOS = {
+    'vextensiones': ('publicas', 10, False, vista_publica('extensiones')),
+    'vcelulares': ('publicas', 5, False, vista_publica('celulares')),
+    'vcorreos': ('publicas', 5, False, vista_publica('correos')),
+    'vextensiones_nombre': ('publicas', 8, False, vista_filtrada),
+    'vextensiones_pagina': ('publicas', 4, False, vista_pagina),
+    'vdirectorio': ('publicas', 4, False, vista_directorio),
+    'api_directorio': ('api', 6, False, api_directorio),
+    'api_buscar': ('api', 8, False, api_buscar),
+    'crud_areas': ('crud', 1, True, listado_crud('/crud_areas')),
+    'crud_departamentos': ('crud', 1, True, listado_crud('/departamentos')),
+    'crud_ubicaciones': ('crud', 1, True, listado_crud('/ubicaciones')),
+    'crud_cargos': ('crud', 1, True, listado_crud('/crud_cargos')),
+    'crud_colaboradores': ('crud', 2, True, listado_crud('/crud_colaboradores')),
+    'crud_extensiones': ('crud', 2, True, listado_crud('/extensiones')),
+    'crud_celulares': ('crud', 1, True, listado_crud('/celulares')),
+    'crud_correos': ('crud', 1, True, listado_crud('/correos')),
+    'editar_extension': ('escritura', 2, True, editar_extension),
+    'crear_eliminar_extension': ('escritura', 1, True, crear_eliminar_extension),
+    'login': ('login', 1, False, login),
+}
+
+
+def seleccionar(nombres):
+    """Escenarios por nombre o por grupo ('publicas', 'api', 'crud', 'escritura', 'login', 'todos')"""
+    elegidos = {}
+    for nombre in nombres.split(','):
+        nombre = nombre.strip()
+        coincidencias = {clave: escenario for clave, escenario in ESCENARIOS.items()
+                         if nombre in ('todos', clave, escenario[0])}
+        if not coincidencias:
+            raise SystemExit(f'Escenario desconocido: {nombre}')
+        elegidos.update(coincidencias)
+    return elegidos
+
+
+# --------------------------------------Ejecución----------------------------------------------------------------------
+
+class Contexto:
+    def __init__(self, opciones, datos, semilla):
+        self.opciones = opciones
+        self.datos = datos
+        self.aleatorio = random.Random(semilla)
+        self.anonimo = Cliente(opciones.url, opciones.tiempo_espera)
+        self.sesion = Cliente(opciones.url, opciones.tiempo_espera)
+
+    @property
+    def muestras(self):
+        return self.anonimo.muestras + self.sesion.muestras
+
+    def registrar(self, activo):
+        self.anonimo.registrando = self.sesion.registrando = activo
+
+
+def trabajador(contexto, escenarios, inicio_medicion, fin, restantes):
+    funciones = [escenario[3] for escenario in escenarios.values()]
+    pesos = [escenario[1] for escenario in escenarios.values()]
+    while time.monotonic() < fin:
+        ahora = time.monotonic()
+        if ahora >= inicio_medicion and not contexto.anonimo.registrando:
+            contexto.registrar(True)
+        if restantes is not None:
+            with restantes['bloqueo']:
+                if restantes['n'] <= 0:
+                    return
+                restantes['n'] -= 1
+        contexto.aleatorio.choices(funciones, pesos)[0](contexto)
+
+
+def ejecutar(opciones, escenarios):
+    preparacion = Cliente(opciones.url, opciones.tiempo_espera)
+    preparacion.iniciar_sesion(opciones.usuario, opciones.contrasena)
+    datos = Datos(preparacion)
+    con_sesion = any(escenario[2] for escenario in escenarios.values())
+    contextos = []
+    for indice in range(opciones.concurrencia):
+        contexto = Contexto(opciones, datos, opciones.semilla + indice)
+        if con_sesion:
+            contexto.sesion.iniciar_sesion(opciones.usuario, opciones.contrasena)
+        contextos.append(contexto)
+
+    restantes = {'n': opciones.peticiones, 'bloqueo': threading.Lock()} if opciones.peticiones else None
+    inicio_medicion = time.monotonic() + opciones.calentamiento
+    fin = inicio_medicion + opciones.duracion if not opciones.peticiones else float('inf')
+    if restantes:
+        # Con un número fijo de iteraciones no hay calentamiento
+        inicio_medicion = time.monotonic()
+    hilos = [threading.Thread(target=trabajador, args=(contexto, escenarios, inicio_medicion, fin, restantes), daemon=True)
+             for contexto in contextos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.monotonic() - inicio_medicion
+    muestras = [muestra for contexto in contextos for muestra in contexto.muestras]
+    return informe.resumir(muestras, duracion), duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concurrencia', type=int, default=8, help='Hilos (clientes) simultáneos')
+    parser.add_argument('--duracion', type=float, default=30, help='Segundos de medición')
+    parser.add_argument('--calentamiento', type=float, default=5, help='Segundos iniciales que no se miden')
+    parser.add_argument('--peticiones', type=int, default=0, help='Iteraciones totales en lugar de --duracion')
+    parser.add_argument('--escenarios', default='publicas,api,crud,escritura',
+                        help=f"Grupos o escenarios separados por comas: {', '.join(ESCENARIOS)}")
+    parser.add_argument('--usuario', default='bench')
+    parser.add_argument('--contrasena', default='bench123')
+    parser.add_argument('--tiempo-espera', type=float, default=30)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--guardar', help='Guardar el resumen en JSON (p. ej. como nueva línea base)')
+    parser.add_argument('--comparar', help='Línea base JSON con la que comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.15, help='Empeoramiento permitido (0.15 = 15 %%)')
+    opciones = parser.parse_args()
+
+    escenarios = seleccionar(opciones.escenarios)
+    resumen, duracion = ejecutar(opciones, escenarios)
+    resultado = informe.resultado(resumen, duracion, url=opciones.url, concurrencia=opciones.concurrencia,
+                                  escenarios=sorted(escenarios))
+    print(informe.tabla(resumen))
+    if opciones.guardar:
+        informe.guardar(resultado, opciones.guardar)
+    if opciones.comparar:
+        regresiones = informe.comparar_archivo(resultado, opciones.comparar, opciones.tolerancia)
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Generar datos sintéticos del directorio para pruebas de carga
+
+Crea áreas, departamentos, cargos y ubicaciones realistas, N colaboradores con
+sus extensiones, celulares y correos, y el usuario ``bench`` para las rutas
+con login. Usa la misma configuración que la aplicación (MYSQL_HOST...) y el
+esquema debe estar al día (``flask migraciones aplicar``). Con
+``BASE_DATOS=sqlite SQLITE_RUTA=bench.db`` llena un archivo SQLite.
+
+    python bench/generar_datos.py --colaboradores 10k --vaciar --semilla 1
+
+Con la misma semilla y tamaño se generan siempre los mismos datos.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, bd, directorio, hasheador, registrar_cambio  # noqa: E402
+
+AREAS = ('Producción', 'Calidad', 'Logística', 'Comercial', 'Finanzas', 'Talento Humano',
+         'Investigación y Desarrollo', 'Tecnología', 'Asuntos Regulatorios', 'Mantenimiento')
+DEPARTAMENTOS = ('Sólidos', 'Líquidos', 'Semisólidos', 'Control de Calidad', 'Aseguramiento de Calidad',
+                 'Bodega', 'Despachos', 'Compras', 'Ventas', 'Marketing', 'Contabilidad', 'Tesorería',
+                 'Nómina', 'Selección', 'Desarrollo Galénico', 'Soporte', 'Infraestructura', 'Registros')
+PUESTOS = ('Jefe', 'Supervisor', 'Analista', 'Asistente', 'Coordinador', 'Operario', 'Técnico', 'Auxiliar')
+UBICACIONES = (
+    ('Planta Quito', '-0.1807,-78.4678', 'Av. Eloy Alfaro N35-09'),
+    ('Oficina Guayaquil', '-2.1700,-79.9224', 'Av. Francisco de Orellana 234'),
+    ('Bodega Cumbayá', '-0.2050,-78.4250', 'Vía Interoceánica km 12'),
+    ('Oficina Cuenca', '-2.9001,-79.0059', 'Av. Solano 4-56'),
+)
+NOMBRES = ('María', 'José', 'Ana', 'Luis', 'Carlos', 'Lucía', 'Jorge', 'Andrea', 'Diego', 'Paola', 'Fernando',
+           'Gabriela', 'Juan', 'Daniela', 'Andrés', 'Verónica', 'Santiago', 'Sofía', 'Pablo', 'Camila',
+           'Miguel', 'Valeria', 'Ricardo', 'Carolina', 'Esteban', 'Natalia', 'Xavier', 'Mónica')
+APELLIDOS = ('García', 'Pérez', 'Rodríguez', 'López', 'Morales', 'Vásquez', 'Castillo', 'Zambrano', 'Torres',
+             'Jaramillo', 'Chávez', 'Mendoza', 'Salazar', 'Cedeño', 'Andrade', 'Ortiz', 'Benítez', 'Peña',
+             'Guerrero', 'Núñez', 'Vera', 'Carrillo', 'Paredes', 'Espinoza', 'Ramírez', 'Cevallos')
+DOMINIOS = ('farbiopharma.com', 'inpelab.com')
+TABLAS = ('areas', 'departamentos', 'cargos', 'ubicaciones', 'colaboradores', 'extensiones', 'celulares', 'correos')
+LOTE = 1000
+
+
+def cantidad(texto):
+    """'10k' -> 10000, '1m' -> 1000000, '500' -> 500"""
+    texto = texto.strip().lower()
+    multiplicador = {'k': 1000, 'm': 1000000}.get(texto[-1:], 1)
+    return int(texto[:-1] if multiplicador > 1 else texto) * multiplicador
+
+
+def _sin_tildes(texto):
+    return texto.translate(str.maketrans('áéíóúñÁÉÍÓÚÑ', 'aeiounAEIOUN')).lower()
+
+
+def _insertar_lotes(cur, sql, filas):
+    for inicio in range(0, len(filas), LOTE):
+        cur.executemany(sql, filas[inicio:inicio + LOTE])
+
+
+def vaciar(cur):
+    # En orden inverso a las claves foráneas
+    for tabla in ('directorio', 'correos', 'celulares', 'extensiones', 'colaboradores',
+                  'cargos', 'ubicaciones', 'departamentos', 'areas'):
+        cur.execute(f"DELETE FROM {tabla}")
+
+
+def generar(total, semilla, contrasena):
+    aleatorio = random.Random(semilla)
+    conn = bd.connection
+    cur = conn.cursor()
+
+    _insertar_lotes(cur, "INSERT INTO areas (AREA) VALUES (%s)", [(a,) for a in AREAS])
+    _insertar_lotes(cur, "INSERT INTO departamentos (DEPARTAMENTO) VALUES (%s)", [(d,) for d in DEPARTAMENTOS])
+    _insertar_lotes(cur, "INSERT INTO ubicaciones (DESCRIPCION, GEOLOCALIZACION, DIRECCION) VALUES (%s, %s, %s)",
+                    list(UBICACIONES))
+    cur.execute("SELECT ID_AREAS FROM areas ORDER BY ID_AREAS DESC LIMIT %s", (len(AREAS),))
+    areas = sorted(fila[0] for fila in cur.fetchall())
+    cur.execute("SELECT ID_DEPARTAMENTOS FROM departamentos ORDER BY ID_DEPARTAMENTOS DESC LIMIT %s", (len(DEPARTAMENTOS),))
+    departamentos = sorted(fila[0] for fila in cur.fetchall())
+    cur.execute("SELECT ID_UBICACIONES FROM ubicaciones ORDER BY ID_UBICACIONES DESC LIMIT %s", (len(UBICACIONES),))
+    ubicaciones = sorted(fila[0] for fila in cur.fetchall())
+
+    # Cada área con dos o tres departamentos y un cargo por puesto en cada uno
+    cargos = []
+    for indice, area in enumerate(areas):
+        for departamento in aleatorio.sample(departamentos, 2 + indice % 2):
+            cargos.extend((f'{puesto} de {AREAS[indice]}', area, departamento) for puesto in PUESTOS)
+    _insertar_lotes(cur, "INSERT INTO cargos (DESCRIPCION, AREA, DEPARTAMENTO) VALUES (%s, %s, %s)", cargos)
+    cur.execute("SELECT ID_CARGOS, AREA, DEPARTAMENTO FROM cargos ORDER BY ID_CARGOS DESC LIMIT %s", (len(cargos),))
+    cargos = sorted(cur.fetchall())
+
+    cur.execute("SELECT COALESCE(MAX(ID_COLABORADORES), 0) FROM colaboradores")
+    ultimo_id = cur.fetchone()[0]
+    colaboradores = []
+    for _ in range(total):
+        nombre = f'{aleatorio.choice(NOMBRES)} {aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}'
+        id_cargo, area, departamento = aleatorio.choice(cargos)
+        colaboradores.append((nombre, departamento, area, id_cargo, aleatorio.choice(ubicaciones)))
+    _insertar_lotes(cur, "INSERT INTO colaboradores (NOMBRE, DEPARTAMENTO, AREA, CARGO, UBICACION) VALUES (%s, %s, %s, %s, %s)",
+                    colaboradores)
+    cur.execute("SELECT ID_COLABORADORES, NOMBRE, AREA, DEPARTAMENTO FROM colaboradores WHERE ID_COLABORADORES > %s "
+                "ORDER BY ID_COLABORADORES", (ultimo_id,))
+    insertados = cur.fetchall()
+
+    # Como en la empresa: casi todos con correo, la mayoría con extensión y pocos con celular
+    extensiones, celulares, correos = [], [], []
+    for id, nombre, area, departamento in insertados:
+        for _ in range(aleatorio.choice((0, 1, 1, 1, 2))):
+            extensiones.append((id, aleatorio.randint(1000, 9999), area, departamento))
+        if aleatorio.random() < 0.3:
+            celulares.append((id, aleatorio.randint(900000000, 999999999), area, departamento))
+        if aleatorio.random() < 0.95:
+            partes = _sin_tildes(nombre).split()
+            correos.append((id, f'{partes[0]}.{partes[2]}{id}@{aleatorio.choice(DOMINIOS)}', area, departamento))
+    _insertar_lotes(cur, "INSERT INTO extensiones (ID_COLABORADOR, EXTENSION, AREA, DEPARTAMENTO) VALUES (%s, %s, %s, %s)", extensiones)
+    _insertar_lotes(cur, "INSERT INTO celulares (ID_COLABORADOR, CELULAR, AREA, DEPARTAMENTO) VALUES (%s, %s, %s, %s)", celulares)
+    _insertar_lotes(cur, "INSERT INTO correos (ID_COLABORADOR, CORREO, AREA, DEPARTAMENTO) VALUES (%s, %s, %s, %s)", correos)
+
+    cur.execute("SELECT id FROM usuarios WHERE username = 'bench'")
+    if cur.fetchone() is None:
+        cur.execute("INSERT INTO usuarios (username, email, password_hash) VALUES (%s, %s, %s)",
+                    ('bench', 'bench@farbiopharma.com', hasheador.hashear(contrasena)))
+    conn.commit()
+    cur.close()
+    return {'colaboradores': len(insertados), 'extensiones': len(extensiones),
+            'celulares': len(celulares), 'correos': len(correos), 'cargos': len(cargos)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--colaboradores', default='1k', help='Cantidad: 1k, 10k, 100k o un número (por defecto 1k)')
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--vaciar', action='store_true', help='Borrar antes TODOS los datos del directorio')
+    parser.add_argument('--contrasena', default='bench123', help='Contraseña del usuario bench')
+    args = parser.parse_args()
+
+    inicio = time.monotonic()
+    with app.app_context():
+        if args.vaciar:
+            cur = bd.connection.cursor()
+            vaciar(cur)
+            bd.connection.commit()
+            cur.close()
+        totales = generar(cantidad(args.colaboradores), args.semilla, args.contrasena)
+        directorio.reconstruir()
+        registrar_cambio(*TABLAS)
+    for tabla, filas in totales.items():
+        print(f'{tabla}: {filas}')
+    print(f'Datos generados en {time.monotonic() - inicio:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
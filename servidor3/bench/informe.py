@@ -0,0 +1,139 @@
+"""Resumen de una prueba de carga y comparación con una línea base
+
+Por escenario: peticiones, errores, peticiones por segundo y latencias p50,
+p95, p99 y máxima en milisegundos. Para comparar dos resultados guardados:
+
+    python bench/informe.py resultado.json --comparar bench/base.json --tolerancia 0.15
+
+Sale con código 1 si algún escenario empeoró más que la tolerancia.
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+
+PERCENTILES = (50, 95, 99)
+# Métricas comparadas con la línea base: en latencia más es peor, en rendimiento menos es peor
+LATENCIAS = tuple(f'p{p}_ms' for p in PERCENTILES)
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    posicion = max(1, math.ceil(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[posicion - 1]
+
+
+def _estadisticas(tiempos, errores, duracion):
+    tiempos = sorted(tiempos)
+    datos = {
+        'peticiones': len(tiempos),
+        'errores': errores,
+        'rps': round(len(tiempos) / duracion, 2) if duracion > 0 else 0.0,
+    }
+    for p in PERCENTILES:
+        datos[f'p{p}_ms'] = round(percentil(tiempos, p) * 1000, 2)
+    datos['max_ms'] = round(tiempos[-1] * 1000, 2) if tiempos else 0.0
+    return datos
+
+
+def resumir(muestras, duracion):
+    """Muestras (escenario, estado HTTP, segundos) -> {escenario: estadísticas}, más el total
+
+    Cuentan como error los estados 0 (sin conexión) y 4xx/5xx.
+    """
+    tiempos, errores = {}, {}
+    for escenario, estado, segundos in muestras:
+        tiempos.setdefault(escenario, []).append(segundos)
+        errores[escenario] = errores.get(escenario, 0) + (estado == 0 or estado >= 400)
+    resumen = {escenario: _estadisticas(tiempos[escenario], errores[escenario], duracion) for escenario in sorted(tiempos)}
+    resumen['TOTAL'] = _estadisticas([segundos for _, _, segundos in muestras], sum(errores.values()), duracion)
+    return resumen
+
+
+def resultado(resumen, duracion, **parametros):
+    """Documento JSON que se guarda: resumen más cómo y dónde se midió"""
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'maquina': platform.node(),
+        'python': platform.python_version(),
+        'duracion_s': round(duracion, 2),
+        'parametros': parametros,
+        'escenarios': resumen,
+    }
+
+
+def tabla(resumen):
+    columnas = ('peticiones', 'errores', 'rps') + LATENCIAS + ('max_ms',)
+    ancho = max(len(escenario) for escenario in resumen) if resumen else 10
+    lineas = [f"{'escenario':<{ancho}}  " + '  '.join(f'{columna:>10}' for columna in columnas)]
+    for escenario, datos in resumen.items():
+        lineas.append(f'{escenario:<{ancho}}  ' + '  '.join(f'{datos[columna]:>10}' for columna in columnas))
+    return '\n'.join(lineas)
+
+
+def guardar(documento, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(documento, archivo, indent=2, ensure_ascii=False)
+        archivo.write('\n')
+
+
+def comparar(actual, base, tolerancia):
+    """Lista de (escenario, métrica, valor base, valor actual, cambio relativo) que empeoraron
+
+    Los escenarios que no están en ambos resultados se ignoran. Un escenario
+    con errores donde la base no tenía también cuenta como regresión.
+    """
+    regresiones = []
+    for escenario, datos in actual['escenarios'].items():
+        anterior = base['escenarios'].get(escenario)
+        if anterior is None:
+            continue
+        for metrica in LATENCIAS:
+            if anterior[metrica] > 0:
+                cambio = datos[metrica] / anterior[metrica] - 1
+                if cambio > tolerancia:
+                    regresiones.append((escenario, metrica, anterior[metrica], datos[metrica], cambio))
+        if anterior['rps'] > 0:
+            cambio = datos['rps'] / anterior['rps'] - 1
+            if cambio < -tolerancia:
+                regresiones.append((escenario, 'rps', anterior['rps'], datos['rps'], cambio))
+        if datos['errores'] and not anterior['errores']:
+            regresiones.append((escenario, 'errores', 0, datos['errores'], math.inf))
+    return regresiones
+
+
+def comparar_archivo(actual, ruta_base, tolerancia):
+    """Comparar con la línea base guardada en ``ruta_base`` e imprimir las regresiones"""
+    with open(ruta_base, encoding='utf-8') as archivo:
+        base = json.load(archivo)
+    if base.get('parametros') != actual.get('parametros'):
+        print('Aviso: la línea base se midió con otros parámetros:', base.get('parametros'))
+    regresiones = comparar(actual, base, tolerancia)
+    if regresiones:
+        print(f'\nRegresiones respecto a {ruta_base} (tolerancia {tolerancia:.0%}):')
+        for escenario, metrica, anterior, valor, cambio in regresiones:
+            print(f'  {escenario} {metrica}: {anterior} -> {valor} ({cambio:+.0%})')
+    else:
+        print(f'\nSin regresiones respecto a {ruta_base} (tolerancia {tolerancia:.0%})')
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('resultado', help='JSON guardado por carga.py --guardar')
+    parser.add_argument('--comparar', help='Línea base JSON')
+    parser.add_argument('--tolerancia', type=float, default=0.15)
+    args = parser.parse_args()
+    with open(args.resultado, encoding='utf-8') as archivo:
+        actual = json.load(archivo)
+    print(tabla(actual['escenarios']))
+    if args.comparar and comparar_archivo(actual, args.comparar, args.tolerancia):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
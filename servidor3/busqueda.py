@@ -0,0 +1,322 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+
+_SEPARADORES = re.compile(r'[^a-z0-9]+')
+
+# Puntaje de un término de la consulta según cómo coincide con el índice
+PUNTAJE_EXACTO = 3.0
+PUNTAJE_PREFIJO = 2.0
+PUNTAJE_APROXIMADO = 1.0
+# Similitud mínima (Jaccard de trigramas) para aceptar una coincidencia aproximada
+SIMILITUD_MINIMA = 0.4
+# Máximo de términos del índice que se expanden por cada prefijo de la consulta
+MAX_EXPANSION_PREFIJO = 500
+
+TIPOS_CONTACTO = ('extensiones', 'celulares', 'correos')
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'José Peña' -> 'jose pena'"""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower()
+
+
+def tokenizar(texto):
+    return [t for t in _SEPARADORES.split(normalizar(texto)) if t]
+
+
+def trigramas(token):
+    relleno = f'  {token} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class Entrada:
+    """Un colaborador con todos sus contactos, tal como se indexa y se devuelve"""
+
+    __slots__ = ('id', 'nombre', 'area', 'departamento', 'extensiones', 'celulares', 'correos')
+
+    def __init__(self, id, nombre, area, departamento, extensiones=(), celulares=(), correos=()):
+        self.id = id
+        self.nombre = nombre
+        self.area = area
+        self.departamento = departamento
+        # Tuplas de (ID del contacto, valor)
+        self.extensiones = tuple(extensiones)
+        self.celulares = tuple(celulares)
+        self.correos = tuple(correos)
+
+    def tokens(self):
+        tokens = set(tokenizar(self.nombre or ''))
+        for tipo in TIPOS_CONTACTO:
+            for _, valor in getattr(self, tipo):
+                tokens.update(tokenizar(valor))
+        return tokens
+
+    def como_dict(self):
+        datos = {'id': self.id, 'nombre': self.nombre, 'area': self.area, 'departamento': self.departamento}
+        for tipo in TIPOS_CONTACTO:
+            datos[tipo] = [valor for _, valor in getattr(self, tipo)]
+        return datos
+
+
+class IndiceBusqueda:
+    """Índice invertido en memoria: término -> colaboradores, más trigramas para búsquedas aproximadas"""
+
+    def __init__(self, entradas=()):
+        self._entradas = {}
+        self._tokens_entrada = {}
+        self._clave_orden = {}
+        self._postings = {}
+        self._ordenados = []
+        self._trigramas = {}
+        self._num_trigramas = {}
+        self._contactos = {}
+        self._lock = threading.RLock()
+        for entrada in entradas:
+            self._agregar(entrada)
+        self._ordenados.sort()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    # --------------------------------------Mantenimiento----------------------------------------------------------------------
+
+    def _agregar(self, entrada, ordenar=False):
+        tokens = entrada.tokens()
+        self._entradas[entrada.id] = entrada
+        self._tokens_entrada[entrada.id] = tokens
+        self._clave_orden[entrada.id] = normalizar(entrada.nombre or '')
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                if ordenar:
+                    bisect.insort(self._ordenados, token)
+                else:
+                    self._ordenados.append(token)
+                # Los números (extensiones, celulares) solo se buscan exactos o por prefijo
+                if not token.isdigit():
+                    tris = trigramas(token)
+                    self._num_trigramas[token] = len(tris)
+                    for trigrama in tris:
+                        self._trigramas.setdefault(trigrama, set()).add(token)
+            ids.add(entrada.id)
+        for tipo in TIPOS_CONTACTO:
+            for id_contacto, _ in getattr(entrada, tipo):
+                self._contactos[(tipo, id_contacto)] = entrada.id
+
+    def _quitar(self, id):
+        entrada = self._entradas.pop(id, None)
+        if entrada is None:
+            return
+        del self._clave_orden[id]
+        for token in self._tokens_entrada.pop(id):
+            ids = self._postings[token]
+            ids.discard(id)
+            if not ids:
+                del self._postings[token]
+                del self._ordenados[bisect.bisect_left(self._ordenados, token)]
+                if self._num_trigramas.pop(token, None) is None:
+                    continue
+                for trigrama in trigramas(token):
+                    tokens = self._trigramas[trigrama]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._trigramas[trigrama]
+        for tipo in TIPOS_CONTACTO:
+            for id_contacto, _ in getattr(entrada, tipo):
+                if self._contactos.get((tipo, id_contacto)) == id:
+                    del self._contactos[(tipo, id_contacto)]
+
+    def reemplazar(self, ids, entradas):
+        """Actualizar de forma incremental los colaboradores ``ids`` con sus nuevas ``entradas``
+
+        Los IDs sin entrada nueva (colaboradores eliminados) se quitan del índice.
+        """
+        with self._lock:
+            for id in ids:
+                self._quitar(id)
+            for entrada in entradas:
+                self._quitar(entrada.id)
+                self._agregar(entrada, ordenar=True)
+
+    def colaborador_de(self, tipo, id_contacto):
+        """ID del colaborador al que pertenece un contacto indexado (o None)"""
+        return self._contactos.get((tipo, id_contacto))
+
+    # --------------------------------------Búsqueda----------------------------------------------------------------------
+
+    def _coincidencias(self, termino):
+        """Puntaje por colaborador para un término de la consulta"""
+        puntajes = {}
+        exactos = self._postings.get(termino)
+        if exactos:
+            for id in exactos:
+                puntajes[id] = PUNTAJE_EXACTO
+        inicio = bisect.bisect_left(self._ordenados, termino)
+        for token in self._ordenados[inicio:inicio + MAX_EXPANSION_PREFIJO]:
+            if not token.startswith(termino):
+                break
+            if token == termino:
+                continue
+            for id in self._postings[token]:
+                if puntajes.get(id, 0) < PUNTAJE_PREFIJO:
+                    puntajes[id] = PUNTAJE_PREFIJO
+        if puntajes or len(termino) < 3:
+            return puntajes
+        # Sin coincidencias exactas ni por prefijo: buscar términos parecidos (errores de tipeo)
+        trigramas_termino = trigramas(termino)
+        compartidos = {}
+        for trigrama in trigramas_termino:
+            for token in self._trigramas.get(trigrama, ()):
+                compartidos[token] = compartidos.get(token, 0) + 1
+        for token, comunes in compartidos.items():
+            similitud = comunes / (len(trigramas_termino) + self._num_trigramas[token] - comunes)
+            if similitud < SIMILITUD_MINIMA:
+                continue
+            puntaje = PUNTAJE_APROXIMADO * similitud
+            for id in self._postings[token]:
+                if puntajes.get(id, 0) < puntaje:
+                    puntajes[id] = puntaje
+        return puntajes
+
+    def buscar(self, consulta, limite=10):
+        """Colaboradores que coinciden con todos los términos, ordenados por relevancia"""
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+        with self._lock:
+            coincidencias = [self._coincidencias(termino) for termino in dict.fromkeys(terminos)]
+            # Intersección empezando por el término más selectivo
+            coincidencias.sort(key=len)
+            total = coincidencias[0]
+            for puntajes in coincidencias[1:]:
+                if not total:
+                    break
+                total = {id: p + puntajes[id] for id, p in total.items() if id in puntajes}
+            if not total:
+                return []
+            # Mayor puntaje primero; a igual puntaje, por nombre
+            por_puntaje = {}
+            for id, puntaje in total.items():
+                por_puntaje.setdefault(puntaje, []).append(id)
+            resultados = []
+            for puntaje in sorted(por_puntaje, reverse=True):
+                ids = heapq.nsmallest(limite - len(resultados), por_puntaje[puntaje], key=self._clave_orden.__getitem__)
+                resultados.extend((self._entradas[id], puntaje) for id in ids)
+                if len(resultados) >= limite:
+                    break
+            return resultados
+
+
+class IndiceSugerencias:
+    """Nombres de colaboradores ordenados para autocompletar por prefijo
+
+    Se indexa el nombre completo y, aparte, desde el comienzo de cada palabra
+    (para encontrar a 'Ana García' escribiendo 'garc'). Primero se sugieren los
+    nombres que empiezan con el texto y después los que lo tienen en otra
+    palabra; cada grupo en orden alfabético. ``colaboradores`` son objetos con
+    ``id`` y ``nombre`` (p. ej. ``InfoColaborador``) y se devuelven tal cual.
+    """
+
+    def __init__(self, colaboradores):
+        self._colaboradores = []
+        self._nombres = []
+        self._palabras = []
+        for colaborador in colaboradores:
+            posicion = len(self._colaboradores)
+            self._colaboradores.append(colaborador)
+            palabras = tokenizar(colaborador.nombre or '')
+            if not palabras:
+                continue
+            self._nombres.append((' '.join(palabras), posicion))
+            for i in range(1, len(palabras)):
+                self._palabras.append((' '.join(palabras[i:]), posicion))
+        self._nombres.sort()
+        self._palabras.sort()
+
+    def __len__(self):
+        return len(self._colaboradores)
+
+    def sugerir(self, texto, limite=10):
+        """Hasta ``limite`` colaboradores cuyo nombre (o alguna palabra) empieza con ``texto``"""
+        prefijo = ' '.join(tokenizar(texto))
+        if not prefijo:
+            return []
+        vistos = set()
+        resultados = []
+        for claves in (self._nombres, self._palabras):
+            for clave, posicion in claves[bisect.bisect_left(claves, (prefijo,)):]:
+                if len(resultados) >= limite or not clave.startswith(prefijo):
+                    break
+                if posicion not in vistos:
+                    vistos.add(posicion)
+                    resultados.append(self._colaboradores[posicion])
+        return resultados
+
+
+class ServicioBusqueda:
+    """Mantiene el índice de búsqueda al día con la base de datos
+
+    ``cargar(ids)`` devuelve las ``Entrada`` de los colaboradores indicados (todos
+    si ``ids`` es None). El índice se reconstruye completo cuando otro proceso
+    cambia alguna de las ``tablas`` (según ``VersionesDatos``) o tras ``ttl``
+    segundos; los cambios hechos en este proceso se aplican de forma incremental
+    con ``reindexar``.
+    """
+
+    def __init__(self, versiones, cargar, tablas, ttl=600):
+        self.versiones = versiones
+        self.cargar = cargar
+        self.tablas = tuple(tablas)
+        self.ttl = ttl
+        self._indice = None
+        self._version = None
+        self._construido_en = 0.0
+        self._lock = threading.Lock()
+
+    def indice(self):
+        version = self.versiones.version(*self.tablas)
+        indice = self._indice
+        if indice is not None and version == self._version and time.monotonic() - self._construido_en < self.ttl:
+            return indice
+        with self._lock:
+            if self._indice is None or self._version != version or time.monotonic() - self._construido_en >= self.ttl:
+                # Se construye aparte y se reemplaza de una vez; las búsquedas en curso usan el anterior
+                self._indice = IndiceBusqueda(self.cargar(None))
+                self._version = version
+                self._construido_en = time.monotonic()
+            return self._indice
+
+    def colaborador_de(self, tipo, id_contacto):
+        indice = self._indice
+        if indice is None:
+            return None
+        return indice.colaborador_de(tipo, int(id_contacto))
+
+    def reindexar(self, tablas, ids):
+        """Volver a indexar colaboradores modificados en este proceso
+
+        ``tablas`` son las que este proceso acaba de incrementar en
+        ``VersionesDatos``. Si además cambió otra cosa (otro proceso escribió
+        desde que se construyó el índice), no se da el índice por vigente y se
+        reconstruye en la próxima búsqueda.
+        """
+        ids = {int(id) for id in ids if str(id).strip().isdigit()}
+        with self._lock:
+            if self._indice is None or not ids:
+                return
+            version = self.versiones.version(*self.tablas)
+            esperada = tuple(v + tablas.count(tabla) for tabla, v in zip(self.tablas, self._version))
+            if version != esperada:
+                return
+            self._indice.reemplazar(ids, self.cargar(ids))
+            self._version = version
+
+    def buscar(self, consulta, limite=10):
+        return self.indice().buscar(consulta, limite)
@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class VersionesDatos:
+    """Versión de cada tabla, compartida entre procesos a través de la base de datos
+
+    Cada escritura incrementa la versión de las tablas afectadas en la tabla
+    ``versiones_datos``. Cada proceso relee esa tabla como mucho cada
+    ``intervalo`` segundos, así los cambios hechos por otros workers se ven
+    con un retraso acotado y sin consultar la base en cada petición.
+    """
+
+    def __init__(self, repositorio, intervalo=2.0):
+        self.repositorio = repositorio
+        self.intervalo = intervalo
+        self._versiones = {}
+        self._modificadas = {}
+        self._leidas_en = 0.0
+        self._lock = threading.Lock()
+
+    def _leer(self):
+        with self.repositorio.consulta(maestro=True) as cur:
+            filas = self.repositorio.leer_versiones(cur)
+        self._versiones = {tabla: version for tabla, version, _ in filas}
+        self._modificadas = {tabla: int(marca) for tabla, _, marca in filas if marca is not None}
+        self._leidas_en = time.monotonic()
+
+    def actuales(self):
+        """Diccionario {tabla: versión}, releído de la base si está vencido"""
+        if time.monotonic() - self._leidas_en >= self.intervalo:
+            with self._lock:
+                if time.monotonic() - self._leidas_en >= self.intervalo:
+                    self._leer()
+        return self._versiones
+
+    def version(self, *tablas):
+        """Tupla con la versión actual de las tablas indicadas"""
+        versiones = self.actuales()
+        return tuple(versiones.get(tabla, 0) for tabla in tablas)
+
+    def ultima_modificacion(self, *tablas):
+        """Fecha (UTC, al segundo) del último cambio en las tablas, o None si no consta"""
+        self.actuales()
+        marcas = [self._modificadas[tabla] for tabla in tablas if tabla in self._modificadas]
+        if not marcas:
+            return None
+        return datetime.fromtimestamp(max(marcas), timezone.utc)
+
+    def incrementar(self, *tablas):
+        """Marcar las tablas como modificadas para todos los procesos"""
+        with self.repositorio.escritura() as cur:
+            self.repositorio.incrementar_versiones(cur, tablas)
+        with self._lock:
+            self._leer()
+
+
+class CacheReferencia:
+    """Caché en memoria de tablas de referencia pequeñas (áreas, cargos...)
+
+    Cada entrada se registra con la función que la carga y las tablas de las
+    que depende. Se recarga cuando cambia la versión de alguna de esas tablas
+    (ver ``VersionesDatos``) o cuando supera ``ttl`` segundos.
+    """
+
+    def __init__(self, repositorio, versiones, ttl=300):
+        self.repositorio = repositorio
+        self.versiones = versiones
+        self.ttl = ttl
+        self._cargadores = {}
+        self._datos = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def registrar(self, nombre, tablas=None):
+        """Decorador para registrar la función que carga una entrada"""
+        def decorador(funcion):
+            self._cargadores[nombre] = (funcion, tuple(tablas or (nombre,)))
+            return funcion
+        return decorador
+
+    def obtener(self, nombre):
+        funcion, tablas = self._cargadores[nombre]
+        version = self.versiones.version(*tablas)
+        entrada = self._datos.get(nombre)
+        if entrada is not None and entrada[1] == version and time.monotonic() - entrada[2] < self.ttl:
+            self.aciertos += 1
+            return entrada[0]
+        with self._lock:
+            # Otro hilo pudo haberla cargado mientras se esperaba el lock
+            entrada = self._datos.get(nombre)
+            if entrada is not None and entrada[1] == version and time.monotonic() - entrada[2] < self.ttl:
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+            # Siempre desde el maestro: la réplica podría no tener aún la nueva versión
+            with self.repositorio.consulta(maestro=True) as cur:
+                valor = funcion(cur)
+            self._datos[nombre] = (valor, version, time.monotonic())
+        return valor
+
+    def invalidar(self, *tablas):
+        """Descartar localmente las entradas que dependen de las tablas indicadas"""
+        with self._lock:
+            for nombre, (_, dependencias) in self._cargadores.items():
+                if set(dependencias) & set(tablas):
+                    self._datos.pop(nombre, None)
+
+
+class InfoColaborador:
+    """Colaborador con el área y departamento de su cargo (para autocompletado)"""
+
+    __slots__ = ('id', 'nombre', 'area_id', 'area_nombre', 'departamento_id', 'departamento_nombre')
+
+    def __init__(self, id, nombre, area_id, area_nombre, departamento_id, departamento_nombre):
+        self.id = id
+        self.nombre = nombre
+        # Las plantillas esperan cadena vacía cuando el cargo no tiene área o departamento
+        self.area_id = area_id if area_id is not None else ''
+        self.area_nombre = area_nombre if area_nombre is not None else ''
+        self.departamento_id = departamento_id if departamento_id is not None else ''
+        self.departamento_nombre = departamento_nombre if departamento_nombre is not None else ''
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+class CachePaginas:
+    """Caché LRU en memoria de páginas públicas ya renderizadas y precomprimidas
+
+    Cada página se guarda comprimida con cada codificación disponible (gzip
+    y, si está instalado, brotli; ver respuestas.py) junto a la versión de
+    las ``tablas`` de las que depende (ver ``VersionesDatos``); si la versión
+    cambió o la página tiene más de ``ttl`` segundos se descarta. El tamaño
+    total de las páginas guardadas no supera ``max_bytes``: al llenarse se
+    eliminan las menos usadas.
+    """
+
+    def __init__(self, versiones, tablas, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.versiones = versiones
+        self.tablas = tuple(tablas)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._paginas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def version(self):
+        return self.versiones.version(*self.tablas)
+
+    def obtener(self, clave):
+        """Página guardada como ({codificación: cuerpo}, mimetype), o None si no hay una vigente"""
+        version = self.version()
+        with self._lock:
+            pagina = self._paginas.get(clave)
+            if pagina is not None and pagina[0] == version and time.monotonic() - pagina[3] < self.ttl:
+                self._paginas.move_to_end(clave)
+                self.aciertos += 1
+                return pagina[1], pagina[2]
+            if pagina is not None:
+                self._quitar(clave)
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave, version, variantes, mimetype):
+        """Guardar una página renderizada con la versión de datos leída al generarla"""
+        tamano = sum(len(cuerpo) for cuerpo in variantes.values())
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._paginas:
+                self._quitar(clave)
+            self._paginas[clave] = (version, variantes, mimetype, time.monotonic(), tamano)
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._paginas)))
+
+    def _quitar(self, clave):
+        self._bytes -= self._paginas.pop(clave)[4]
+
+    def invalidar(self, *tablas):
+        """Vaciar la caché si alguna de las tablas modificadas afecta a las páginas"""
+        if tablas and not set(tablas) & set(self.tablas):
+            return
+        with self._lock:
+            self._paginas.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        return {
+            'paginas': len(self._paginas),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+        }
@@ -0,0 +1,404 @@
+import threading
+import time
+from collections import deque
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import g, request, session
+
+# Métodos HTTP que no escriben: pueden ir a la réplica y no abren la ventana de escritura
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PoolAgotado(Exception):
+    """No se obtuvo una conexión libre del pool dentro del tiempo de espera"""
+
+
+class _ConexionPool:
+    __slots__ = ('conn', 'creada_en', 'usada_en')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada_en = self.usada_en = time.monotonic()
+
+
+class PoolConexiones:
+    """Pool acotado de conexiones MySQLdb reutilizables entre peticiones
+
+    - ``minimo``: conexiones que se abren al primer uso y se mantienen ociosas.
+    - ``maximo``: límite de conexiones abiertas a la vez (prestadas + ociosas).
+    - ``timeout``: segundos que se espera una conexión libre antes de ``PoolAgotado``.
+    - ``vida_maxima``: segundos tras los que una conexión se cierra y se reemplaza.
+    - ``verificar_tras``: una conexión ociosa más de estos segundos se verifica con
+      ``ping()`` antes de prestarla.
+    - ``envolver``: función opcional aplicada a cada conexión nueva (por ejemplo,
+      para medir sus consultas).
+    """
+
+    def __init__(self, conectar, minimo=1, maximo=10, timeout=5.0, vida_maxima=1800, verificar_tras=5.0):
+        self._conectar = conectar
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.vida_maxima = vida_maxima
+        self.verificar_tras = verificar_tras
+        self.envolver = None
+        self._ociosas = deque()
+        self._total = 0
+        self._cond = threading.Condition()
+        self._iniciado = False
+        self._stats = {
+            'prestamos': 0,
+            'esperas': 0,
+            'timeouts': 0,
+            'creadas': 0,
+            'descartadas': 0,
+            'verificaciones_fallidas': 0,
+            'tiempo_espera_total': 0.0,
+        }
+
+    def _caducada(self, entrada, ahora):
+        return ahora - entrada.creada_en > self.vida_maxima
+
+    def _crear(self):
+        try:
+            conn = self._conectar()
+            entrada = _ConexionPool(self.envolver(conn) if self.envolver else conn)
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['creadas'] += 1
+        return entrada
+
+    def _cerrar(self, entrada):
+        try:
+            entrada.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._stats['descartadas'] += 1
+            self._cond.notify()
+
+    def _llenar(self):
+        """Abrir las conexiones mínimas (se hace al primer uso, no al importar)"""
+        self._iniciado = True
+        while True:
+            with self._cond:
+                if self._total >= self.minimo:
+                    return
+                self._total += 1
+            try:
+                entrada = self._crear()
+            except Exception:
+                return
+            with self._cond:
+                self._ociosas.append(entrada)
+                self._cond.notify()
+
+    def obtener(self):
+        """Prestar una conexión sana del pool"""
+        if not self._iniciado:
+            self._llenar()
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        while True:
+            entrada = None
+            crear = False
+            with self._cond:
+                while entrada is None and not crear:
+                    ahora = time.monotonic()
+                    if self._ociosas:
+                        # LIFO: se reutiliza primero la conexión más reciente
+                        entrada = self._ociosas.pop()
+                        if self._caducada(entrada, ahora):
+                            self._total -= 1
+                            self._stats['descartadas'] += 1
+                            _cerrar_silencioso(entrada.conn)
+                            entrada = None
+                    elif self._total < self.maximo:
+                        self._total += 1
+                        crear = True
+                    else:
+                        restante = limite - ahora
+                        if restante <= 0:
+                            self._stats['timeouts'] += 1
+                            raise PoolAgotado(f"Sin conexiones libres tras {self.timeout}s (máximo {self.maximo})")
+                        self._stats['esperas'] += 1
+                        self._cond.wait(restante)
+            if crear:
+                entrada = self._crear()
+            elif time.monotonic() - entrada.usada_en > self.verificar_tras:
+                try:
+                    entrada.conn.ping()
+                except Exception:
+                    with self._cond:
+                        self._stats['verificaciones_fallidas'] += 1
+                    self._cerrar(entrada)
+                    continue
+            with self._cond:
+                self._stats['prestamos'] += 1
+                self._stats['tiempo_espera_total'] += time.monotonic() - inicio
+            return entrada
+
+    def devolver(self, entrada, descartar=False):
+        """Devolver una conexión al pool, descartando la transacción pendiente"""
+        if not descartar:
+            try:
+                # Cerrar la transacción abierta (y su snapshot de lectura)
+                entrada.conn.rollback()
+            except Exception:
+                descartar = True
+        ahora = time.monotonic()
+        if descartar or self._caducada(entrada, ahora):
+            self._cerrar(entrada)
+            return
+        entrada.usada_en = ahora
+        with self._cond:
+            self._ociosas.append(entrada)
+            self._cond.notify()
+
+    def cerrar_todas(self):
+        """Cerrar las conexiones ociosas (por ejemplo, después de un fork)"""
+        with self._cond:
+            ociosas = list(self._ociosas)
+            self._ociosas.clear()
+            self._total -= len(ociosas)
+            self._iniciado = False
+        for entrada in ociosas:
+            _cerrar_silencioso(entrada.conn)
+
+    def reiniciar_tras_fork(self):
+        """Olvidar, sin cerrarlas, las conexiones heredadas del proceso padre
+
+        Los sockets siguen siendo del padre: cerrarlos desde el hijo cortaría
+        sus sesiones en MySQL. El hijo abre las suyas al primer uso.
+        """
+        self._cond = threading.Condition()
+        self._ociosas = deque()
+        self._total = 0
+        self._iniciado = False
+
+    def estadisticas(self):
+        with self._cond:
+            datos = dict(self._stats)
+            datos.update({
+                'minimo': self.minimo,
+                'maximo': self.maximo,
+                'abiertas': self._total,
+                'ociosas': len(self._ociosas),
+                'en_uso': self._total - len(self._ociosas),
+            })
+        return datos
+
+
+def _cerrar_silencioso(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class MySQLPool:
+    """Sustituto de ``flask_mysqldb.MySQL`` que presta conexiones desde un pool
+
+    Mantiene la misma interfaz (``mysql.connection``): la conexión se toma del
+    pool la primera vez que se usa en el contexto de la aplicación y se devuelve
+    al terminar la petición. ``prefijo`` permite configurar otro servidor, por
+    ejemplo ``MYSQL_REPLICA`` lee ``MYSQL_REPLICA_HOST``, ``MYSQL_REPLICA_PORT``...
+    """
+
+    def __init__(self, app=None, prefijo='MYSQL', connect_timeout=10):
+        self.prefijo = prefijo
+        self.connect_timeout = connect_timeout
+        self.pool = None
+        self._atributo_g = '_conexion_' + prefijo.lower()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(f'{self.prefijo}_HOST', 'localhost')
+        app.config.setdefault(f'{self.prefijo}_PORT', 3306)
+        app.config.setdefault(f'{self.prefijo}_USER', None)
+        app.config.setdefault(f'{self.prefijo}_PASSWORD', None)
+        app.config.setdefault(f'{self.prefijo}_DB', None)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8')
+        app.config.setdefault('MYSQL_POOL_MIN', 1)
+        app.config.setdefault('MYSQL_POOL_MAX', 10)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 5)
+        app.config.setdefault('MYSQL_POOL_VIDA_MAXIMA', 1800)
+        app.config.setdefault('MYSQL_POOL_VERIFICAR_TRAS', 5)
+        self.app = app
+        self.pool = PoolConexiones(
+            self._conectar,
+            minimo=int(app.config['MYSQL_POOL_MIN']),
+            maximo=int(app.config['MYSQL_POOL_MAX']),
+            timeout=float(app.config['MYSQL_POOL_TIMEOUT']),
+            vida_maxima=float(app.config['MYSQL_POOL_VIDA_MAXIMA']),
+            verificar_tras=float(app.config['MYSQL_POOL_VERIFICAR_TRAS']),
+        )
+        app.teardown_appcontext(self.teardown)
+
+    def _conectar(self):
+        config = self.app.config
+        kwargs = {
+            'host': config[f'{self.prefijo}_HOST'],
+            'port': int(config[f'{self.prefijo}_PORT']),
+            'charset': config['MYSQL_CHARSET'],
+            'connect_timeout': self.connect_timeout,
+        }
+        if config[f'{self.prefijo}_USER']:
+            kwargs['user'] = config[f'{self.prefijo}_USER']
+        if config[f'{self.prefijo}_PASSWORD']:
+            kwargs['passwd'] = config[f'{self.prefijo}_PASSWORD']
+        if config[f'{self.prefijo}_DB']:
+            kwargs['db'] = config[f'{self.prefijo}_DB']
+        return MySQLdb.connect(**kwargs)
+
+    @property
+    def connection(self):
+        entrada = getattr(g, self._atributo_g, None)
+        if entrada is None:
+            entrada = self.pool.obtener()
+            setattr(g, self._atributo_g, entrada)
+        return entrada.conn
+
+    def teardown(self, exception):
+        entrada = g.pop(self._atributo_g, None)
+        if entrada is not None:
+            # Una conexión que falló a nivel de red no vuelve al pool
+            self.pool.devolver(entrada, descartar=isinstance(exception, MySQLdb.OperationalError))
+
+    def reiniciar_tras_fork(self):
+        self.pool.reiniciar_tras_fork()
+
+    def estadisticas(self):
+        return self.pool.estadisticas()
+
+
+class EnrutadorLecturas:
+    """Envía las consultas de solo lectura a la réplica cuando está disponible
+
+    Las escrituras siguen usando la conexión del maestro (``mysql.connection``).
+    Las lecturas vuelven al maestro cuando:
+      - no hay réplica configurada (``MYSQL_REPLICA_HOST`` vacío),
+      - la petición es una escritura (POST) o la sesión escribió hace menos de
+        ``MYSQL_VENTANA_ESCRITURA`` segundos (leer sus propios cambios),
+      - la réplica no responde o su ``Seconds_Behind_Master`` supera
+        ``MYSQL_REPLICA_MAX_RETRASO``.
+    """
+
+    def __init__(self, mysql, app=None):
+        self.mysql = mysql
+        self.replica = MySQLPool(prefijo='MYSQL_REPLICA', connect_timeout=2)
+        self._replica_sana = False
+        self._retraso = None
+        self._verificada_en = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_REPLICA_HOST', '')
+        app.config.setdefault('MYSQL_REPLICA_PORT', 3306)
+        app.config.setdefault('MYSQL_REPLICA_USER', app.config.get('MYSQL_USER'))
+        app.config.setdefault('MYSQL_REPLICA_PASSWORD', app.config.get('MYSQL_PASSWORD'))
+        app.config.setdefault('MYSQL_REPLICA_DB', app.config.get('MYSQL_DB'))
+        app.config.setdefault('MYSQL_REPLICA_MAX_RETRASO', 5)
+        app.config.setdefault('MYSQL_REPLICA_INTERVALO_VERIFICACION', 10)
+        app.config.setdefault('MYSQL_VENTANA_ESCRITURA', 5)
+        self.app = app
+        self.replica.init_app(app)
+        app.after_request(self._registrar_escritura)
+
+    # --------------------------------------Conexiones----------------------------------------------------------------------
+
+    @property
+    def connection(self):
+        """Conexión para lecturas: la réplica si procede, el maestro en otro caso"""
+        if not self._usar_replica():
+            return self.mysql.connection
+        try:
+            return self.replica.connection
+        except PoolAgotado:
+            return self.mysql.connection
+        except MySQLdb.Error:
+            self._marcar_caida()
+            return self.mysql.connection
+
+    # --------------------------------------Decisión de enrutado----------------------------------------------------------------------
+
+    def _usar_replica(self):
+        if not self.app.config['MYSQL_REPLICA_HOST']:
+            return False
+        if request.method not in METODOS_LECTURA:
+            return False
+        if session.get('_escritura_hasta', 0) > time.time():
+            return False
+        return self._replica_disponible()
+
+    def _replica_disponible(self):
+        intervalo = self.app.config['MYSQL_REPLICA_INTERVALO_VERIFICACION']
+        if time.time() - self._verificada_en < intervalo:
+            return self._replica_sana
+        # Solo un hilo verifica; el resto usa el último estado conocido
+        if not self._lock.acquire(blocking=False):
+            return self._replica_sana
+        try:
+            self._verificar_replica()
+        finally:
+            self._lock.release()
+        return self._replica_sana
+
+    def _verificar_replica(self):
+        """Consultar el retraso de replicación y actualizar el estado de la réplica"""
+        try:
+            conn = self.replica.connection
+            cur = conn.cursor(MySQLdb.cursors.DictCursor)
+            try:
+                cur.execute("SHOW REPLICA STATUS")
+            except MySQLdb.Error:
+                # Servidores anteriores a MySQL 8.0.22
+                cur.execute("SHOW SLAVE STATUS")
+            estado = cur.fetchone()
+            cur.close()
+        except PoolAgotado:
+            return
+        except MySQLdb.Error:
+            self._marcar_caida()
+            return
+        retraso = None
+        if estado:
+            retraso = estado.get('Seconds_Behind_Source', estado.get('Seconds_Behind_Master'))
+        self._retraso = retraso
+        # Sin estado o con la replicación detenida (NULL) no se puede confiar en la réplica
+        self._replica_sana = retraso is not None and retraso <= self.app.config['MYSQL_REPLICA_MAX_RETRASO']
+        self._verificada_en = time.time()
+
+    def reiniciar_tras_fork(self):
+        self.replica.reiniciar_tras_fork()
+        self._lock = threading.Lock()
+        self._verificada_en = 0.0
+
+    def estadisticas(self):
+        datos = self.replica.estadisticas()
+        datos.update({
+            'configurada': bool(self.app.config['MYSQL_REPLICA_HOST']),
+            'sana': self._replica_sana,
+            'retraso': self._retraso,
+        })
+        return datos
+
+    def _marcar_caida(self):
+        self._replica_sana = False
+        self._retraso = None
+        self._verificada_en = time.time()
+
+    def _registrar_escritura(self, response):
+        """Mantener en el maestro las lecturas de una sesión que acaba de escribir (POST, PUT, DELETE...)"""
+        if request.method not in METODOS_LECTURA and 'user_id' in session:
+            session['_escritura_hasta'] = time.time() + self.app.config['MYSQL_VENTANA_ESCRITURA']
+        return response
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+
+
+class HasheadorOcupado(Exception):
+    """No hay capacidad para calcular más hashes ahora (se responde 503)"""
+
+
+def costo_de(hash_guardado):
+    """Factor de trabajo de un hash bcrypt ('$2b$12$...' -> 12), o None si no se reconoce"""
+    try:
+        return int(hash_guardado.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class Hasheador:
+    """Calcula y verifica hashes bcrypt en un grupo acotado de hilos
+
+    bcrypt libera el GIL mientras calcula, así que ``hilos`` limita cuántos
+    núcleos puede ocupar el login a la vez. Como mucho ``max_pendientes``
+    peticiones esperan turno; las demás se rechazan al instante con
+    ``HasheadorOcupado`` en lugar de acumularse y frenar el resto del sitio.
+    ``observar(operacion, segundos)``, si se indica, recibe lo que tardó cada cálculo.
+    """
+
+    def __init__(self, costo=12, hilos=2, max_pendientes=8, timeout=10, observar=None):
+        self.costo = costo
+        self.timeout = timeout
+        self.observar = observar
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='bcrypt')
+        self._cupos = threading.BoundedSemaphore(hilos + max_pendientes)
+        self._capacidad = hilos + max_pendientes
+        self.rechazados = 0
+
+    def _medir(self, operacion, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            if self.observar is not None:
+                self.observar(operacion, time.perf_counter() - inicio)
+
+    def _ejecutar(self, operacion, funcion, *args):
+        if not self._cupos.acquire(blocking=False):
+            self.rechazados += 1
+            raise HasheadorOcupado()
+        try:
+            futuro = self._executor.submit(self._medir, operacion, funcion, *args)
+        except Exception:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasheadorOcupado()
+
+    def _hashear(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.costo)).decode('utf-8')
+
+    def _verificar(self, password, hash_guardado):
+        if not bcrypt.checkpw(password.encode('utf-8'), hash_guardado.encode('utf-8')):
+            return False, None
+        # Contraseña correcta: aprovechar para llevar el hash al costo configurado
+        if costo_de(hash_guardado) != self.costo:
+            return True, self._hashear(password)
+        return True, None
+
+    def hashear(self, password):
+        return self._ejecutar('hashear', self._hashear, password)
+
+    def verificar(self, password, hash_guardado):
+        """(correcta, nuevo hash o None); el nuevo hash se devuelve si el costo cambió"""
+        return self._ejecutar('verificar', self._verificar, password, hash_guardado)
+
+    def estadisticas(self):
+        return {
+            'costo': self.costo,
+            'capacidad': self._capacidad,
+            # Sin API pública en BoundedSemaphore para leer el contador
+            'en_uso': self._capacidad - self._cupos._value,
+            'rechazados': self.rechazados,
+        }
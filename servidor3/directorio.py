@@ -0,0 +1,176 @@
+from busqueda import TIPOS_CONTACTO
+
+# Columna ID y expresión del valor de cada tipo de contacto (alias t)
+CONTACTOS = {
+    'extensiones': ('ID_EXTENSIONES', 'CAST(t.EXTENSION AS CHAR)'),
+    'celulares': ('ID_CELULARES', 'CAST(t.CELULAR AS CHAR)'),
+    'correos': ('ID_CORREOS', 't.CORREO'),
+}
+COLUMNAS = ('TIPO', 'ID_CONTACTO', 'ID_COLABORADOR', 'NOMBRE', 'VALOR', 'ID_AREA', 'AREA', 'ID_DEPARTAMENTO', 'DEPARTAMENTO')
+
+
+def consulta_origen(tipo):
+    """Filas que deberían estar en ``directorio`` para un tipo, leídas de las tablas de origen
+
+    El área y el departamento son siempre los del cargo del colaborador.
+    """
+    columna_id, valor = CONTACTOS[tipo]
+    return f"""
+        SELECT '{tipo}' AS TIPO, t.{columna_id} AS ID_CONTACTO, t.ID_COLABORADOR, col.NOMBRE, {valor} AS VALOR,
+               cg.AREA AS ID_AREA, a.AREA, cg.DEPARTAMENTO AS ID_DEPARTAMENTO, d.DEPARTAMENTO
+        FROM {tipo} t
+        JOIN colaboradores col ON t.ID_COLABORADOR = col.ID_COLABORADORES
+        LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+    """
+
+
+def _marcadores(valores):
+    return ', '.join(['%s'] * len(valores))
+
+
+def _ids(ids):
+    return tuple(sorted({int(id) for id in ids if id not in (None, '')}))
+
+
+class DirectorioMaterializado:
+    """Mantiene la tabla ``directorio``: una fila por contacto, sin JOINs al leer
+
+    Los métodos ``actualizar_*`` reciben el cursor de la escritura y se llaman
+    antes de su commit, así la tabla cambia en la misma transacción que los
+    datos de origen. ``verificar`` y ``reconstruir`` son para mantenimiento.
+    El SQL es el mismo en MySQL y en SQLite (ver repositorio.py).
+    """
+
+    def __init__(self, bd):
+        self.bd = bd
+
+    def _insertar(self, cur, tipo, condicion='', parametros=()):
+        sql = f"INSERT INTO directorio ({', '.join(COLUMNAS)}) {consulta_origen(tipo)}"
+        if condicion:
+            sql += " WHERE " + condicion
+        cur.execute(sql, parametros)
+
+    # --------------------------------------Mantenimiento al escribir----------------------------------------------------------------------
+
+    def actualizar_contactos(self, cur, tipo, ids):
+        """Volver a calcular los contactos ``ids`` de un tipo (creados, editados o eliminados)"""
+        ids = _ids(ids)
+        if not ids:
+            return
+        cur.execute(f"DELETE FROM directorio WHERE TIPO = %s AND ID_CONTACTO IN ({_marcadores(ids)})", (tipo,) + ids)
+        self._insertar(cur, tipo, f"t.{CONTACTOS[tipo][0]} IN ({_marcadores(ids)})", ids)
+
+    def actualizar_colaboradores(self, cur, ids):
+        """Volver a calcular todos los contactos de los colaboradores ``ids``"""
+        ids = _ids(ids)
+        if not ids:
+            return
+        cur.execute(f"DELETE FROM directorio WHERE ID_COLABORADOR IN ({_marcadores(ids)})", ids)
+        for tipo in TIPOS_CONTACTO:
+            self._insertar(cur, tipo, f"t.ID_COLABORADOR IN ({_marcadores(ids)})", ids)
+
+    def actualizar_cargo(self, cur, id):
+        """Copiar el área y el departamento de un cargo a los contactos de sus colaboradores"""
+        cur.execute("""
+            SELECT cg.AREA, a.AREA, cg.DEPARTAMENTO, d.DEPARTAMENTO
+            FROM cargos cg
+            LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+            LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+            WHERE cg.ID_CARGOS = %s
+        """, (id,))
+        cargo = cur.fetchone()
+        if cargo is None:
+            return
+        cur.execute("""
+            UPDATE directorio SET ID_AREA = %s, AREA = %s, ID_DEPARTAMENTO = %s, DEPARTAMENTO = %s
+            WHERE ID_COLABORADOR IN (SELECT ID_COLABORADORES FROM colaboradores WHERE CARGO = %s)
+        """, tuple(cargo) + (id,))
+
+    def actualizar_area(self, cur, id):
+        """Copiar el nombre de un área editada"""
+        # TIPO IN (...) permite usar el índice (TIPO, ID_AREA, ...) en lugar de recorrer la tabla
+        cur.execute(f"""
+            UPDATE directorio SET AREA = (SELECT AREA FROM areas WHERE ID_AREAS = %s)
+            WHERE TIPO IN ({_marcadores(TIPOS_CONTACTO)}) AND ID_AREA = %s
+        """, (id,) + TIPOS_CONTACTO + (id,))
+
+    def actualizar_departamento(self, cur, id):
+        """Copiar el nombre de un departamento editado"""
+        cur.execute(f"""
+            UPDATE directorio SET DEPARTAMENTO = (SELECT DEPARTAMENTO FROM departamentos WHERE ID_DEPARTAMENTOS = %s)
+            WHERE TIPO IN ({_marcadores(TIPOS_CONTACTO)}) AND ID_DEPARTAMENTO = %s
+        """, (id,) + TIPOS_CONTACTO + (id,))
+
+    # --------------------------------------Reconstrucción y verificación----------------------------------------------------------------------
+
+    def reconstruir(self):
+        """Vaciar y volver a llenar la tabla en una transacción; devuelve las filas por tipo
+
+        Con DELETE (y no TRUNCATE) las lecturas siguen viendo la tabla anterior
+        hasta el commit.
+        """
+        conn = self.bd.connection
+        cur = conn.cursor()
+        filas = {}
+        try:
+            cur.execute("DELETE FROM directorio")
+            for tipo in TIPOS_CONTACTO:
+                self._insertar(cur, tipo)
+                filas[tipo] = cur.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+        return filas
+
+    def verificar(self):
+        """Comparar ``directorio`` con las tablas de origen
+
+        Devuelve {tipo: IDs de contacto que faltan, sobran o tienen datos distintos};
+        un diccionario vacío si todo coincide.
+        """
+        # Igualdad que también vale con NULL en ambos lados (<=> de MySQL, IS de SQLite)
+        comparacion = ' AND '.join(
+            f"COALESCE(m.{columna} = o.{columna}, m.{columna} IS NULL AND o.{columna} IS NULL)" for columna in COLUMNAS[2:]
+        )
+        cur = self.bd.connection.cursor()
+        diferencias = {}
+        try:
+            for tipo in TIPOS_CONTACTO:
+                columna_id = CONTACTOS[tipo][0]
+                cur.execute(f"""
+                    SELECT o.ID_CONTACTO FROM ({consulta_origen(tipo)}) o
+                    LEFT JOIN directorio m ON m.TIPO = %s AND m.ID_CONTACTO = o.ID_CONTACTO
+                    WHERE NOT ({comparacion})
+                """, (tipo,))
+                ids = [fila[0] for fila in cur.fetchall()]
+                cur.execute(f"""
+                    SELECT m.ID_CONTACTO FROM directorio m
+                    LEFT JOIN {tipo} t ON m.ID_CONTACTO = t.{columna_id}
+                    LEFT JOIN colaboradores col ON t.ID_COLABORADOR = col.ID_COLABORADORES
+                    WHERE m.TIPO = %s AND col.ID_COLABORADORES IS NULL
+                """, (tipo,))
+                ids.extend(fila[0] for fila in cur.fetchall())
+                if ids:
+                    diferencias[tipo] = sorted(ids)
+        finally:
+            cur.close()
+        return diferencias
+
+    def reparar(self, diferencias):
+        """Volver a calcular solo los contactos que ``verificar`` encontró distintos"""
+        conn = self.bd.connection
+        cur = conn.cursor()
+        try:
+            for tipo, ids in diferencias.items():
+                self.actualizar_contactos(cur, tipo, ids)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
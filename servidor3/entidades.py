@@ -0,0 +1,159 @@
+from importacion import validar_correo
+
+
+class ErrorValidacion(Exception):
+    """Datos no válidos para una entidad: ``errores`` es {campo: mensaje}"""
+
+    def __init__(self, errores):
+        super().__init__(' '.join(errores.values()))
+        self.errores = errores
+
+
+class Campo:
+    """Campo de una entidad en la API JSON (el nombre es el del formulario)
+
+    ``tipo``: ``'texto'`` (no puede ser solo números), ``'id'`` (ID de otra
+    tabla), ``'numero'`` (solo dígitos, hasta ``maximo``) o ``'correo'``.
+    ``maximo`` es el largo máximo de la columna. ``duplicado`` es el mensaje
+    si la columna tiene un índice único y el valor ya existe.
+    """
+
+    def __init__(self, nombre, etiqueta, tipo='texto', obligatorio=True, maximo=None, duplicado=None):
+        self.nombre = nombre
+        self.etiqueta = etiqueta
+        self.tipo = tipo
+        self.obligatorio = obligatorio
+        self.maximo = maximo
+        self.duplicado = duplicado
+
+    def convertir(self, valor):
+        """Valor para la base de datos; ValueError con el mensaje si no es válido"""
+        valor = '' if valor is None else str(valor).strip()
+        if not valor:
+            if self.obligatorio:
+                raise ValueError(f'El campo {self.etiqueta} es obligatorio.')
+            return None
+        if self.tipo == 'id':
+            if not valor.isdigit():
+                raise ValueError(f'El campo {self.etiqueta} no es válido.')
+            return int(valor)
+        if self.tipo == 'numero':
+            if not valor.isdigit():
+                raise ValueError(f'El campo {self.etiqueta} solo puede contener números.')
+        elif self.tipo == 'correo':
+            error = validar_correo(valor)
+            if error:
+                raise ValueError(error)
+        elif valor.isdigit():
+            raise ValueError(f'El campo {self.etiqueta} no puede ser solo números.')
+        if self.maximo and len(valor) > self.maximo:
+            raise ValueError(f'El campo {self.etiqueta} supera los {self.maximo} caracteres.')
+        return int(valor) if self.tipo == 'numero' else valor
+
+
+class Entidad:
+    """Tabla editable desde la API JSON, con sus campos en el orden de las columnas de su ``Tabla``
+
+    ``descripcion`` se usa en los mensajes ('esta área', 'este cargo').
+    """
+
+    def __init__(self, nombre, descripcion, campos, femenino=False):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.campos = tuple(campos)
+        self.femenino = femenino
+
+    def tabla(self, repositorio):
+        if self.nombre in repositorio.contactos:
+            return repositorio.contactos[self.nombre]
+        return getattr(repositorio, self.nombre)
+
+    def valores(self, datos):
+        """Tupla de valores para la ``Tabla``; ErrorValidacion con los errores de todos los campos"""
+        valores = []
+        errores = {}
+        for campo in self.campos:
+            try:
+                valores.append(campo.convertir(datos.get(campo.nombre)))
+            except ValueError as e:
+                errores[campo.nombre] = str(e)
+        if errores:
+            raise ErrorValidacion(errores)
+        return tuple(valores)
+
+    def cambios(self, datos):
+        """{posición de la columna: valor} solo de los campos presentes en ``datos`` (edición parcial)"""
+        cambios = {}
+        errores = {}
+        for posicion, campo in enumerate(self.campos):
+            if campo.nombre not in datos:
+                continue
+            try:
+                cambios[posicion] = campo.convertir(datos[campo.nombre])
+            except ValueError as e:
+                errores[campo.nombre] = str(e)
+        if errores:
+            raise ErrorValidacion(errores)
+        if not cambios:
+            raise ErrorValidacion({'id': 'No se indicó ningún campo para modificar.'})
+        return cambios
+
+    def mensaje_ligado(self):
+        ligado = 'ligada' if self.femenino else 'ligado'
+        return f'No se puede eliminar {self.descripcion} porque está {ligado} a otros datos.'
+
+    def errores_duplicado(self):
+        """{campo: mensaje} de los campos con índice único, para un valor repetido"""
+        return {campo.nombre: campo.duplicado for campo in self.campos if campo.duplicado}
+
+    def como_json(self, fila):
+        """Fila de ``Repositorio.detalle`` con los números como tales (``directorio`` guarda el valor como texto)"""
+        for campo in self.campos:
+            if campo.tipo == 'numero' and fila.get(campo.nombre) is not None:
+                fila[campo.nombre] = int(fila[campo.nombre])
+        return fila
+
+
+ENTIDADES = {
+    'areas': Entidad('areas', 'esta área', [
+        Campo('area', 'área', maximo=100),
+    ], femenino=True),
+    'departamentos': Entidad('departamentos', 'este departamento', [
+        Campo('departamento', 'departamento', maximo=100),
+    ]),
+    'ubicaciones': Entidad('ubicaciones', 'esta ubicación', [
+        Campo('descripcion', 'descripción', maximo=150),
+        Campo('geolocalizacion', 'geolocalización', maximo=100),
+        Campo('direccion', 'dirección', maximo=100),
+    ], femenino=True),
+    'cargos': Entidad('cargos', 'este cargo', [
+        Campo('descripcion', 'cargo', maximo=150),
+        Campo('area', 'área', tipo='id'),
+        Campo('departamento', 'departamento', tipo='id'),
+    ]),
+    'colaboradores': Entidad('colaboradores', 'este colaborador', [
+        Campo('nombre', 'nombre', maximo=100),
+        Campo('departamento', 'departamento', tipo='id'),
+        Campo('area', 'área', tipo='id'),
+        Campo('cargo', 'cargo', tipo='id'),
+        Campo('ubicacion', 'ubicación', tipo='id'),
+    ]),
+    'extensiones': Entidad('extensiones', 'esta extensión', [
+        Campo('id_colaborador', 'colaborador', tipo='id'),
+        Campo('extension', 'extensión', tipo='numero', maximo=9),
+        Campo('area', 'área', tipo='id', obligatorio=False),
+        Campo('departamento', 'departamento', tipo='id', obligatorio=False),
+    ], femenino=True),
+    'celulares': Entidad('celulares', 'este celular', [
+        Campo('id_colaborador', 'colaborador', tipo='id'),
+        Campo('celular', 'celular', tipo='numero', maximo=15),
+        Campo('area', 'área', tipo='id'),
+        Campo('departamento', 'departamento', tipo='id'),
+    ]),
+    'correos': Entidad('correos', 'este correo', [
+        Campo('id_colaborador', 'colaborador', tipo='id'),
+        Campo('correo', 'correo', tipo='correo', maximo=50, duplicado='Este correo ya está registrado.'),
+        Campo('area', 'área', tipo='id'),
+        Campo('departamento', 'departamento', tipo='id'),
+    ]),
+}
@@ -0,0 +1,122 @@
+import os
+import re
+
+DIRECTORIO_MIGRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migraciones')
+# Archivos NNNN_descripcion.sql, aplicados en orden de número
+_ARCHIVO_MIGRACION = re.compile(r'^(\d+)_(\w+)\.sql$')
+# Fin de sentencia: punto y coma al final de una línea
+_FIN_SENTENCIA = re.compile(r';[ \t]*(?:\n|$)')
+# Errores de MySQL que indican que la sentencia ya se aplicó antes: índice o columna
+# repetidos (1061, 1060) o índice ya eliminado (1091)
+_YA_APLICADA = (1060, 1061, 1091)
+
+
+class EsquemaDesactualizado(Exception):
+    """La base de datos no tiene aplicadas todas las migraciones"""
+
+
+class Migracion:
+    __slots__ = ('version', 'nombre', 'ruta')
+
+    def __init__(self, version, nombre, ruta):
+        self.version = version
+        self.nombre = nombre
+        self.ruta = ruta
+
+    def sentencias(self):
+        with open(self.ruta, encoding='utf-8') as archivo:
+            texto = archivo.read()
+        # Quitar comentarios de línea completa antes de separar las sentencias
+        texto = '\n'.join(linea for linea in texto.splitlines() if not linea.lstrip().startswith('--'))
+        return [sentencia.strip() for sentencia in _FIN_SENTENCIA.split(texto) if sentencia.strip()]
+
+
+class Migrador:
+    """Aplica en orden los scripts de ``migraciones/`` y registra la versión del esquema
+
+    Cada migración aplicada se anota en ``version_esquema``. Al arrancar basta
+    con comparar la última versión anotada con la del último script.
+    """
+
+    def __init__(self, mysql, directorio=DIRECTORIO_MIGRACIONES):
+        self.mysql = mysql
+        self.directorio = directorio
+
+    def migraciones(self):
+        encontradas = []
+        for archivo in os.listdir(self.directorio):
+            coincidencia = _ARCHIVO_MIGRACION.match(archivo)
+            if coincidencia:
+                encontradas.append(Migracion(int(coincidencia.group(1)), coincidencia.group(2),
+                                             os.path.join(self.directorio, archivo)))
+        encontradas.sort(key=lambda m: m.version)
+        versiones = [m.version for m in encontradas]
+        if len(set(versiones)) != len(versiones):
+            raise ValueError('Hay dos migraciones con el mismo número.')
+        return encontradas
+
+    def version_actual(self):
+        """Última versión aplicada (0 si la base nunca se migró)"""
+        cur = self.mysql.connection.cursor()
+        try:
+            cur.execute("SELECT MAX(VERSION) FROM version_esquema")
+            fila = cur.fetchone()
+        except Exception as e:
+            # 1146: la tabla version_esquema no existe todavía
+            if getattr(e, 'args', (None,))[0] == 1146:
+                return 0
+            raise
+        finally:
+            cur.close()
+        return fila[0] or 0
+
+    def pendientes(self):
+        actual = self.version_actual()
+        return [m for m in self.migraciones() if m.version > actual]
+
+    def verificar(self):
+        """Lanzar EsquemaDesactualizado si falta aplicar alguna migración"""
+        pendientes = self.pendientes()
+        if pendientes:
+            nombres = ', '.join(f'{m.version:04d}_{m.nombre}' for m in pendientes)
+            raise EsquemaDesactualizado(f'Migraciones pendientes: {nombres}')
+
+    def aplicar(self, simular=False, informar=print):
+        """Aplicar las migraciones pendientes; con ``simular`` solo se muestran sus sentencias
+
+        MySQL confirma cada sentencia DDL por separado: si una migración falla a
+        medias, no se anota y sus scripts deben poder repetirse (IF NOT EXISTS...).
+        Un ALTER TABLE se aplica entero o nada, así que si falla porque el índice
+        o la columna ya existen se da por aplicado y se continúa.
+        """
+        pendientes = self.pendientes()
+        conn = self.mysql.connection
+        cur = conn.cursor()
+        try:
+            if not simular:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS version_esquema (
+                        VERSION INT PRIMARY KEY NOT NULL,
+                        NOMBRE VARCHAR(150) NOT NULL,
+                        APLICADA TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+            for migracion in pendientes:
+                informar(f'{"[simulación] " if simular else ""}{migracion.version:04d}_{migracion.nombre}')
+                for sentencia in migracion.sentencias():
+                    if simular:
+                        informar(sentencia + ';')
+                    else:
+                        try:
+                            cur.execute(sentencia)
+                        except Exception as e:
+                            if getattr(e, 'args', (None,))[0] not in _YA_APLICADA:
+                                raise
+                            informar(f'Ya aplicada: {e}')
+                if not simular:
+                    cur.execute("INSERT INTO version_esquema (VERSION, NOMBRE) VALUES (%s, %s)",
+                                (migracion.version, migracion.nombre))
+                    conn.commit()
+        finally:
+            cur.close()
+        return pendientes
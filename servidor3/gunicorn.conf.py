@@ -0,0 +1,40 @@
+# Configuración de gunicorn para producción (gunicorn -c gunicorn.conf.py wsgi:app)
+#
+# Recarga sin cortar peticiones: kill -HUP <pid del maestro> inicia workers nuevos
+# y deja terminar a los anteriores durante graceful_timeout segundos.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PUERTO', 5000)}"
+
+# Procesos e hilos: cada worker tiene su propio pool de MySQL, así que
+# GUNICORN_HILOS no debería superar MYSQL_POOL_MAX
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_HILOS", 4))
+
+# Segundos sin respuesta antes de reiniciar un worker colgado
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Reciclar workers cada cierto número de peticiones (con variación para no reiniciarlos todos juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
+# La aplicación se importa una vez en el maestro y los workers la heredan
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """En el maestro, antes de crear workers: esperar a MySQL y verificar el esquema"""
+    from app import preparar_base_datos
+    preparar_base_datos()
+
+
+def post_fork(server, worker):
+    from app import reiniciar_tras_fork
+    reiniciar_tras_fork()
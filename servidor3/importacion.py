@@ -0,0 +1,246 @@
+import csv
+import io
+import re
+
+from busqueda import TIPOS_CONTACTO, normalizar
+
+try:
+    import openpyxl
+except ImportError:  # Solo se necesita para importar archivos .xlsx
+    openpyxl = None
+
+CORREO_REGEX = re.compile(r'^([A-Za-z][A-Za-z0-9_.+-]*)@((farbiopharma|inpelab)\.com)$')
+DOMINIOS_CORREO = ('farbiopharma.com', 'inpelab.com')
+# Los correos son únicos (índice CORREO)
+CORREO_REGISTRADO = 'Este correo ya está registrado.'
+
+# Columnas reconocidas en el encabezado (sin tildes ni mayúsculas)
+COLUMNAS = ('nombre', 'cargo', 'area', 'departamento', 'ubicacion', 'extensiones', 'celulares', 'correos')
+# Separadores entre varios valores de una misma celda (extensiones, celulares, correos)
+_SEPARADOR_VALORES = re.compile(r'[;,|\n]+')
+_ESPACIOS = re.compile(r'\s+')
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede importar (formato, encabezado...)"""
+
+
+def validar_correo(correo):
+    """Mensaje de error si el correo no es válido, None si lo es"""
+    if not correo or '@' not in correo:
+        return 'El correo debe contener el separador @.'
+    usuario, _, dominio = correo.partition('@')
+    if usuario.isdigit():
+        return 'El nombre de usuario del correo no puede contener solo números.'
+    if dominio not in DOMINIOS_CORREO:
+        return 'El dominio del correo debe ser farbiopharma.com o inpelab.com.'
+    if not CORREO_REGEX.match(correo):
+        return 'El formato del correo no es válido.'
+    return None
+
+
+def clave(texto):
+    """Forma de comparar nombres: sin tildes, mayúsculas ni espacios repetidos"""
+    return _ESPACIOS.sub(' ', normalizar(texto or '')).strip()
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    # Excel guarda extensiones y celulares como números (1234.0)
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+# --------------------------------------Lectura de archivos----------------------------------------------------------------------
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    primera = texto.readline()
+    # Excel en español exporta CSV separados por punto y coma
+    delimitador = ';' if primera.count(';') > primera.count(',') else ','
+    yield next(csv.reader([primera], delimiter=delimitador), [])
+    yield from csv.reader(texto, delimiter=delimitador)
+
+
+def _filas_xlsx(archivo):
+    if openpyxl is None:
+        raise ErrorImportacion('Para importar archivos .xlsx instale openpyxl o use CSV.')
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from libro.active.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre_archivo):
+    """Filas del archivo (CSV o XLSX) como (número de fila, {columna: texto}), leídas una a una
+
+    ``archivo`` es un archivo binario. El encabezado se valida antes de devolver
+    el iterador; las columnas no reconocidas se ignoran.
+    """
+    filas = _filas_xlsx(archivo) if nombre_archivo.lower().endswith('.xlsx') else _filas_csv(archivo)
+    encabezado = next(filas, None)
+    if not encabezado:
+        raise ErrorImportacion('El archivo está vacío.')
+    columnas = [clave(_texto(columna)) for columna in encabezado]
+    if 'nombre' not in columnas:
+        raise ErrorImportacion('El encabezado debe incluir la columna NOMBRE.')
+
+    def iterar():
+        for numero, valores in enumerate(filas, start=2):
+            fila = {columna: _texto(valor) for columna, valor in zip(columnas, valores) if columna in COLUMNAS}
+            if any(fila.values()):
+                yield numero, fila
+    return iterar()
+
+
+# --------------------------------------Importación----------------------------------------------------------------------
+
+class ImportadorColaboradores:
+    """Importa colaboradores con sus extensiones, celulares y correos
+
+    Los nombres de área, departamento, cargo y ubicación se resuelven con
+    mapas cargados una sola vez (no una consulta por fila). Las filas válidas
+    se guardan en lotes de ``tamano_lote``, cada lote en una transacción; si un
+    lote falla se reintenta fila por fila para informar cuál es la que falla.
+    ``al_insertar(cursor, ids)`` se llama dentro de la transacción de cada lote.
+    ``correos`` son los ya registrados (únicos, sin distinguir mayúsculas) y
+    ``clave_duplicada(error)`` reconoce un valor repetido al guardar.
+    """
+
+    def __init__(self, conexion, areas, departamentos, cargos, ubicaciones, existentes=(), correos=(), tamano_lote=500,
+                 al_insertar=None, clave_duplicada=None):
+        self.conexion = conexion
+        self.areas = {clave(nombre): id for id, nombre in areas}
+        self.departamentos = {clave(nombre): id for id, nombre in departamentos}
+        self.cargos = {clave(descripcion): (id, area, departamento) for id, descripcion, area, departamento in cargos}
+        self.ubicaciones = {clave(ubicacion[1]): ubicacion[0] for ubicacion in ubicaciones}
+        self.existentes = {clave(nombre) for nombre in existentes}
+        self.correos = {correo.lower() for correo in correos}
+        self.tamano_lote = tamano_lote
+        self.al_insertar = al_insertar
+        self.clave_duplicada = clave_duplicada
+        self.procesadas = 0
+        self.insertados = []
+        self.errores = []
+
+    def _resolver(self, mapa, valor, etiqueta):
+        id = mapa.get(clave(valor))
+        if id is None:
+            raise ValueError(f'{etiqueta} "{valor}" no existe.')
+        return id
+
+    def validar(self, fila):
+        """Registro listo para insertar; ValueError con el motivo si la fila no es válida"""
+        nombre = _ESPACIOS.sub(' ', fila.get('nombre', '')).strip()
+        if not nombre:
+            raise ValueError('El nombre es obligatorio.')
+        if len(nombre) > 100:
+            raise ValueError('El nombre supera los 100 caracteres.')
+        if clave(nombre) in self.existentes:
+            raise ValueError(f'Ya existe un colaborador llamado "{nombre}".')
+        if not fila.get('cargo'):
+            raise ValueError('El cargo es obligatorio.')
+        cargo, area, departamento = self._resolver(self.cargos, fila['cargo'], 'El cargo')
+        # Por defecto el área y el departamento son los del cargo, como en el formulario
+        if fila.get('area'):
+            area = self._resolver(self.areas, fila['area'], 'El área')
+        if fila.get('departamento'):
+            departamento = self._resolver(self.departamentos, fila['departamento'], 'El departamento')
+        if area is None or departamento is None:
+            raise ValueError('El cargo no tiene área o departamento; indíquelos en las columnas AREA y DEPARTAMENTO.')
+        if not fila.get('ubicacion'):
+            raise ValueError('La ubicación es obligatoria.')
+        ubicacion = self._resolver(self.ubicaciones, fila['ubicacion'], 'La ubicación')
+
+        valores = {tipo: [v.strip() for v in _SEPARADOR_VALORES.split(fila.get(tipo, '')) if v.strip()]
+                   for tipo in TIPOS_CONTACTO}
+        for extension in valores['extensiones']:
+            if not extension.isdigit() or len(extension) > 9:
+                raise ValueError(f'Extensión no válida: {extension}.')
+        valores['celulares'] = [re.sub(r'[\s()+-]', '', celular) for celular in valores['celulares']]
+        for celular in valores['celulares']:
+            if not celular.isdigit() or len(celular) > 15:
+                raise ValueError(f'Celular no válido: {celular}.')
+        correos = set()
+        for correo in valores['correos']:
+            error = validar_correo(correo)
+            if error is None and len(correo) > 50:
+                error = 'El correo supera los 50 caracteres.'
+            # En la base o en una fila anterior (o repetido en esta)
+            if error is None and (correo.lower() in self.correos or correo.lower() in correos):
+                error = CORREO_REGISTRADO
+            if error:
+                raise ValueError(f'{error} ({correo})')
+            correos.add(correo.lower())
+
+        self.existentes.add(clave(nombre))
+        self.correos |= correos
+        return dict(valores, nombre=nombre, cargo=cargo, area=area, departamento=departamento, ubicacion=ubicacion)
+
+    def importar(self, filas, simular=False):
+        """Validar e insertar las filas; con ``simular`` solo se validan"""
+        lote = []
+        for numero, fila in filas:
+            self.procesadas += 1
+            try:
+                registro = self.validar(fila)
+            except ValueError as e:
+                self.errores.append((numero, str(e)))
+                continue
+            if simular:
+                continue
+            lote.append((numero, registro))
+            if len(lote) >= self.tamano_lote:
+                self._guardar(lote)
+                lote = []
+        if lote:
+            self._guardar(lote)
+        self.errores.sort()
+        return self
+
+    def _guardar(self, lote):
+        try:
+            ids = self._insertar(lote)
+            self.conexion.commit()
+        except Exception as e:
+            self.conexion.rollback()
+            if len(lote) == 1:
+                if self.clave_duplicada and self.clave_duplicada(e):
+                    self.errores.append((lote[0][0], CORREO_REGISTRADO))
+                else:
+                    self.errores.append((lote[0][0], f'Error al guardar: {e}'))
+            else:
+                for item in lote:
+                    self._guardar([item])
+            return
+        self.insertados.extend(ids)
+
+    def _insertar(self, lote):
+        contactos = {tipo: [] for tipo in TIPOS_CONTACTO}
+        ids = []
+        cur = self.conexion.cursor()
+        try:
+            for _, r in lote:
+                # Una fila a la vez: se necesita el ID generado para sus contactos
+                cur.execute(
+                    "INSERT INTO colaboradores (NOMBRE, DEPARTAMENTO, AREA, CARGO, UBICACION) VALUES (%s, %s, %s, %s, %s)",
+                    (r['nombre'], r['departamento'], r['area'], r['cargo'], r['ubicacion']),
+                )
+                id = cur.lastrowid
+                ids.append(id)
+                for tipo in TIPOS_CONTACTO:
+                    contactos[tipo].extend((id, valor, r['area'], r['departamento']) for valor in r[tipo])
+            for tipo, columna in (('extensiones', 'EXTENSION'), ('celulares', 'CELULAR'), ('correos', 'CORREO')):
+                if contactos[tipo]:
+                    cur.executemany(
+                        f"INSERT INTO {tipo} (ID_COLABORADOR, {columna}, AREA, DEPARTAMENTO) VALUES (%s, %s, %s, %s)",
+                        contactos[tipo],
+                    )
+            if self.al_insertar:
+                self.al_insertar(cur, ids)
+        finally:
+            cur.close()
+        return ids
@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AlmacenMemoria:
+    """Estado de los límites en este proceso; las entradas vencidas se eliminan solas"""
+
+    def __init__(self, intervalo_limpieza=60):
+        self.intervalo_limpieza = intervalo_limpieza
+        self._datos = {}
+        self._lock = threading.Lock()
+        self._limpiado_en = time.time()
+
+    @contextmanager
+    def transaccion(self):
+        with self._lock:
+            ahora = time.time()
+            if ahora - self._limpiado_en >= self.intervalo_limpieza:
+                self._datos = {clave: dato for clave, dato in self._datos.items() if dato[1] > ahora}
+                self._limpiado_en = ahora
+            yield self
+
+    def leer(self, clave):
+        dato = self._datos.get(clave)
+        if dato is None or dato[1] <= time.time():
+            return None
+        return dato[0]
+
+    def escribir(self, clave, valor, expira):
+        self._datos[clave] = (valor, expira)
+
+    def borrar(self, clave):
+        self._datos.pop(clave, None)
+
+
+class AlmacenSQLite:
+    """Estado de los límites en un archivo SQLite local, compartido por los workers de la máquina"""
+
+    def __init__(self, ruta, intervalo_limpieza=60):
+        self.ruta = ruta
+        self.intervalo_limpieza = intervalo_limpieza
+        self._local = threading.local()
+        self._limpiado_en = 0.0
+        with self._conexion() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS limites ("
+                "CLAVE TEXT PRIMARY KEY, TOKENS REAL NOT NULL, ACTUALIZADO REAL NOT NULL, EXPIRA REAL NOT NULL)"
+            )
+
+    def _conexion(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaccion(self):
+        conn = self._conexion()
+        # IMMEDIATE toma el bloqueo de escritura al empezar: leer y actualizar es atómico entre procesos
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ahora = time.time()
+            if ahora - self._limpiado_en >= self.intervalo_limpieza:
+                conn.execute("DELETE FROM limites WHERE EXPIRA <= ?", (ahora,))
+                self._limpiado_en = ahora
+            yield self
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def leer(self, clave):
+        fila = self._conexion().execute(
+            "SELECT TOKENS, ACTUALIZADO FROM limites WHERE CLAVE = ? AND EXPIRA > ?", (clave, time.time())
+        ).fetchone()
+        return tuple(fila) if fila else None
+
+    def escribir(self, clave, valor, expira):
+        self._conexion().execute(
+            "INSERT OR REPLACE INTO limites (CLAVE, TOKENS, ACTUALIZADO, EXPIRA) VALUES (?, ?, ?, ?)",
+            (clave, valor[0], valor[1], expira),
+        )
+
+    def borrar(self, clave):
+        self._conexion().execute("DELETE FROM limites WHERE CLAVE = ?", (clave,))
+
+
+class LimitadorIntentos:
+    """Cubetas de fichas (token bucket) para limitar intentos por clave
+
+    Cada clave tiene una capacidad de intentos seguidos; se recupera una ficha
+    cada ``segundos_por_intento``. Una cubeta llena no se guarda: su entrada
+    vence justo cuando se habría vuelto a llenar.
+    """
+
+    def __init__(self, almacen, segundos_por_intento=60):
+        self.almacen = almacen
+        self.segundos_por_intento = segundos_por_intento
+
+    def _fichas(self, estado, capacidad, ahora):
+        if estado is None:
+            return float(capacidad)
+        fichas, actualizado = estado
+        return min(float(capacidad), fichas + (ahora - actualizado) / self.segundos_por_intento)
+
+    def intentar(self, claves):
+        """Gastar un intento de cada clave ({clave: capacidad})
+
+        Devuelve (segundos de espera, intentos restantes). Si alguna cubeta está
+        vacía no se gasta nada y la espera es mayor que cero.
+        """
+        ahora = time.time()
+        with self.almacen.transaccion() as almacen:
+            fichas = {clave: self._fichas(almacen.leer(clave), capacidad, ahora) for clave, capacidad in claves.items()}
+            vacias = [clave for clave, disponibles in fichas.items() if disponibles < 1]
+            if vacias:
+                espera = max((1 - fichas[clave]) * self.segundos_por_intento for clave in vacias)
+                return espera, 0
+            for clave, disponibles in fichas.items():
+                restantes = disponibles - 1
+                expira = ahora + (claves[clave] - restantes) * self.segundos_por_intento
+                almacen.escribir(clave, (restantes, ahora), expira)
+        return 0, int(min(fichas.values()) - 1)
+
+    def devolver(self, claves):
+        """Devolver el intento gastado en cada clave ({clave: capacidad}), p. ej. si salió bien"""
+        ahora = time.time()
+        with self.almacen.transaccion() as almacen:
+            for clave, capacidad in claves.items():
+                fichas = min(float(capacidad), self._fichas(almacen.leer(clave), capacidad, ahora) + 1)
+                if fichas >= capacidad:
+                    almacen.borrar(clave)
+                else:
+                    almacen.escribir(clave, (fichas, ahora), ahora + (capacidad - fichas) * self.segundos_por_intento)
+
+    def reiniciar(self, clave):
+        with self.almacen.transaccion() as almacen:
+            almacen.borrar(clave)
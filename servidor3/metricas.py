@@ -0,0 +1,426 @@
+import bisect
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import MySQLdb.cursors
+from flask import before_render_template, current_app, g, request, template_rendered
+
+# Límites de los histogramas: segundos (latencias) y consultas por petición
+LIMITES_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+# Normalización de SQL para el registro de consultas lentas
+_ESPACIOS = re.compile(r'\s+')
+_LITERALES = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+# Sentencias que MySQL puede explicar
+_EXPLICABLES = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+# Segundos antes de volver a capturar el EXPLAIN de una misma consulta
+_EXPLAIN_CADA = 300
+
+
+class PresupuestoConsultasExcedido(Exception):
+    """La petición superó su presupuesto de consultas (solo en modo estricto o en pruebas)"""
+
+
+def normalizar_sql(sql):
+    """Consulta en una línea con los valores como ``?`` y las listas ``IN (?, ?...)`` abreviadas"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _LITERALES.sub('?', _ESPACIOS.sub(' ', sql).strip()).replace('%s', '?')
+    return _LISTAS.sub('(?, ...)', sql)
+
+
+def redactar_parametros(args, varias=False):
+    """Solo el tipo (y largo) de cada parámetro: los valores pueden ser datos personales"""
+    if varias:
+        return f'{len(args)} filas'
+    if args is None:
+        return '()'
+    valores = args.values() if isinstance(args, dict) else args if isinstance(args, (list, tuple)) else (args,)
+    return '(' + ', '.join(
+        f'{type(valor).__name__}[{len(valor)}]' if isinstance(valor, (str, bytes)) else type(valor).__name__
+        for valor in valores
+    ) + ')'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Histograma:
+    """Cubetas fijas (no acumuladas) más suma y cuenta; se acumulan al exponer"""
+
+    __slots__ = ('cubetas', 'suma', 'cuenta')
+
+    def __init__(self, limites):
+        self.cubetas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.cuenta = 0
+
+
+class Familia:
+    """Una métrica con sus series, una por combinación de valores de etiquetas"""
+
+    def __init__(self, nombre, tipo, ayuda, etiquetas=(), limites=None):
+        self.nombre = nombre
+        self.tipo = tipo
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = limites
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valores, valor):
+        """Anotar una observación en el histograma de la serie ``valores``"""
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = Histograma(self.limites)
+            # Prometheus cuenta en cada cubeta los valores menores o iguales a su límite
+            serie.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+            serie.suma += valor
+            serie.cuenta += 1
+
+    def incrementar(self, valores, cantidad=1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+    def lineas(self, extra=''):
+        yield f'# HELP {self.nombre} {self.ayuda}'
+        yield f'# TYPE {self.nombre} {self.tipo}'
+        with self._lock:
+            series = [(valores, serie if self.limites is None else
+                       (list(serie.cubetas), serie.suma, serie.cuenta))
+                      for valores, serie in self._series.items()]
+        for valores, serie in sorted(series, key=lambda s: s[0]):
+            if self.limites is None:
+                yield f'{self.nombre}{_etiquetas(self.etiquetas, valores, extra)} {_numero(serie)}'
+                continue
+            cubetas, suma, cuenta = serie
+            acumulado = 0
+            for limite, en_cubeta in zip(self.limites + ('+Inf',), cubetas):
+                acumulado += en_cubeta
+                le = f'le="{limite}"'
+                yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, extra + "," + le if extra else le)} {acumulado}'
+            yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, valores, extra)} {_numero(suma)}'
+            yield f'{self.nombre}_count{_etiquetas(self.etiquetas, valores, extra)} {cuenta}'
+
+
+class MedicionPeticion:
+    """Consultas, tiempo en la base de datos y filas leídas durante una petición"""
+
+    __slots__ = ('inicio', 'estado', 'consultas', 'tiempo_bd', 'filas', 'plantilla_inicio', 'presupuesto')
+
+    def __init__(self, presupuesto=None):
+        self.inicio = time.perf_counter()
+        self.presupuesto = presupuesto
+        self.estado = 500
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.filas = 0
+        self.plantilla_inicio = 0.0
+
+
+def _medicion():
+    """Medición de la petición en curso, o None fuera de una petición (comandos, arranque)"""
+    try:
+        return g._medicion
+    except (AttributeError, RuntimeError):
+        return None
+
+
+class CursorMedido:
+    """Cursor que anota en la petición en curso cada consulta, su duración y las filas leídas
+
+    Las consultas que tardan más que ``umbral_lenta`` se registran (ver
+    ``Metricas.consulta_lenta``).
+    """
+
+    __slots__ = ('_cursor', '_conn', '_metricas')
+
+    def __init__(self, cursor, conn, metricas):
+        self._cursor = cursor
+        self._conn = conn
+        self._metricas = metricas
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def _medir(self, metodo, query, args, varias=False):
+        medicion = _medicion()
+        if medicion is not None and medicion.presupuesto is not None and medicion.consultas >= medicion.presupuesto:
+            self._metricas.presupuesto_agotado(medicion)
+        inicio = time.perf_counter()
+        try:
+            return metodo(query, args)
+        finally:
+            duracion = time.perf_counter() - inicio
+            if medicion is not None:
+                medicion.consultas += 1
+                medicion.tiempo_bd += duracion
+            umbral = self._metricas.umbral_lenta
+            if umbral and duracion >= umbral:
+                self._metricas.consulta_lenta(self, query, args, duracion, varias)
+
+    def execute(self, query, args=None):
+        return self._medir(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._medir(self._cursor.executemany, query, args, varias=True)
+
+    def _contar(self, filas):
+        medicion = _medicion()
+        if medicion is not None:
+            medicion.filas += filas
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        if fila is not None:
+            self._contar(1)
+        return fila
+
+    def fetchmany(self, size=None):
+        filas = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._contar(len(filas))
+        return filas
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        self._contar(len(filas))
+        return filas
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class ConexionMedida:
+    """Conexión MySQLdb cuyos cursores se miden (ver ``CursorMedido``)"""
+
+    __slots__ = ('_conn', '_metricas')
+
+    def __init__(self, conn, metricas):
+        self._conn = conn
+        self._metricas = metricas
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conn.cursor(*args, **kwargs), self._conn, self._metricas)
+
+
+class Metricas:
+    """Métricas de la aplicación en formato de texto de Prometheus
+
+    Por petición se mide la latencia por endpoint, las consultas a MySQL, su
+    tiempo y las filas leídas (las conexiones del pool se envuelven con
+    ``ConexionMedida``), y el tiempo de render de cada plantilla. Los
+    ``recolectores`` agregan al exponer valores que ya se llevan en otros
+    objetos (pool, cachés...). Cada proceso tiene sus propias métricas; la
+    etiqueta ``pid`` distingue los workers de gunicorn.
+
+    Además vigila las consultas: registra con su EXPLAIN las que tardan más de
+    ``MYSQL_CONSULTA_LENTA`` segundos y avisa cuando una petición hace más de
+    ``MYSQL_PRESUPUESTO_CONSULTAS`` consultas (en pruebas o con
+    ``MYSQL_PRESUPUESTO_ESTRICTO`` la petición falla).
+    """
+
+    def __init__(self, app=None, prefijo='farbiopharma'):
+        self.prefijo = prefijo
+        self._familias = []
+        self._recolectores = []
+        self.umbral_lenta = 0
+        self.presupuesto_consultas = None
+        self._explicadas = {}
+        self.peticiones = self.contador(
+            'http_peticiones_total', 'Peticiones atendidas', ('endpoint', 'metodo', 'estado'))
+        self.duracion = self.histograma(
+            'http_duracion_segundos', 'Duración de las peticiones', ('endpoint',))
+        self.consultas = self.histograma(
+            'bd_consultas_por_peticion', 'Consultas a MySQL por petición', ('endpoint',), LIMITES_CONSULTAS)
+        self.tiempo_bd = self.histograma(
+            'bd_tiempo_por_peticion_segundos', 'Tiempo en MySQL por petición', ('endpoint',))
+        self.filas = self.contador(
+            'bd_filas_leidas_total', 'Filas leídas de MySQL', ('endpoint',))
+        self.plantillas = self.histograma(
+            'plantilla_duracion_segundos', 'Tiempo de render de cada plantilla', ('plantilla',))
+        self.bcrypt = self.histograma(
+            'bcrypt_duracion_segundos', 'Tiempo de cálculo de cada hash bcrypt', ('operacion',))
+        self.lentas = self.contador(
+            'bd_consultas_lentas_total', 'Consultas más lentas que MYSQL_CONSULTA_LENTA', ('endpoint',))
+        self.excedidas = self.contador(
+            'bd_presupuesto_excedido_total', 'Peticiones que superaron su presupuesto de consultas', ('endpoint',))
+        if app is not None:
+            self.init_app(app)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        familia = Familia(f'{self.prefijo}_{nombre}', 'histogram', ayuda, etiquetas, tuple(limites))
+        self._familias.append(familia)
+        return familia
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        familia = Familia(f'{self.prefijo}_{nombre}', 'counter', ayuda, etiquetas)
+        self._familias.append(familia)
+        return familia
+
+    def recolector(self, funcion):
+        """Decorador: ``funcion()`` devuelve [(nombre, tipo, ayuda, [({etiqueta: valor}, número)])]"""
+        self._recolectores.append(funcion)
+        return funcion
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_CONSULTA_LENTA', 0.5)
+        app.config.setdefault('MYSQL_PRESUPUESTO_CONSULTAS', 30)
+        app.config.setdefault('MYSQL_PRESUPUESTO_ESTRICTO', False)
+        self.app = app
+        self.umbral_lenta = float(app.config['MYSQL_CONSULTA_LENTA'])
+        self.presupuesto_consultas = int(app.config['MYSQL_PRESUPUESTO_CONSULTAS']) or None
+        self.registro = app.logger
+        app.before_request(self._iniciar)
+        app.after_request(self._anotar_estado)
+        app.teardown_request(self._terminar)
+        before_render_template.connect(self._antes_plantilla, app)
+        template_rendered.connect(self._despues_plantilla, app)
+
+    def instrumentar(self, bd):
+        """Medir las consultas de las conexiones que abra ``bd`` (ver repositorio.py)"""
+        bd.envolver = lambda conn: ConexionMedida(conn, self)
+
+    def presupuesto(self, consultas):
+        """Decorador de rutas: presupuesto propio de consultas (None: sin límite)"""
+        def decorador(vista):
+            vista.presupuesto_consultas = consultas
+            return vista
+        return decorador
+
+    # --------------------------------------Medición por petición----------------------------------------------------------------------
+
+    def _iniciar(self):
+        vista = current_app.view_functions.get(request.endpoint)
+        g._medicion = MedicionPeticion(getattr(vista, 'presupuesto_consultas', self.presupuesto_consultas))
+
+    def _anotar_estado(self, respuesta):
+        medicion = _medicion()
+        if medicion is not None:
+            medicion.estado = respuesta.status_code
+        return respuesta
+
+    def _terminar(self, exception):
+        # teardown_request: con stream_with_context llega al terminar de enviar la respuesta
+        medicion = g.pop('_medicion', None)
+        if medicion is None:
+            return
+        endpoint = (request.endpoint or 'sin_ruta',)
+        self.peticiones.incrementar((endpoint[0], request.method, str(medicion.estado)))
+        self.duracion.observar(endpoint, time.perf_counter() - medicion.inicio)
+        self.consultas.observar(endpoint, medicion.consultas)
+        self.tiempo_bd.observar(endpoint, medicion.tiempo_bd)
+        if medicion.filas:
+            self.filas.incrementar(endpoint, medicion.filas)
+        if medicion.presupuesto is not None and medicion.consultas > medicion.presupuesto:
+            self.excedidas.incrementar(endpoint)
+            self.registro.warning('%s %s [%s] hizo %d consultas (presupuesto: %d); revisar consultas N+1',
+                                  request.method, request.path, endpoint[0], medicion.consultas, medicion.presupuesto)
+
+    def _antes_plantilla(self, sender, template, context, **extra):
+        medicion = _medicion()
+        if medicion is not None:
+            medicion.plantilla_inicio = time.perf_counter()
+
+    def _despues_plantilla(self, sender, template, context, **extra):
+        medicion = _medicion()
+        if medicion is not None and medicion.plantilla_inicio:
+            self.plantillas.observar((template.name,), time.perf_counter() - medicion.plantilla_inicio)
+            medicion.plantilla_inicio = 0.0
+
+    def observar_bcrypt(self, operacion, segundos):
+        self.bcrypt.observar((operacion,), segundos)
+
+    # --------------------------------------Consultas lentas y presupuesto----------------------------------------------------------------------
+
+    def presupuesto_agotado(self, medicion):
+        """Se va a ejecutar una consulta más de las presupuestadas"""
+        if self.app.testing or self.app.config['MYSQL_PRESUPUESTO_ESTRICTO']:
+            raise PresupuestoConsultasExcedido(
+                f'{request.method} {request.path} [{request.endpoint}] supera {medicion.presupuesto} consultas')
+
+    def consulta_lenta(self, cursor, query, args, duracion, varias):
+        """Registrar una consulta lenta con su EXPLAIN (uno cada ``_EXPLAIN_CADA`` segundos por consulta)"""
+        sql = normalizar_sql(query)
+        if _medicion() is not None:
+            ruta = f'{request.method} {request.path} [{request.endpoint}]'
+            self.lentas.incrementar((request.endpoint or 'sin_ruta',))
+        else:
+            ruta = 'fuera de una petición'
+        plan = ''
+        ahora = time.monotonic()
+        if (not varias and sql.lstrip('( ').upper().startswith(_EXPLICABLES)
+                and ahora - self._explicadas.get(sql, -_EXPLAIN_CADA) >= _EXPLAIN_CADA
+                # Un cursor sin buffer aún tiene filas pendientes en la conexión
+                and not isinstance(cursor._cursor, MySQLdb.cursors.SSCursor)
+                # El EXPLAIN de SQLite (BASE_DATOS=sqlite) no tiene el formato de MySQL
+                and not isinstance(cursor._cursor, sqlite3.Cursor)):
+            if len(self._explicadas) > 1000:
+                self._explicadas.clear()
+            self._explicadas[sql] = ahora
+            plan = '\n  EXPLAIN: ' + self._explicar(cursor._conn, query, args)
+        self.registro.warning('Consulta lenta (%.3f s) en %s: %s\n  Parámetros: %s%s',
+                              duracion, ruta, sql, redactar_parametros(args, varias), plan)
+
+    def _explicar(self, conn, query, args):
+        # Cursor sin medir: el EXPLAIN no cuenta como consulta de la petición
+        cur = conn.cursor()
+        try:
+            cur.execute('EXPLAIN ' + (query.decode('utf-8') if isinstance(query, bytes) else query), args)
+            columnas = [columna[0] for columna in cur.description]
+            pasos = [dict(zip(columnas, fila)) for fila in cur.fetchall()]
+        except Exception as e:
+            return f'no disponible ({e})'
+        finally:
+            cur.close()
+        return '; '.join(
+            f"{paso.get('table')} type={paso.get('type')} key={paso.get('key') or '-'} "
+            f"rows={paso.get('rows')} {paso.get('Extra') or ''}".strip()
+            for paso in pasos
+        )
+
+    # --------------------------------------Exposición----------------------------------------------------------------------
+
+    def exponer(self):
+        """Texto para /metrics (formato de exposición 0.0.4 de Prometheus)"""
+        pid = f'pid="{os.getpid()}"'
+        lineas = []
+        for familia in self._familias:
+            lineas.extend(familia.lineas(pid))
+        for recolector in self._recolectores:
+            for nombre, tipo, ayuda, series in recolector():
+                nombre = f'{self.prefijo}_{nombre}'
+                lineas.append(f'# HELP {nombre} {ayuda}')
+                lineas.append(f'# TYPE {nombre} {tipo}')
+                for etiquetas, valor in series:
+                    if valor is None:
+                        continue
+                    lineas.append(f'{nombre}{_etiquetas(etiquetas.keys(), etiquetas.values(), pid)} {_numero(valor)}')
+        return '\n'.join(lineas) + '\n'
@@ -0,0 +1,114 @@
+-- Esquema inicial: las tablas que antes creaba init_db() en cada arranque
+
+-- Crear tabla de usuarios
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Crear tabla de áreas
+CREATE TABLE IF NOT EXISTS areas (
+    ID_AREAS INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    AREA VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Crear tabla de departamentos
+CREATE TABLE IF NOT EXISTS departamentos (
+    ID_DEPARTAMENTOS INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+    DEPARTAMENTO VARCHAR(100) NOT NULL
+);
+
+-- Crear tabla de ubicaciones
+CREATE TABLE IF NOT EXISTS ubicaciones (
+    ID_UBICACIONES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+    DESCRIPCION VARCHAR(150) NOT NULL,
+    GEOLOCALIZACION VARCHAR(100) NOT NULL,
+    DIRECCION VARCHAR(100) NOT NULL
+);
+
+-- Crear tabla de cargos relacionada con áreas y departamentos
+CREATE TABLE IF NOT EXISTS cargos (
+    ID_CARGOS INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+    DESCRIPCION VARCHAR(150) NOT NULL,
+    AREA INT DEFAULT NULL,
+    DEPARTAMENTO INT DEFAULT NULL,
+    KEY AREA (AREA),
+    KEY DEPARTAMENTO (DEPARTAMENTO),
+    CONSTRAINT cargos_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
+    CONSTRAINT cargos_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS)
+);
+
+-- Crear tabla de colaboradores relacionada con áreas, departamentos, cargos y ubicaciones
+CREATE TABLE IF NOT EXISTS colaboradores (
+    ID_COLABORADORES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+    NOMBRE VARCHAR(100) NOT NULL,
+    DEPARTAMENTO INT DEFAULT NULL,
+    AREA INT DEFAULT NULL,
+    CARGO INT DEFAULT NULL,
+    UBICACION INT DEFAULT NULL,
+    KEY NOMBRE (NOMBRE),
+    KEY DEPARTAMENTO (DEPARTAMENTO),
+    KEY AREA (AREA),
+    KEY CARGO (CARGO),
+    KEY UBICACION (UBICACION),
+    CONSTRAINT colaboradores_ibfk_1 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
+    CONSTRAINT colaboradores_ibfk_2 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
+    CONSTRAINT colaboradores_ibfk_3 FOREIGN KEY (CARGO) REFERENCES cargos (ID_CARGOS),
+    CONSTRAINT colaboradores_ibfk_4 FOREIGN KEY (UBICACION) REFERENCES ubicaciones (ID_UBICACIONES)
+);
+
+-- Crear tabla de extensiones relacionada con áreas, departamentos y colaboradores (por ID)
+CREATE TABLE IF NOT EXISTS extensiones (
+    ID_EXTENSIONES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+    ID_COLABORADOR INT NOT NULL,
+    EXTENSION INT NOT NULL,
+    AREA INT DEFAULT NULL,
+    DEPARTAMENTO INT DEFAULT NULL,
+    KEY AREA (AREA),
+    KEY DEPARTAMENTO (DEPARTAMENTO),
+    KEY ID_COLABORADOR (ID_COLABORADOR),
+    CONSTRAINT extensiones_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
+    CONSTRAINT extensiones_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
+    CONSTRAINT extensiones_ibfk_3 FOREIGN KEY (ID_COLABORADOR) REFERENCES colaboradores (ID_COLABORADORES)
+);
+
+-- Crear tabla de celulares relacionada con áreas, departamentos y colaboradores (por ID)
+CREATE TABLE IF NOT EXISTS celulares (
+    ID_CELULARES INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+    ID_COLABORADOR INT NOT NULL,
+    CELULAR BIGINT NOT NULL,
+    AREA INT NOT NULL,
+    DEPARTAMENTO INT NOT NULL,
+    KEY AREA (AREA),
+    KEY DEPARTAMENTO (DEPARTAMENTO),
+    KEY ID_COLABORADOR (ID_COLABORADOR),
+    CONSTRAINT celulares_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
+    CONSTRAINT celulares_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
+    CONSTRAINT celulares_ibfk_3 FOREIGN KEY (ID_COLABORADOR) REFERENCES colaboradores (ID_COLABORADORES)
+);
+
+-- Crear tabla de versiones de datos (invalidación de cachés entre procesos)
+CREATE TABLE IF NOT EXISTS versiones_datos (
+    TABLA VARCHAR(64) PRIMARY KEY NOT NULL,
+    VERSION BIGINT NOT NULL DEFAULT 0,
+    ACTUALIZADO TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Crear tabla de correos relacionada con áreas, departamentos y colaboradores (por ID)
+CREATE TABLE IF NOT EXISTS correos (
+    ID_CORREOS INT PRIMARY KEY NOT NULL AUTO_INCREMENT,
+    ID_COLABORADOR INT NOT NULL,
+    CORREO VARCHAR(50) NOT NULL,
+    AREA INT NOT NULL,
+    DEPARTAMENTO INT NOT NULL,
+    KEY AREA (AREA),
+    KEY DEPARTAMENTO (DEPARTAMENTO),
+    KEY ID_COLABORADOR (ID_COLABORADOR),
+    CONSTRAINT correos_ibfk_1 FOREIGN KEY (AREA) REFERENCES areas (ID_AREAS),
+    CONSTRAINT correos_ibfk_2 FOREIGN KEY (DEPARTAMENTO) REFERENCES departamentos (ID_DEPARTAMENTOS),
+    CONSTRAINT correos_ibfk_3 FOREIGN KEY (ID_COLABORADOR) REFERENCES colaboradores (ID_COLABORADORES)
+);
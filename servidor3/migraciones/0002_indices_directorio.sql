@@ -0,0 +1,33 @@
+-- Índices para los recorridos del directorio y las búsquedas por valor de contacto
+-- (comprobar los planes con `flask explicar`)
+
+-- Colaboradores: filtros por área, departamento o cargo recorridos ya ordenados por nombre
+-- (InnoDB agrega la clave primaria al final: el orden es NOMBRE, ID_COLABORADORES como la paginación)
+ALTER TABLE colaboradores
+    ADD INDEX AREA_NOMBRE (AREA, NOMBRE),
+    ADD INDEX DEPARTAMENTO_NOMBRE (DEPARTAMENTO, NOMBRE),
+    ADD INDEX CARGO_NOMBRE (CARGO, NOMBRE),
+    DROP INDEX AREA,
+    DROP INDEX DEPARTAMENTO,
+    DROP INDEX CARGO;
+
+-- Filtro por nombre: palabras e iniciales sin recorrer la tabla
+-- (el primer índice FULLTEXT reconstruye la tabla una vez)
+ALTER TABLE colaboradores ADD FULLTEXT INDEX NOMBRE_TEXTO (NOMBRE);
+
+-- Contactos: los de un colaborador sin leer la fila completa, y búsqueda por valor
+ALTER TABLE extensiones
+    ADD INDEX COLABORADOR_EXTENSION (ID_COLABORADOR, EXTENSION),
+    DROP INDEX ID_COLABORADOR,
+    ADD INDEX EXTENSION (EXTENSION);
+
+ALTER TABLE celulares
+    ADD INDEX COLABORADOR_CELULAR (ID_COLABORADOR, CELULAR),
+    DROP INDEX ID_COLABORADOR,
+    ADD INDEX CELULAR (CELULAR);
+
+-- Un correo pertenece a una sola persona (falla si ya hay correos repetidos: corregirlos antes)
+ALTER TABLE correos
+    ADD INDEX COLABORADOR_CORREO (ID_COLABORADOR, CORREO),
+    DROP INDEX ID_COLABORADOR,
+    ADD UNIQUE INDEX CORREO (CORREO);
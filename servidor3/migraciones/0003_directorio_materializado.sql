@@ -0,0 +1,48 @@
+-- Directorio materializado: una fila por contacto con el nombre del colaborador y el
+-- área y departamento de su cargo ya resueltos, para que las vistas lean una sola tabla.
+-- Se mantiene al escribir (ver directorio.py); `flask directorio verificar` compara
+-- con las tablas de origen y `flask directorio reconstruir` lo vuelve a llenar.
+
+CREATE TABLE IF NOT EXISTS directorio (
+    TIPO VARCHAR(12) NOT NULL,
+    ID_CONTACTO INT NOT NULL,
+    ID_COLABORADOR INT NOT NULL,
+    NOMBRE VARCHAR(100) NOT NULL,
+    VALOR VARCHAR(50) NOT NULL,
+    ID_AREA INT DEFAULT NULL,
+    AREA VARCHAR(100) DEFAULT NULL,
+    ID_DEPARTAMENTO INT DEFAULT NULL,
+    DEPARTAMENTO VARCHAR(100) DEFAULT NULL,
+    PRIMARY KEY (TIPO, ID_CONTACTO),
+    -- Recorridos de cada vista ya ordenados por (NOMBRE, ID_CONTACTO), como la paginación
+    KEY TIPO_NOMBRE (TIPO, NOMBRE, ID_CONTACTO),
+    KEY TIPO_AREA_NOMBRE (TIPO, ID_AREA, NOMBRE, ID_CONTACTO),
+    KEY TIPO_DEPARTAMENTO_NOMBRE (TIPO, ID_DEPARTAMENTO, NOMBRE, ID_CONTACTO),
+    KEY COLABORADOR (ID_COLABORADOR),
+    FULLTEXT KEY NOMBRE_TEXTO (NOMBRE)
+);
+
+-- Llenado inicial (IGNORE: la migración se puede repetir)
+INSERT IGNORE INTO directorio (TIPO, ID_CONTACTO, ID_COLABORADOR, NOMBRE, VALOR, ID_AREA, AREA, ID_DEPARTAMENTO, DEPARTAMENTO)
+SELECT 'extensiones', e.ID_EXTENSIONES, e.ID_COLABORADOR, col.NOMBRE, CAST(e.EXTENSION AS CHAR), cg.AREA, a.AREA, cg.DEPARTAMENTO, d.DEPARTAMENTO
+FROM extensiones e
+JOIN colaboradores col ON e.ID_COLABORADOR = col.ID_COLABORADORES
+LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS;
+
+INSERT IGNORE INTO directorio (TIPO, ID_CONTACTO, ID_COLABORADOR, NOMBRE, VALOR, ID_AREA, AREA, ID_DEPARTAMENTO, DEPARTAMENTO)
+SELECT 'celulares', c.ID_CELULARES, c.ID_COLABORADOR, col.NOMBRE, CAST(c.CELULAR AS CHAR), cg.AREA, a.AREA, cg.DEPARTAMENTO, d.DEPARTAMENTO
+FROM celulares c
+JOIN colaboradores col ON c.ID_COLABORADOR = col.ID_COLABORADORES
+LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS;
+
+INSERT IGNORE INTO directorio (TIPO, ID_CONTACTO, ID_COLABORADOR, NOMBRE, VALOR, ID_AREA, AREA, ID_DEPARTAMENTO, DEPARTAMENTO)
+SELECT 'correos', c.ID_CORREOS, c.ID_COLABORADOR, col.NOMBRE, c.CORREO, cg.AREA, a.AREA, cg.DEPARTAMENTO, d.DEPARTAMENTO
+FROM correos c
+JOIN colaboradores col ON c.ID_COLABORADOR = col.ID_COLABORADORES
+LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS;
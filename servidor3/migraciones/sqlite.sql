@@ -0,0 +1,123 @@
+-- Esquema para la base SQLite embebida (BASE_DATOS=sqlite, ver repositorio.py): el mismo
+-- que dejan las migraciones NNNN_*.sql en MySQL, traducido a SQLite. Se ejecuta entero al
+-- abrir la base; al agregar una migración hay que reflejarla aquí y en version_esquema.
+-- Los índices FULLTEXT no existen en SQLite: el filtro por nombre usa LIKE.
+
+CREATE TABLE IF NOT EXISTS version_esquema (
+    VERSION INTEGER PRIMARY KEY NOT NULL,
+    NOMBRE VARCHAR(150) NOT NULL,
+    APLICADA TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS areas (
+    ID_AREAS INTEGER PRIMARY KEY AUTOINCREMENT,
+    AREA VARCHAR(100) NOT NULL COLLATE NOCASE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS departamentos (
+    ID_DEPARTAMENTOS INTEGER PRIMARY KEY AUTOINCREMENT,
+    DEPARTAMENTO VARCHAR(100) NOT NULL COLLATE NOCASE
+);
+
+CREATE TABLE IF NOT EXISTS ubicaciones (
+    ID_UBICACIONES INTEGER PRIMARY KEY AUTOINCREMENT,
+    DESCRIPCION VARCHAR(150) NOT NULL COLLATE NOCASE,
+    GEOLOCALIZACION VARCHAR(100) NOT NULL,
+    DIRECCION VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cargos (
+    ID_CARGOS INTEGER PRIMARY KEY AUTOINCREMENT,
+    DESCRIPCION VARCHAR(150) NOT NULL COLLATE NOCASE,
+    AREA INT DEFAULT NULL REFERENCES areas (ID_AREAS),
+    DEPARTAMENTO INT DEFAULT NULL REFERENCES departamentos (ID_DEPARTAMENTOS)
+);
+CREATE INDEX IF NOT EXISTS cargos_AREA ON cargos (AREA);
+CREATE INDEX IF NOT EXISTS cargos_DEPARTAMENTO ON cargos (DEPARTAMENTO);
+
+CREATE TABLE IF NOT EXISTS colaboradores (
+    ID_COLABORADORES INTEGER PRIMARY KEY AUTOINCREMENT,
+    NOMBRE VARCHAR(100) NOT NULL COLLATE NOCASE,
+    DEPARTAMENTO INT DEFAULT NULL REFERENCES departamentos (ID_DEPARTAMENTOS),
+    AREA INT DEFAULT NULL REFERENCES areas (ID_AREAS),
+    CARGO INT DEFAULT NULL REFERENCES cargos (ID_CARGOS),
+    UBICACION INT DEFAULT NULL REFERENCES ubicaciones (ID_UBICACIONES)
+);
+CREATE INDEX IF NOT EXISTS colaboradores_NOMBRE ON colaboradores (NOMBRE, ID_COLABORADORES);
+CREATE INDEX IF NOT EXISTS colaboradores_AREA_NOMBRE ON colaboradores (AREA, NOMBRE);
+CREATE INDEX IF NOT EXISTS colaboradores_DEPARTAMENTO_NOMBRE ON colaboradores (DEPARTAMENTO, NOMBRE);
+CREATE INDEX IF NOT EXISTS colaboradores_CARGO_NOMBRE ON colaboradores (CARGO, NOMBRE);
+CREATE INDEX IF NOT EXISTS colaboradores_UBICACION ON colaboradores (UBICACION);
+
+CREATE TABLE IF NOT EXISTS extensiones (
+    ID_EXTENSIONES INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_COLABORADOR INT NOT NULL REFERENCES colaboradores (ID_COLABORADORES),
+    EXTENSION INT NOT NULL,
+    AREA INT DEFAULT NULL REFERENCES areas (ID_AREAS),
+    DEPARTAMENTO INT DEFAULT NULL REFERENCES departamentos (ID_DEPARTAMENTOS)
+);
+CREATE INDEX IF NOT EXISTS extensiones_COLABORADOR_EXTENSION ON extensiones (ID_COLABORADOR, EXTENSION);
+CREATE INDEX IF NOT EXISTS extensiones_EXTENSION ON extensiones (EXTENSION);
+CREATE INDEX IF NOT EXISTS extensiones_AREA ON extensiones (AREA);
+CREATE INDEX IF NOT EXISTS extensiones_DEPARTAMENTO ON extensiones (DEPARTAMENTO);
+
+CREATE TABLE IF NOT EXISTS celulares (
+    ID_CELULARES INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_COLABORADOR INT NOT NULL REFERENCES colaboradores (ID_COLABORADORES),
+    CELULAR BIGINT NOT NULL,
+    AREA INT NOT NULL REFERENCES areas (ID_AREAS),
+    DEPARTAMENTO INT NOT NULL REFERENCES departamentos (ID_DEPARTAMENTOS)
+);
+CREATE INDEX IF NOT EXISTS celulares_COLABORADOR_CELULAR ON celulares (ID_COLABORADOR, CELULAR);
+CREATE INDEX IF NOT EXISTS celulares_CELULAR ON celulares (CELULAR);
+CREATE INDEX IF NOT EXISTS celulares_AREA ON celulares (AREA);
+CREATE INDEX IF NOT EXISTS celulares_DEPARTAMENTO ON celulares (DEPARTAMENTO);
+
+CREATE TABLE IF NOT EXISTS correos (
+    ID_CORREOS INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_COLABORADOR INT NOT NULL REFERENCES colaboradores (ID_COLABORADORES),
+    CORREO VARCHAR(50) NOT NULL UNIQUE COLLATE NOCASE,
+    AREA INT NOT NULL REFERENCES areas (ID_AREAS),
+    DEPARTAMENTO INT NOT NULL REFERENCES departamentos (ID_DEPARTAMENTOS)
+);
+CREATE INDEX IF NOT EXISTS correos_COLABORADOR_CORREO ON correos (ID_COLABORADOR, CORREO);
+CREATE INDEX IF NOT EXISTS correos_AREA ON correos (AREA);
+CREATE INDEX IF NOT EXISTS correos_DEPARTAMENTO ON correos (DEPARTAMENTO);
+
+-- ACTUALIZADO se fija al incrementar (SQLite no tiene ON UPDATE CURRENT_TIMESTAMP)
+CREATE TABLE IF NOT EXISTS versiones_datos (
+    TABLA VARCHAR(64) PRIMARY KEY NOT NULL,
+    VERSION BIGINT NOT NULL DEFAULT 0,
+    ACTUALIZADO TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS directorio (
+    TIPO VARCHAR(12) NOT NULL,
+    ID_CONTACTO INT NOT NULL,
+    ID_COLABORADOR INT NOT NULL,
+    NOMBRE VARCHAR(100) NOT NULL COLLATE NOCASE,
+    VALOR VARCHAR(50) NOT NULL,
+    ID_AREA INT DEFAULT NULL,
+    AREA VARCHAR(100) DEFAULT NULL,
+    ID_DEPARTAMENTO INT DEFAULT NULL,
+    DEPARTAMENTO VARCHAR(100) DEFAULT NULL,
+    PRIMARY KEY (TIPO, ID_CONTACTO)
+);
+CREATE INDEX IF NOT EXISTS directorio_TIPO_NOMBRE ON directorio (TIPO, NOMBRE, ID_CONTACTO);
+CREATE INDEX IF NOT EXISTS directorio_TIPO_AREA_NOMBRE ON directorio (TIPO, ID_AREA, NOMBRE, ID_CONTACTO);
+CREATE INDEX IF NOT EXISTS directorio_TIPO_DEPARTAMENTO_NOMBRE ON directorio (TIPO, ID_DEPARTAMENTO, NOMBRE, ID_CONTACTO);
+CREATE INDEX IF NOT EXISTS directorio_COLABORADOR ON directorio (ID_COLABORADOR);
+
+INSERT OR IGNORE INTO version_esquema (VERSION, NOMBRE) VALUES
+    (1, 'esquema_inicial'),
+    (2, 'indices_directorio'),
+    (3, 'directorio_materializado');
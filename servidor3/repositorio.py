@@ -0,0 +1,687 @@
+import functools
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import MySQLdb
+import MySQLdb.cursors
+
+from conexiones import EnrutadorLecturas, MySQLPool
+
+ESQUEMA_SQLITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migraciones', 'sqlite.sql')
+
+# Tabla, columna ID y columna de valor de cada tipo de contacto
+COLUMNAS_CONTACTO = (
+    ('extensiones', 'ID_EXTENSIONES', 'EXTENSION'),
+    ('celulares', 'ID_CELULARES', 'CELULAR'),
+    ('correos', 'ID_CORREOS', 'CORREO'),
+)
+
+# Columnas de ``directorio`` en los listados CRUD de contactos (las plantillas las leen por posición)
+COLUMNAS_LISTADO = {
+    'extensiones': 'ID_CONTACTO, NOMBRE, VALOR, AREA, DEPARTAMENTO, ID_AREA, ID_DEPARTAMENTO, ID_COLABORADOR',
+    'celulares': 'ID_CONTACTO, NOMBRE, VALOR, AREA, DEPARTAMENTO, ID_AREA, ID_DEPARTAMENTO, ID_COLABORADOR',
+    'correos': 'ID_CONTACTO, NOMBRE, VALOR, AREA, DEPARTAMENTO, ID_COLABORADOR',
+}
+
+# Una fila por ID con los nombres de área, departamento, cargo y ubicación resueltos: (claves, SQL)
+DETALLES = {
+    'areas': (('id', 'area'), "SELECT ID_AREAS, AREA FROM areas WHERE ID_AREAS = %s"),
+    'departamentos': (('id', 'departamento'),
+                      "SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos WHERE ID_DEPARTAMENTOS = %s"),
+    'ubicaciones': (('id', 'descripcion', 'geolocalizacion', 'direccion'),
+                    "SELECT ID_UBICACIONES, DESCRIPCION, GEOLOCALIZACION, DIRECCION FROM ubicaciones WHERE ID_UBICACIONES = %s"),
+    'cargos': (('id', 'descripcion', 'area_id', 'area', 'departamento_id', 'departamento'), """
+        SELECT c.ID_CARGOS, c.DESCRIPCION, c.AREA, a.AREA, c.DEPARTAMENTO, d.DEPARTAMENTO
+        FROM cargos c
+        LEFT JOIN areas a ON c.AREA = a.ID_AREAS
+        LEFT JOIN departamentos d ON c.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+        WHERE c.ID_CARGOS = %s
+    """),
+    # Como en los listados, el área y el departamento son los del cargo
+    'colaboradores': (('id', 'nombre', 'cargo_id', 'cargo', 'ubicacion_id', 'ubicacion',
+                       'area_id', 'area', 'departamento_id', 'departamento'), """
+        SELECT col.ID_COLABORADORES, col.NOMBRE, col.CARGO, cg.DESCRIPCION, col.UBICACION, u.DESCRIPCION,
+               cg.AREA, a.AREA, cg.DEPARTAMENTO, d.DEPARTAMENTO
+        FROM colaboradores col
+        LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+        LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+        LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+        LEFT JOIN ubicaciones u ON col.UBICACION = u.ID_UBICACIONES
+        WHERE col.ID_COLABORADORES = %s
+    """),
+}
+# Los contactos se leen de ``directorio``, ya con los nombres resueltos
+DETALLES.update({
+    tipo: (('id', 'id_colaborador', 'nombre', campo, 'area_id', 'area', 'departamento_id', 'departamento'), f"""
+        SELECT ID_CONTACTO, ID_COLABORADOR, NOMBRE, VALOR, ID_AREA, AREA, ID_DEPARTAMENTO, DEPARTAMENTO
+        FROM directorio WHERE TIPO = '{tipo}' AND ID_CONTACTO = %s
+    """)
+    for tipo, campo in (('extensiones', 'extension'), ('celulares', 'celular'), ('correos', 'correo'))
+})
+
+# Palabras que el índice FULLTEXT de InnoDB no indexa: stopwords por defecto de 3 o más letras
+# (las más cortas tampoco, por innodb_ft_min_token_size = 3)
+PALABRAS_SIN_INDICE = {
+    'about', 'are', 'com', 'for', 'from', 'how', 'that', 'the', 'this', 'was', 'what',
+    'when', 'where', 'who', 'will', 'with', 'und', 'www',
+}
+
+
+def escapar_like(texto):
+    """Texto para un patrón LIKE con los comodines del usuario escapados"""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def patron_like(texto):
+    """Patrón LIKE de coincidencia parcial"""
+    return f"%{escapar_like(texto)}%"
+
+
+# --------------------------------------Motores----------------------------------------------------------------------
+
+class BackendMySQL:
+    """MySQL: escrituras en el maestro (pool) y lecturas enrutadas a la réplica (ver conexiones.py)
+
+    Igual que ``BackendSQLite`` ofrece ``connection`` (escrituras y lecturas que
+    deben ver lo último escrito), ``lectura`` y las pocas expresiones SQL que
+    cambian entre motores.
+    """
+
+    nombre = 'mysql'
+    Error = MySQLdb.Error
+    # ACTUALIZADO cambia solo (ON UPDATE CURRENT_TIMESTAMP)
+    SQL_INCREMENTAR_VERSION = ("INSERT INTO versiones_datos (TABLA, VERSION) VALUES (%s, 1) "
+                               "ON DUPLICATE KEY UPDATE VERSION = VERSION + 1")
+
+    def __init__(self, app):
+        self.mysql = MySQLPool(app)
+        self.enrutador = EnrutadorLecturas(self.mysql, app)
+
+    @property
+    def connection(self):
+        return self.mysql.connection
+
+    @property
+    def lectura(self):
+        return self.enrutador.connection
+
+    @property
+    def envolver(self):
+        return self.mysql.pool.envolver
+
+    @envolver.setter
+    def envolver(self, funcion):
+        # También las conexiones de la réplica
+        self.mysql.pool.envolver = self.enrutador.replica.pool.envolver = funcion
+
+    def cursor_sin_buffer(self, conn):
+        return conn.cursor(MySQLdb.cursors.SSCursor)
+
+    def condiciones_nombre(self, columna, texto):
+        """Cada palabra de ``texto`` debe iniciar una palabra de ``columna``
+
+        Las palabras indexables se buscan en el índice FULLTEXT de ``columna`` (sin
+        recorrer la tabla); las demás, con LIKE. Devuelve (condiciones, parámetros).
+        """
+        condiciones = []
+        parametros = []
+        palabras = re.findall(r'\w+', texto)
+        indexables = [p for p in palabras if len(p) >= 3 and p.lower() not in PALABRAS_SIN_INDICE]
+        if indexables:
+            condiciones.append(f"MATCH({columna}) AGAINST (%s IN BOOLEAN MODE)")
+            parametros.append(' '.join(f'+{p}*' for p in indexables))
+        for palabra in palabras:
+            if palabra not in indexables:
+                condiciones.append(f"{columna} LIKE %s")
+                parametros.append(patron_like(palabra))
+        return condiciones, parametros
+
+    def concatenar(self, expresion, orden):
+        return f"GROUP_CONCAT({expresion} ORDER BY {orden} SEPARATOR '; ')"
+
+    def segundos_epoch(self, columna):
+        return f"UNIX_TIMESTAMP({columna})"
+
+    def clave_foranea(self, error):
+        """True si ``error`` es una violación de clave foránea (fila referenciada o referencia inexistente)"""
+        return isinstance(error, MySQLdb.IntegrityError) and bool(error.args) and error.args[0] in (1451, 1452)
+
+    def clave_duplicada(self, error):
+        """True si ``error`` es un valor repetido en un índice único (p. ej. ``correos.CORREO``)"""
+        return isinstance(error, MySQLdb.IntegrityError) and bool(error.args) and error.args[0] == 1062
+
+    def cerrar_todas(self):
+        self.mysql.pool.cerrar_todas()
+        self.enrutador.replica.pool.cerrar_todas()
+
+    def reiniciar_tras_fork(self):
+        self.mysql.reiniciar_tras_fork()
+        self.enrutador.reiniciar_tras_fork()
+
+    def estadisticas(self):
+        return {'maestro': self.mysql.estadisticas(), 'replica': self.enrutador.estadisticas()}
+
+
+# Marcadores de MySQLdb (%s, %% y LIKE con barra invertida como escape, como en MySQL)
+_MARCADORES_MYSQL = re.compile(r"LIKE %s|%[%s]")
+_MARCADORES_SQLITE = {'%s': '?', '%%': '%', 'LIKE %s': "LIKE ? ESCAPE '\\'"}
+
+
+@functools.lru_cache(maxsize=512)
+def _traducir(query):
+    return _MARCADORES_MYSQL.sub(lambda m: _MARCADORES_SQLITE[m.group(0)], query)
+
+
+class CursorSQLite(sqlite3.Cursor):
+    """Cursor sqlite3 que acepta las consultas escritas para MySQLdb
+
+    Como MySQLdb, solo interpreta los marcadores cuando recibe parámetros.
+    """
+
+    def execute(self, query, args=None):
+        if args is None:
+            return super().execute(query)
+        return super().execute(_traducir(query), args)
+
+    def executemany(self, query, args):
+        return super().executemany(_traducir(query), args)
+
+
+class ConexionSQLite(sqlite3.Connection):
+    """Conexión sqlite3 con lo que la aplicación usa de MySQLdb: ``cursor(clase)`` y ``ping()``"""
+
+    def cursor(self, *args):
+        # Las clases de cursor de MySQLdb no aplican: sqlite3 ya lee las filas a medida que se piden
+        return super().cursor(CursorSQLite)
+
+    def ping(self, *args):
+        pass
+
+
+class BackendSQLite:
+    """SQLite embebida con el mismo esquema (migraciones/sqlite.sql), para pruebas y perfiles
+
+    ``ruta`` es un archivo (en modo WAL, se puede compartir entre procesos) o
+    ``:memory:``: una base vacía en memoria por backend, compartida por los
+    hilos de un solo proceso. Cada hilo usa su propia conexión; al terminar el
+    contexto de la aplicación se descarta la transacción pendiente, como al
+    devolver una conexión al pool de MySQL. En memoria, dos escrituras a la vez
+    fallan con "database table is locked": para carga concurrente usar un archivo.
+    """
+
+    nombre = 'sqlite'
+    Error = sqlite3.Error
+    # Sin ON UPDATE CURRENT_TIMESTAMP: ACTUALIZADO se fija aquí
+    SQL_INCREMENTAR_VERSION = ("INSERT INTO versiones_datos (TABLA, VERSION) VALUES (%s, 1) "
+                               "ON CONFLICT (TABLA) DO UPDATE SET VERSION = VERSION + 1, ACTUALIZADO = CURRENT_TIMESTAMP")
+
+    def __init__(self, ruta=':memory:', app=None):
+        self.ruta = ruta
+        self.en_memoria = ruta == ':memory:'
+        # Con caché compartida todas las conexiones del proceso ven la misma base en memoria
+        self._destino = f'file:farbiopharma-{id(self)}?mode=memory&cache=shared' if self.en_memoria else ruta
+        self.envolver = None
+        self._local = threading.local()
+        # La base en memoria existe mientras quede una conexión abierta: esta no se cierra
+        self._ancla = self._abrir()
+        with open(ESQUEMA_SQLITE, encoding='utf-8') as archivo:
+            self._ancla.executescript(archivo.read())
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.teardown_appcontext(self.teardown)
+
+    def _abrir(self):
+        conn = sqlite3.connect(self._destino, uri=self.en_memoria, timeout=5, factory=ConexionSQLite)
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self.en_memoria:
+            # Leer aunque otra conexión tenga una escritura sin confirmar (si no, la lectura falla)
+            conn.execute("PRAGMA read_uncommitted = ON")
+        else:
+            conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._abrir()
+            if self.envolver:
+                conn = self.envolver(conn)
+            self._local.conn = conn
+        return conn
+
+    # Sin réplica: las lecturas usan la misma conexión
+    lectura = connection
+
+    def teardown(self, exception):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.rollback()
+
+    def cursor_sin_buffer(self, conn):
+        return conn.cursor()
+
+    def condiciones_nombre(self, columna, texto):
+        """Cada palabra de ``texto`` debe iniciar una palabra de ``columna`` (sin índice de texto: LIKE)"""
+        condiciones = []
+        parametros = []
+        for palabra in re.findall(r'\w+', texto):
+            condiciones.append(f"(' ' || {columna}) LIKE %s")
+            parametros.append(f"% {escapar_like(palabra)}%")
+        return condiciones, parametros
+
+    def concatenar(self, expresion, orden):
+        # GROUP_CONCAT de SQLite no admite ORDER BY: los valores salen en el orden en que se leen
+        return f"GROUP_CONCAT({expresion}, '; ')"
+
+    def segundos_epoch(self, columna):
+        # En una consulta sin parámetros: el %s no se toma como marcador
+        return f"CAST(strftime('%s', {columna}) AS INTEGER)"
+
+    def clave_foranea(self, error):
+        return isinstance(error, sqlite3.IntegrityError) and 'FOREIGN KEY' in str(error)
+
+    def clave_duplicada(self, error):
+        return isinstance(error, sqlite3.IntegrityError) and 'UNIQUE' in str(error)
+
+    def cerrar_todas(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+    def reiniciar_tras_fork(self):
+        self._local = threading.local()
+
+    def estadisticas(self):
+        return {}
+
+
+# --------------------------------------Repositorio----------------------------------------------------------------------
+
+class Tabla:
+    """Alta, modificación, baja y lectura por ID de una tabla con clave autoincremental
+
+    Los valores se pasan en el orden de ``columnas``.
+    """
+
+    def __init__(self, nombre, id, columnas):
+        self.nombre = nombre
+        self.id = id
+        self.columnas = columnas
+        self._insertar = f"INSERT INTO {nombre} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})"
+        self._actualizar = f"UPDATE {nombre} SET {', '.join(f'{c} = %s' for c in columnas)} WHERE {id} = %s"
+        self._eliminar = f"DELETE FROM {nombre} WHERE {id} = %s"
+        self._obtener = f"SELECT {id}, {', '.join(columnas)} FROM {nombre} WHERE {id} = %s"
+
+    def insertar(self, cur, valores):
+        """Insertar una fila; devuelve su ID"""
+        cur.execute(self._insertar, tuple(valores))
+        return cur.lastrowid
+
+    def actualizar(self, cur, id, valores):
+        cur.execute(self._actualizar, tuple(valores) + (id,))
+        return cur.rowcount
+
+    def eliminar(self, cur, id):
+        cur.execute(self._eliminar, (id,))
+        return cur.rowcount
+
+    def obtener(self, cur, id):
+        """(ID, columnas...) o None"""
+        cur.execute(self._obtener, (id,))
+        return cur.fetchone()
+
+    def existentes(self, cur, ids):
+        """Conjunto de los ``ids`` que existen en la tabla"""
+        if not ids:
+            return set()
+        cur.execute(f"SELECT {self.id} FROM {self.nombre} WHERE {self.id} IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+        return {fila[0] for fila in cur.fetchall()}
+
+    def sql_actualizar(self, columnas):
+        """UPDATE de solo algunas ``columnas``; los parámetros son (valores..., ID)"""
+        return f"UPDATE {self.nombre} SET {', '.join(f'{c} = %s' for c in columnas)} WHERE {self.id} = %s"
+
+    @property
+    def sql_eliminar(self):
+        """DELETE por ID; el parámetro es (ID,)"""
+        return self._eliminar
+
+
+class Repositorio:
+    """Consultas de la aplicación, escritas una vez para cualquier motor (``BackendMySQL`` o ``BackendSQLite``)
+
+    Los métodos reciben el cursor de quien llama, así varias operaciones
+    comparten una transacción (como en ``DirectorioMaterializado``).
+    ``escritura()`` abre ese cursor en el maestro dentro de una transacción y
+    ``consulta()`` lo abre para lecturas (en la réplica si procede).
+    """
+
+    def __init__(self, bd):
+        self.bd = bd
+        self.usuarios = Tabla('usuarios', 'id', ('username', 'email', 'password_hash'))
+        self.areas = Tabla('areas', 'ID_AREAS', ('AREA',))
+        self.departamentos = Tabla('departamentos', 'ID_DEPARTAMENTOS', ('DEPARTAMENTO',))
+        self.ubicaciones = Tabla('ubicaciones', 'ID_UBICACIONES', ('DESCRIPCION', 'GEOLOCALIZACION', 'DIRECCION'))
+        self.cargos = Tabla('cargos', 'ID_CARGOS', ('DESCRIPCION', 'AREA', 'DEPARTAMENTO'))
+        self.colaboradores = Tabla('colaboradores', 'ID_COLABORADORES', ('NOMBRE', 'DEPARTAMENTO', 'AREA', 'CARGO', 'UBICACION'))
+        self.contactos = {
+            tipo: Tabla(tipo, columna_id, ('ID_COLABORADOR', columna_valor, 'AREA', 'DEPARTAMENTO'))
+            for tipo, columna_id, columna_valor in COLUMNAS_CONTACTO
+        }
+
+    @contextmanager
+    def escritura(self):
+        """Cursor del maestro en una transacción: commit al salir, rollback si hay una excepción"""
+        conn = self.bd.connection
+        cur = conn.cursor()
+        try:
+            yield cur
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    @contextmanager
+    def consulta(self, maestro=False):
+        """Cursor para lecturas; con ``maestro`` se lee lo último escrito aunque haya réplica"""
+        cur = (self.bd.connection if maestro else self.bd.lectura).cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    def error_de_fila(self, error):
+        """True si ``error`` se debe a los datos de una fila (clave foránea o valor único repetido)"""
+        return self.bd.clave_foranea(error) or self.bd.clave_duplicada(error)
+
+    def ejecutar_lote(self, cur, sql, filas):
+        """Ejecutar ``sql`` con cada una de ``filas`` en la transacción de ``cur``, sin perder las válidas
+
+        Primero se intenta un solo ``executemany``. Si alguna fila viola una
+        clave foránea o repite un valor único se deshace el lote (hasta un
+        punto de guardado) y se repite fila por fila, cada una con su propio
+        punto de guardado, para aplicar las demás. Devuelve {posición en ``filas``: error} de las que
+        fallaron. Los puntos de guardado no se liberan: en SQLite liberar el
+        primero confirmaría la transacción; se descartan al confirmarla.
+        """
+        if not filas:
+            return {}
+        cur.execute("SAVEPOINT lote")
+        try:
+            cur.executemany(sql, filas)
+            return {}
+        except self.bd.Error as e:
+            if not self.error_de_fila(e):
+                raise
+            cur.execute("ROLLBACK TO SAVEPOINT lote")
+        fallidas = {}
+        for posicion, fila in enumerate(filas):
+            cur.execute("SAVEPOINT fila")
+            try:
+                cur.execute(sql, fila)
+            except self.bd.Error as e:
+                if not self.error_de_fila(e):
+                    raise
+                cur.execute("ROLLBACK TO SAVEPOINT fila")
+                fallidas[posicion] = e
+        return fallidas
+
+    def comprobar_conexion(self):
+        with self.consulta(maestro=True) as cur:
+            cur.execute("SELECT 1")
+            cur.fetchall()
+
+    # --------------------------------------Usuarios----------------------------------------------------------------------
+
+    def usuario_por_nombre(self, cur, username):
+        """(id, username, password_hash) o None"""
+        cur.execute("SELECT id, username, password_hash FROM usuarios WHERE username = %s", (username,))
+        return cur.fetchone()
+
+    def usuario_existe(self, cur, username, email):
+        cur.execute("SELECT id FROM usuarios WHERE username = %s OR email = %s", (username, email))
+        return cur.fetchone() is not None
+
+    def actualizar_hash(self, cur, id, password_hash):
+        cur.execute("UPDATE usuarios SET password_hash = %s WHERE id = %s", (password_hash, id))
+
+    # --------------------------------------Datos de referencia y listados----------------------------------------------------------------------
+
+    def listar_areas(self, cur):
+        cur.execute("SELECT ID_AREAS, AREA FROM areas ORDER BY AREA")
+        return cur.fetchall()
+
+    def listar_departamentos(self, cur):
+        cur.execute("SELECT ID_DEPARTAMENTOS, DEPARTAMENTO FROM departamentos ORDER BY DEPARTAMENTO")
+        return cur.fetchall()
+
+    def listar_cargos(self, cur):
+        cur.execute("SELECT ID_CARGOS, DESCRIPCION, AREA, DEPARTAMENTO FROM cargos ORDER BY DESCRIPCION")
+        return cur.fetchall()
+
+    def listar_ubicaciones(self, cur):
+        cur.execute("SELECT ID_UBICACIONES, DESCRIPCION, GEOLOCALIZACION, DIRECCION FROM ubicaciones ORDER BY DESCRIPCION")
+        return cur.fetchall()
+
+    def listar_colaboradores_info(self, cur):
+        """(ID, nombre, ID y nombre del área, ID y nombre del departamento) del cargo de cada colaborador"""
+        cur.execute("""
+            SELECT c.ID_COLABORADORES, c.NOMBRE, a.ID_AREAS, a.AREA, d.ID_DEPARTAMENTOS, d.DEPARTAMENTO
+            FROM colaboradores c
+            LEFT JOIN cargos cg ON c.CARGO = cg.ID_CARGOS
+            LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+            LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+            ORDER BY c.NOMBRE
+        """)
+        return cur.fetchall()
+
+    def listar_cargos_detalle(self, cur):
+        """Cargos con los nombres de su área y departamento, y sus IDs"""
+        cur.execute("""
+            SELECT c.ID_CARGOS, c.DESCRIPCION, a.AREA, d.DEPARTAMENTO, c.AREA, c.DEPARTAMENTO
+            FROM cargos c
+            LEFT JOIN areas a ON c.AREA = a.ID_AREAS
+            LEFT JOIN departamentos d ON c.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+            ORDER BY c.DESCRIPCION
+        """)
+        return cur.fetchall()
+
+    def listar_colaboradores(self, cur):
+        """Colaboradores con los nombres del área y departamento de su cargo, cargo y ubicación, y sus IDs"""
+        cur.execute("""
+            SELECT col.ID_COLABORADORES, col.NOMBRE,
+                   d.DEPARTAMENTO, a.AREA, c.DESCRIPCION, u.DESCRIPCION,
+                   c.DEPARTAMENTO, c.AREA, col.CARGO, col.UBICACION
+            FROM colaboradores col
+            LEFT JOIN cargos c ON col.CARGO = c.ID_CARGOS
+            LEFT JOIN areas a ON c.AREA = a.ID_AREAS
+            LEFT JOIN departamentos d ON c.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+            LEFT JOIN ubicaciones u ON col.UBICACION = u.ID_UBICACIONES
+            ORDER BY col.NOMBRE
+        """)
+        return cur.fetchall()
+
+    def listar_contactos(self, cur, tipo):
+        """Contactos de un tipo desde ``directorio``, con el área y departamento del cargo de su colaborador"""
+        cur.execute(f"""
+            SELECT {COLUMNAS_LISTADO[tipo]}
+            FROM directorio WHERE TIPO = %s
+            ORDER BY NOMBRE, ID_CONTACTO
+        """, (tipo,))
+        return cur.fetchall()
+
+    def correos_registrados(self, cur):
+        """Todos los correos (índice único), para validar una importación sin una consulta por fila"""
+        cur.execute("SELECT CORREO FROM correos")
+        return [fila[0] for fila in cur.fetchall()]
+
+    def detalle(self, cur, entidad, id):
+        """Una fila de ``entidad`` como diccionario (ver ``DETALLES``), o None si no existe"""
+        claves, sql = DETALLES[entidad]
+        cur.execute(sql, (id,))
+        fila = cur.fetchone()
+        return dict(zip(claves, fila)) if fila is not None else None
+
+    # --------------------------------------Vistas del directorio----------------------------------------------------------------------
+
+    def sql_pagina_directorio(self, tipo, criterios, limite):
+        """SQL de una página de contactos de ``directorio`` (una fila más que ``limite``)
+
+        ``criterios``: ``nombre`` (palabras del nombre), ``valor`` (coincidencia
+        parcial), ``area`` y ``departamento`` (ID) y ``despues`` (nombre, ID) de
+        la última fila de la página anterior. Devuelve (sql, parámetros).
+        """
+        condiciones = ["TIPO = %s"]
+        parametros = [tipo]
+        if criterios.get('nombre'):
+            condiciones_texto, parametros_texto = self.bd.condiciones_nombre('NOMBRE', criterios['nombre'])
+            condiciones.extend(condiciones_texto)
+            parametros.extend(parametros_texto)
+        if criterios.get('valor'):
+            condiciones.append("VALOR LIKE %s")
+            parametros.append(patron_like(criterios['valor']))
+        for criterio, columna in (('area', 'ID_AREA'), ('departamento', 'ID_DEPARTAMENTO')):
+            if criterios.get(criterio):
+                condiciones.append(f"{columna} = %s")
+                parametros.append(criterios[criterio])
+        if criterios.get('despues'):
+            nombre, id = criterios['despues']
+            condiciones.append("(NOMBRE > %s OR (NOMBRE = %s AND ID_CONTACTO > %s))")
+            parametros.extend([nombre, nombre, id])
+        sql = f"""
+            SELECT ID_CONTACTO, NOMBRE, VALOR, AREA, DEPARTAMENTO, ID_COLABORADOR
+            FROM directorio
+            WHERE {' AND '.join(condiciones)}
+            ORDER BY NOMBRE, ID_CONTACTO LIMIT %s
+        """
+        return sql, parametros + [limite + 1]
+
+    def pagina_directorio(self, cur, tipo, criterios, limite):
+        cur.execute(*self.sql_pagina_directorio(tipo, criterios, limite))
+        return cur.fetchall()
+
+    def sql_pagina_fichas(self, criterios, limite):
+        """SQL de una página de colaboradores con su cargo, área, departamento y ubicación
+
+        Los mismos ``criterios`` que ``sql_pagina_directorio`` salvo ``valor``;
+        el área y el departamento son los del cargo. Devuelve (sql, parámetros).
+        """
+        condiciones = []
+        parametros = []
+        if criterios.get('nombre'):
+            condiciones_texto, parametros_texto = self.bd.condiciones_nombre('col.NOMBRE', criterios['nombre'])
+            condiciones.extend(condiciones_texto)
+            parametros.extend(parametros_texto)
+        for criterio, columna in (('area', 'cg.AREA'), ('departamento', 'cg.DEPARTAMENTO')):
+            if criterios.get(criterio):
+                condiciones.append(f"{columna} = %s")
+                parametros.append(criterios[criterio])
+        if criterios.get('despues'):
+            nombre, id = criterios['despues']
+            condiciones.append("(col.NOMBRE > %s OR (col.NOMBRE = %s AND col.ID_COLABORADORES > %s))")
+            parametros.extend([nombre, nombre, id])
+        sql = """
+            SELECT col.ID_COLABORADORES, col.NOMBRE, cg.DESCRIPCION, a.AREA, d.DEPARTAMENTO, u.DESCRIPCION
+            FROM colaboradores col
+            LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+            LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+            LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+            LEFT JOIN ubicaciones u ON col.UBICACION = u.ID_UBICACIONES
+        """
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += " ORDER BY col.NOMBRE, col.ID_COLABORADORES LIMIT %s"
+        return sql, parametros + [limite + 1]
+
+    def pagina_fichas(self, cur, criterios, limite):
+        cur.execute(*self.sql_pagina_fichas(criterios, limite))
+        return cur.fetchall()
+
+    def contactos_de(self, cur, ids, con_id=False):
+        """{tipo: [(ID del colaborador, valor)]} de los colaboradores ``ids`` (todos si es None)
+
+        Una consulta por tipo de contacto; con ``con_id`` el valor es (ID del contacto, valor).
+        """
+        filtro = ''
+        parametros = ()
+        if ids is not None:
+            filtro = f"WHERE ID_COLABORADOR IN ({', '.join(['%s'] * len(ids))})"
+            parametros = tuple(ids)
+        contactos = {}
+        for tipo, columna_id, columna_valor in COLUMNAS_CONTACTO:
+            cur.execute(f"SELECT ID_COLABORADOR, {columna_id}, {columna_valor} FROM {tipo} {filtro} ORDER BY {columna_id}",
+                        parametros or None)
+            contactos[tipo] = [(id_colaborador, (id, valor) if con_id else valor)
+                               for id_colaborador, id, valor in cur.fetchall()]
+        return contactos
+
+    def colaboradores_busqueda(self, cur, ids):
+        """(ID, nombre, área, departamento) de los colaboradores ``ids`` (todos si es None), para el índice de búsqueda"""
+        filtro = ''
+        parametros = None
+        if ids is not None:
+            filtro = f"WHERE col.ID_COLABORADORES IN ({', '.join(['%s'] * len(ids))})"
+            parametros = tuple(ids)
+        cur.execute(f"""
+            SELECT col.ID_COLABORADORES, col.NOMBRE, a.AREA, d.DEPARTAMENTO
+            FROM colaboradores col
+            LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+            LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+            LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+            {filtro}
+        """, parametros)
+        return cur.fetchall()
+
+    def filas_exportacion(self, lote=500):
+        """Todos los colaboradores con sus contactos, leídos de a ``lote`` filas
+
+        Usa un cursor sin buffer: el servidor envía las filas a medida que se
+        leen, así la memoria no crece con el tamaño del directorio. Los
+        contactos se agrupan en la misma consulta para no consultar mientras el
+        cursor sigue abierto.
+        """
+        bd = self.bd
+        cur = bd.cursor_sin_buffer(bd.lectura)
+        try:
+            cur.execute(f"""
+                SELECT col.ID_COLABORADORES, col.NOMBRE, cg.DESCRIPCION, a.AREA, d.DEPARTAMENTO, u.DESCRIPCION,
+                       (SELECT {bd.concatenar('e.EXTENSION', 'e.ID_EXTENSIONES')}
+                        FROM extensiones e WHERE e.ID_COLABORADOR = col.ID_COLABORADORES),
+                       (SELECT {bd.concatenar('c.CELULAR', 'c.ID_CELULARES')}
+                        FROM celulares c WHERE c.ID_COLABORADOR = col.ID_COLABORADORES),
+                       (SELECT {bd.concatenar('co.CORREO', 'co.ID_CORREOS')}
+                        FROM correos co WHERE co.ID_COLABORADOR = col.ID_COLABORADORES)
+                FROM colaboradores col
+                LEFT JOIN cargos cg ON col.CARGO = cg.ID_CARGOS
+                LEFT JOIN areas a ON cg.AREA = a.ID_AREAS
+                LEFT JOIN departamentos d ON cg.DEPARTAMENTO = d.ID_DEPARTAMENTOS
+                LEFT JOIN ubicaciones u ON col.UBICACION = u.ID_UBICACIONES
+                ORDER BY col.NOMBRE, col.ID_COLABORADORES
+            """)
+            while True:
+                filas = cur.fetchmany(lote)
+                if not filas:
+                    break
+                yield from filas
+        finally:
+            # Si el cliente corta la descarga, close() descarta el resto del resultado
+            cur.close()
+
+    # --------------------------------------Versiones de las tablas----------------------------------------------------------------------
+
+    def leer_versiones(self, cur):
+        """[(tabla, versión, segundos desde 1970 del último cambio)]"""
+        cur.execute(f"SELECT TABLA, VERSION, {self.bd.segundos_epoch('ACTUALIZADO')} FROM versiones_datos")
+        return cur.fetchall()
+
+    def incrementar_versiones(self, cur, tablas):
+        cur.executemany(self.bd.SQL_INCREMENTAR_VERSION, [(tabla,) for tabla in tablas])
@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli las respuestas se comprimen solo con gzip
+    brotli = None
+
+# Tipos de contenido que vale la pena comprimir (PNG, XLSX... ya vienen comprimidos)
+TIPOS_COMPRIMIBLES = ('text/', 'application/json', 'application/javascript', 'application/x-ndjson', 'image/svg+xml')
+# Un año: lo máximo que respetan los navegadores
+UN_ANO = 365 * 24 * 3600
+
+
+def comprimible(content_type):
+    return (content_type or '').startswith(TIPOS_COMPRIMIBLES)
+
+
+class Compresion:
+    """Compresión gzip (y brotli si está instalado) de las respuestas
+
+    Se comprimen las respuestas 200 de tipos de texto con al menos ``minimo``
+    bytes, con la codificación preferida por el cliente (Accept-Encoding). Las
+    respuestas en streaming (exportación), los archivos y las que ya traen
+    Content-Encoding (páginas de ``CachePaginas``) se envían tal cual.
+    ``variantes`` precomprime una vez, con más compresión, lo que se guarda en caché.
+    """
+
+    def __init__(self, app=None, minimo=1024, nivel_gzip=6, nivel_brotli=4):
+        self.minimo = minimo
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+        # Brotli primero: con la misma preferencia del cliente se elige la más pequeña
+        self.codificaciones = ('br', 'gzip') if brotli is not None else ('gzip',)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self._comprimir)
+
+    def elegir(self):
+        """Codificación para la petición actual, o None si el cliente no acepta ninguna"""
+        return request.accept_encodings.best_match(self.codificaciones)
+
+    def comprimir(self, cuerpo, codificacion, maximo=False):
+        if codificacion == 'br':
+            # Calidad 9 y no 11: casi el mismo tamaño en una fracción del tiempo
+            return brotli.compress(cuerpo, quality=9 if maximo else self.nivel_brotli)
+        return gzip.compress(cuerpo, compresslevel=9 if maximo else self.nivel_gzip)
+
+    def variantes(self, cuerpo):
+        """{codificación: cuerpo comprimido} con todas las codificaciones disponibles"""
+        return {codificacion: self.comprimir(cuerpo, codificacion, maximo=True) for codificacion in self.codificaciones}
+
+    def _comprimir(self, respuesta):
+        if (respuesta.status_code != 200 or respuesta.direct_passthrough or respuesta.is_streamed
+                or 'Content-Encoding' in respuesta.headers or not comprimible(respuesta.content_type)):
+            return respuesta
+        respuesta.vary.add('Accept-Encoding')
+        codificacion = self.elegir()
+        cuerpo = respuesta.get_data()
+        if codificacion is None or len(cuerpo) < self.minimo:
+            return respuesta
+        respuesta.set_data(self.comprimir(cuerpo, codificacion))
+        respuesta.content_encoding = codificacion
+        # Los bytes enviados cambian con la codificación: el ETag pasa a ser débil
+        etag, debil = respuesta.get_etag()
+        if etag and not debil:
+            respuesta.set_etag(etag, weak=True)
+        return respuesta
+
+
+class EstaticosVersionados:
+    """URLs de /static con la huella del contenido (``?v=...``) y caché inmutable
+
+    ``url_for('static', filename=...)`` agrega la huella del archivo; al
+    cambiar el archivo cambia la URL, así el navegador lo guarda ``max_age``
+    segundos sin volver a preguntar. Sin huella o con una vieja se sirve con
+    revalidación, como antes. Las huellas se recalculan si el archivo cambia.
+    """
+
+    def __init__(self, app=None, max_age=UN_ANO):
+        self.max_age = max_age
+        self._huellas = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.carpeta = app.static_folder
+        app.url_defaults(self._agregar_huella)
+        app.after_request(self._cabeceras)
+
+    def huella(self, filename):
+        """Primeros caracteres del SHA-256 del archivo, o None si no existe"""
+        ruta = safe_join(self.carpeta, filename)
+        if ruta is None:
+            return None
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            return None
+        clave = (estado.st_mtime_ns, estado.st_size)
+        guardada = self._huellas.get(ruta)
+        if guardada is not None and guardada[0] == clave:
+            return guardada[1]
+        with open(ruta, 'rb') as archivo:
+            huella = hashlib.sha256(archivo.read()).hexdigest()[:12]
+        with self._lock:
+            self._huellas[ruta] = (clave, huella)
+        return huella
+
+    def _agregar_huella(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            huella = self.huella(values['filename'])
+            if huella:
+                values['v'] = huella
+
+    def _cabeceras(self, respuesta):
+        if request.endpoint != 'static' or respuesta.status_code not in (200, 304):
+            return respuesta
+        version = request.args.get('v')
+        if version and version == self.huella(request.view_args['filename']):
+            respuesta.cache_control.no_cache = None
+            respuesta.cache_control.public = True
+            respuesta.cache_control.max_age = self.max_age
+            respuesta.cache_control.immutable = True
+        return respuesta
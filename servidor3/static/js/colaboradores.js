@@ -0,0 +1,73 @@
+// Autocompletado de colaboradores en los formularios de extensiones, celulares y correos.
+// Las sugerencias se piden a /api/colaboradores/sugerir mientras se escribe, en lugar de
+// incluir a todos los colaboradores en cada página. Se conecta a los inputs con el
+// atributo data-sugerencias (su datalist es el del atributo list).
+
+// Colaboradores ya sugeridos ({id, nombre, area: {id, nombre}, departamento: {id, nombre}}),
+// para que los formularios los busquen por nombre al seleccionarlos
+var colaboradoresInfo = [];
+
+(function() {
+	var ESPERA_MS = 150;
+	var conocidos = {};
+
+	function recordar(sugerencias) {
+		sugerencias.forEach(function(col) {
+			if (!conocidos[col.id]) {
+				conocidos[col.id] = true;
+				colaboradoresInfo.push(col);
+			}
+		});
+	}
+
+	// Pedir sugerencias para un texto; se agregan a colaboradoresInfo
+	window.cargarSugerencias = function(texto) {
+		return fetch('/api/colaboradores/sugerir?q=' + encodeURIComponent(texto), {credentials: 'same-origin'})
+			.then(function(respuesta) { return respuesta.ok ? respuesta.json() : []; })
+			.catch(function() { return []; })
+			.then(function(sugerencias) {
+				recordar(sugerencias);
+				return sugerencias;
+			});
+	};
+
+	function conectar(input) {
+		var datalist = document.getElementById(input.getAttribute('list'));
+		var temporizador = null;
+		var ultimo = null;
+		var reenviando = false;
+		input.addEventListener('input', function() {
+			if (reenviando) return;
+			var texto = input.value.trim();
+			clearTimeout(temporizador);
+			if (!texto) {
+				datalist.innerHTML = '';
+				return;
+			}
+			temporizador = setTimeout(function() {
+				ultimo = texto;
+				cargarSugerencias(texto).then(function(sugerencias) {
+					// Una respuesta de un texto anterior llegó tarde
+					if (texto !== ultimo) return;
+					datalist.innerHTML = '';
+					sugerencias.forEach(function(col) {
+						var opt = document.createElement('option');
+						opt.value = col.nombre;
+						datalist.appendChild(opt);
+					});
+					// Si se escribió el nombre completo antes de tener la sugerencia, avisar de
+					// nuevo a los formularios para que completen área, departamento e ID
+					if (sugerencias.some(function(col) { return col.nombre === input.value; })) {
+						reenviando = true;
+						input.dispatchEvent(new Event('input'));
+						reenviando = false;
+					}
+				});
+			}, ESPERA_MS);
+		});
+	}
+
+	document.addEventListener('DOMContentLoaded', function() {
+		document.querySelectorAll('input[data-sugerencias]').forEach(conectar);
+	});
+})();
@@ -0,0 +1,12 @@
+"""Punto de entrada WSGI para producción: gunicorn -c gunicorn.conf.py wsgi:app"""
+from app import app as _app
+
+
+def crear_app():
+    """Aplicación lista para servir en producción (nunca en modo debug)"""
+    _app.config['DEBUG'] = False
+    _app.debug = False
+    return _app
+
+
+app = crear_app()